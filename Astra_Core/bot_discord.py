@@ -1,8 +1,6 @@
 import discord
 import os
 import asyncio
-import pyautogui
-import PyPDF2
 import json
 from datetime import datetime
 from dotenv import load_dotenv
@@ -11,12 +9,17 @@ from dotenv import load_dotenv
 
 # Importações internas do laboratório
 from Astra_Core.voz import console
-from Astra_Core.cerebro import cerebro_astra, analisar_imagem_direta
-from Astra_Core.voz import console
-from Astra_Core.cerebro import cerebro_astra, analisar_imagem_direta
-from AppOpener import open as app_open, close as app_close
-from Astra_Core.ferramentas import radar_de_processos, ARQUIVO_APPS, buscar_arquivo_local
-from Astra_Core.ferramentas import radar_de_processos, ARQUIVO_APPS
+from Astra_Core.cerebro import cerebro_astra_async, analisar_imagem_direta_async
+from Astra_Core.ferramentas import radar_de_processos, candidatos_arquivo_local, relatorio_hardware, rastreador_otaku, obter_clima
+from Astra_Core.intencoes import roteador_discord
+from Astra_Core.catalogo_apps import catalogo_apps
+from core.indice_documentos import indice_documentos
+from Astra_Core.resposta_hibrida import turnos
+from core.partida import modulo_tardio
+
+pyautogui = modulo_tardio("pyautogui")
+AppOpener = modulo_tardio("AppOpener")
+from core.agenda_lembretes import agenda_lembretes, mensagem_lembrete
 
 load_dotenv()
 
@@ -24,6 +27,8 @@ load_dotenv()
 def iniciar_discord():
     DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
     DISCORD_CHANNEL_ID = os.getenv("DISCORD_CHANNEL_ID")
+    # "1" = cada pessoa tem a sua própria conversa dentro do canal
+    SESSAO_POR_USUARIO = os.getenv("DISCORD_SESSAO_POR_USUARIO", "0") == "1"
     
     if not DISCORD_TOKEN or DISCORD_TOKEN == "cole_o_token_gigante_aqui": 
         console.print("[bold red][Discord] ERRO: O Token não foi configurado no arquivo .env![/bold red]")
@@ -33,9 +38,26 @@ def iniciar_discord():
     intents.message_content = True
     client = discord.Client(intents=intents)
 
+    lembretes_no_bolso = []
+    # Última lista de "qual destes?" de cada canal, para o "mande o arquivo 2" saber do que se trata
+    candidatos_por_canal = {}
+
     @client.event
     async def on_ready():
         console.print(f"[bold green][Discord]:[/bold green] Astra conectada com sucesso como {client.user}!")
+        # Lembretes também chegam no bolso (o on_ready repete a cada reconexão, a inscrição não)
+        if DISCORD_CHANNEL_ID and not lembretes_no_bolso:
+            loop = asyncio.get_running_loop()
+            def avisar(tarefa, quando, atraso):
+                canal = client.get_channel(int(DISCORD_CHANNEL_ID))
+                if canal is not None:
+                    asyncio.run_coroutine_threadsafe(canal.send(f"⏰ {mensagem_lembrete(tarefa, quando, atraso)}"), loop)
+            agenda_lembretes.inscrever(avisar)
+            lembretes_no_bolso.append(avisar)
+
+    async def enviar_em_pedacos(canal, texto):
+        for i in range(0, len(texto), 2000):
+            await canal.send(texto[i:i+2000])
 
     @client.event
     async def on_message(message):
@@ -44,17 +66,27 @@ def iniciar_discord():
 
         comando = message.content.lower()
         console.print(f"[bold magenta][Discord]:[/bold magenta] {comando}")
+        # Mensagem nova no canal = turno novo: comentário atrasado de ferramenta do turno anterior é descartado
+        chave_turno = f"discord:{message.channel.id}"
+        turnos.novo(chave_turno)
+        loop = asyncio.get_running_loop()
+        # O comentário das ferramentas chega de outra thread, depois da resposta imediata
+        entregar = lambda texto: asyncio.run_coroutine_threadsafe(enviar_em_pedacos(message.channel, texto), loop)
+        # Cada pessoa tem a sua vez na fila da GPU (ninguém monopoliza a Astra com PDFs gigantes)
+        origem = f"discord:{message.author.id}"
 
         if message.attachments:
+            visoes_pendentes = []
             for attachment in message.attachments:
                 nome_temp = f"temp_discord_{attachment.filename}"
                 await attachment.save(nome_temp)
 
                 # Se for imagem, aciona o Olho de Agamotto Modificado
+                # Todas as imagens da mensagem disparam juntas para caírem no mesmo lote de visão
                 if attachment.content_type and attachment.content_type.startswith('image/'):
-                    async with message.channel.typing():
-                        resposta_visao = await asyncio.to_thread(analisar_imagem_direta, nome_temp, comando)
-                        await message.channel.send(resposta_visao)
+                    tarefa = asyncio.create_task(analisar_imagem_direta_async(nome_temp, comando, origem=origem))
+                    visoes_pendentes.append((nome_temp, tarefa))
+                    continue
                 
                 # Se for código ou texto puro (.py, .txt, .json, .md)
                 elif attachment.filename.endswith(('.txt', '.py', '.json', '.md', '.csv')):
@@ -63,7 +95,7 @@ def iniciar_discord():
                             with open(nome_temp, 'r', encoding='utf-8') as f:
                                 conteudo = f.read()
                             prompt_arq = f"Li este arquivo ({attachment.filename}). O comando do criador é: '{comando}'. Conteúdo do arquivo:\n{conteudo}"
-                            resposta, _ = await asyncio.to_thread(cerebro_astra, prompt_arq, None)
+                            resposta, _ = await cerebro_astra_async(prompt_arq, origem=origem, usar_cache=True, perfil="documento", intencao="arquivo_discord")
                             
                             for i in range(0, len(resposta), 2000):
                                 await message.channel.send(resposta[i:i+2000])
@@ -74,19 +106,15 @@ def iniciar_discord():
                 elif attachment.filename.endswith('.pdf'):
                     async with message.channel.typing():
                         try:
-                            texto_extraido = ""
-                            with open(nome_temp, 'rb') as f:
-                                leitor = PyPDF2.PdfReader(f)
-                                # Limite de 5 páginas para não fritar o cérebro
-                                limite_paginas = min(len(leitor.pages), 5)
-                                for i in range(limite_paginas): 
-                                    texto_extraido += leitor.pages[i].extract_text() + "\n"
+                            # Extrair e indexar fica numa thread: um PDF de 500 páginas não pode congelar o bot inteiro
+                            documento = await asyncio.to_thread(indice_documentos.abrir, nome_temp)
                             
-                            if not texto_extraido.strip():
+                            if not documento.trechos:
                                 await message.channel.send("Li o PDF, mas parece vazio ou só tem imagens escaneadas sem texto!")
                             else:
-                                prompt_arq = f"Li este PDF ({attachment.filename}). O comando do criador é: '{comando}'. Responda baseando-se APENAS no texto do documento:\n{texto_extraido}"
-                                resposta, _ = await asyncio.to_thread(cerebro_astra, prompt_arq, None)
+                                trechos = documento.contexto(comando)
+                                prompt_arq = f"Li este PDF ({attachment.filename}, {documento.total_paginas} páginas). O comando do criador é: '{comando}'. Responda baseando-se APENAS nestes trechos do documento:\n{trechos}"
+                                resposta, _ = await cerebro_astra_async(prompt_arq, origem=origem, usar_cache=True, perfil="documento", intencao="pdf_discord")
                                 
                                 for i in range(0, len(resposta), 2000):
                                     await message.channel.send(resposta[i:i+2000])
@@ -99,46 +127,71 @@ def iniciar_discord():
                 # Limpeza de Laboratório (Apaga o arquivo temporário)
                 if os.path.exists(nome_temp):
                     os.remove(nome_temp)
+
+            for nome_temp, tarefa in visoes_pendentes:
+                async with message.channel.typing():
+                    resposta_visao = await tarefa
+                    await message.channel.send(resposta_visao)
+                if os.path.exists(nome_temp):
+                    os.remove(nome_temp)
             return # Corta o fluxo aqui para ela não processar o comando de texto de novo e gerar duas respostas
         
+        # O mesmo livro de feitiços do terminal decide a ferramenta (Astra_Core/intencoes.py)
+        intencao, argumento = roteador_discord.rotear(comando)
+
         # O Cão Farejador (Busca e Envio de Arquivos)
-        gatilhos_arquivos = ['me mande o arquivo', 'enviar arquivo', 'procure o arquivo', 'mande o arquivo']
-        if any(g in comando for g in gatilhos_arquivos):
-            for g in gatilhos_arquivos:
-                if g in comando:
-                    nome_arquivo = comando.replace(g, '').strip()
-                    break
+        if intencao == 'arquivo':
+            nome_arquivo = argumento
             
             async with message.channel.typing():
-                await message.channel.send(f"Ativando o Cão Farejador! Vasculhando a sua Área de Trabalho, Documentos e Downloads atrás de '{nome_arquivo}'...")
-                
-                # Joga a busca pesada para uma thread separada para não travar a Astra
-                caminho_encontrado = await asyncio.to_thread(buscar_arquivo_local, nome_arquivo)
+                anteriores = candidatos_por_canal.get(message.channel.id)
+                if anteriores and nome_arquivo.strip().isdigit():
+                    # Resposta a um "qual destes?": o número escolhe da última lista
+                    escolha = int(nome_arquivo.strip()) - 1
+                    if not 0 <= escolha < len(anteriores):
+                        await message.channel.send(f"Só tenho {len(anteriores)} suspeitos na lista! Escolhe um número de 1 a {len(anteriores)}.")
+                        return
+                    caminho_encontrado = anteriores[escolha]
+                else:
+                    # O índice responde em milissegundos, mas a primeira varredura pode ainda estar rodando: fora do loop
+                    candidatos = await asyncio.to_thread(candidatos_arquivo_local, nome_arquivo)
+                    candidatos = [(pontos, caminho) for pontos, caminho in candidatos if pontos >= 0.6]
+                    if not candidatos:
+                        await message.channel.send(f"Vasculhei as zonas principais, mas não achei nenhum vestígio desse bebê. Tem certeza que o nome está certo ou que ele não está escondido em outro HD?")
+                        return
+                    # Só manda direto quando o primeiro bate de verdade (nome exato ou começo do nome) e sem empate à vista
+                    disparado = len(candidatos) == 1 or candidatos[0][0] - candidatos[1][0] >= 0.5
+                    if candidatos[0][0] < 2.0 or not disparado:
+                        candidatos_por_canal[message.channel.id] = [caminho for _, caminho in candidatos]
+                        lista = "\n".join(f"**{n}.** `{os.path.basename(c)}` — {os.path.dirname(c)}" for n, (_, c) in enumerate(candidatos, 1))
+                        await message.channel.send(f"O Cão Farejador achou mais de um suspeito:\n{lista}\nQual deles? Manda `mande o arquivo <número>`.")
+                        return
+                    caminho_encontrado = candidatos[0][1]
+                candidatos_por_canal.pop(message.channel.id, None)
                 
-                if caminho_encontrado:
-                    # Trava de Segurança: Verifica o tamanho do arquivo
-                    tamanho_mb = os.path.getsize(caminho_encontrado) / (1024 * 1024)
-                    if tamanho_mb > 25:
-                        await message.channel.send(f"Achei o bebê! Mas ele é muito gordo ({tamanho_mb:.1f} MB)! O limite do Discord é 25MB. Vou precisar de uma dieta compressora primeiro!")
-                    else:
-                        await message.channel.send(f"Alvo localizado! Extraindo e enviando o bebê: `{os.path.basename(caminho_encontrado)}` 💥", file=discord.File(caminho_encontrado))
+                if not os.path.exists(caminho_encontrado):
+                    await message.channel.send("Esse bebê fugiu de onde estava (foi movido ou apagado). Pede de novo que eu farejo outra vez!")
+                    return
+                # Trava de Segurança: Verifica o tamanho do arquivo
+                tamanho_mb = os.path.getsize(caminho_encontrado) / (1024 * 1024)
+                if tamanho_mb > 25:
+                    await message.channel.send(f"Achei o bebê! Mas ele é muito gordo ({tamanho_mb:.1f} MB)! O limite do Discord é 25MB. Vou precisar de uma dieta compressora primeiro!")
                 else:
-                    await message.channel.send(f"Vasculhei as zonas principais, mas não achei nenhum vestígio desse bebê. Tem certeza que o nome está certo ou que ele não está escondido em outro HD?")
+                    await message.channel.send(f"Alvo localizado! Extraindo e enviando o bebê: `{os.path.basename(caminho_encontrado)}` 💥", file=discord.File(caminho_encontrado))
             return
         # --------------------------------------------------
         
         
-        gatilhos_processos = ['processos abertos', 'programas abertos', 'o que está rodando', 'gerenciador de tarefas']
-        if any(g in comando for g in gatilhos_processos):
+        if intencao == 'processos':
             async with message.channel.typing():
                 # Executa a ferramenta e manda a resposta real pro Discord
-                resposta = await asyncio.to_thread(radar_de_processos)
+                resposta = await asyncio.to_thread(radar_de_processos, entregar=entregar, chave=chave_turno)
                 for i in range(0, len(resposta), 2000):
                     await message.channel.send(resposta[i:i+2000])
             return
         
         # A Invenção Assassina: O Print
-        if comando == 'print' or comando == 'tela' or comando == 'ecrã':
+        if intencao == 'print':
             async with message.channel.typing():
                 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
                 nome_ficheiro = f"print_discord_{timestamp}.png"
@@ -151,7 +204,7 @@ def iniciar_discord():
             return
         
         # O Catálogo de Invenções (Discord)
-        if 'gatilhos' in comando or 'suas funções' in comando:
+        if intencao == 'ajuda':
             async with message.channel.typing():
                 lista_discord = """
                 **🛠️ MANUAL DE INVENÇÕES DA ASTRA 🛠️**
@@ -171,46 +224,56 @@ def iniciar_discord():
                 await message.channel.send(lista_discord)
             return
 
+        # As ferramentas de texto do terminal, agora também no bolso
+        if intencao in ('hardware', 'anime', 'clima'):
+            ferramenta = {'hardware': relatorio_hardware, 'anime': rastreador_otaku, 'clima': obter_clima}[intencao]
+            async with message.channel.typing():
+                resposta = await asyncio.to_thread(ferramenta, *([] if argumento is None else [argumento]), entregar=entregar, chave=chave_turno)
+                for i in range(0, len(resposta), 2000):
+                    await message.channel.send(resposta[i:i+2000])
+            return
+
         # Controle Remoto de Vida e Morte (Abrir/Fechar Apps)
-        if 'abrir' in comando:
-            nome_app = comando.replace('abrir', '').strip()
+        if intencao == 'abrir':
             async with message.channel.typing():
+                # 1ª Tentativa: O catálogo do Radar (em thread: num nome desconhecido ele confere as pastas de novo)
+                app = await asyncio.to_thread(catalogo_apps.resolver, argumento)
+                nome_app = app.nome if app else argumento
                 abriu = False
-                try:
-                    # 1ª Tentativa: Tenta abrir pelos atalhos hackeados do nosso Radar
-                    with open(ARQUIVO_APPS, "r", encoding="utf-8") as f:
-                        for nome, caminho in json.load(f).items():
-                            if nome_app in nome: 
-                                os.startfile(caminho)
-                                abriu = True
-                                await message.channel.send(f"Ignição ativada! Iniciando {nome_app} no PC do mestre...")
-                                break
-                except: pass
+                if app:
+                    try:
+                        os.startfile(app.alvo)
+                        abriu = True
+                        await message.channel.send(f"Ignição ativada! Iniciando {nome_app} no PC do mestre...")
+                    except OSError: pass
                 
                 # 2ª Tentativa: Tenta abrir pelo AppOpener nativo do Windows
                 if not abriu:
                     try: 
-                        await asyncio.to_thread(app_open, nome_app, match_closest=True, output=False) 
+                        await asyncio.to_thread(AppOpener.open, nome_app, match_closest=True, output=False) 
                         await message.channel.send(f"Ignição ativada! Iniciando {nome_app} no PC do mestre...")
                     except: 
                         await message.channel.send("App não encontrado nas minhas lentes. Tem certeza que esse bebê existe?")
             return
 
-        if 'fechar' in comando:
-            nome_app = comando.replace('fechar', '').strip()
+        if intencao == 'fechar':
             async with message.channel.typing():
+                app = await asyncio.to_thread(catalogo_apps.resolver, argumento)
+                nome_app = app.nome if app else argumento
                 await message.channel.send(f"Ativando protocolo de aniquilação remota para {nome_app}...")
                 try: 
                     # Dispara o AppOpener em segundo plano para matar o processo
-                    await asyncio.to_thread(app_close, nome_app, match_closest=True, output=False)
+                    await asyncio.to_thread(AppOpener.close, nome_app, match_closest=True, output=False)
                     await message.channel.send(f"BUM! 💥 {nome_app} foi explodido e removido da RAM da sua máquina!")
                 except: 
                     await message.channel.send("As minhas lentes não acharam esse bebê rodando. Ele já deve estar morto.")
             return
   
 
+        # Conversa com memória por canal (ou por pessoa): a pergunta seguinte reaproveita o context do Ollama
+        sessao = f"discord:{message.channel.id}:{message.author.id}" if SESSAO_POR_USUARIO else f"discord:{message.channel.id}"
         async with message.channel.typing():
-            resposta, _ = await asyncio.to_thread(cerebro_astra, message.content, None)
+            resposta, _ = await cerebro_astra_async(message.content, origem=origem, sessao=sessao)
             for i in range(0, len(resposta), 2000):
                 await message.channel.send(resposta[i:i+2000])
 
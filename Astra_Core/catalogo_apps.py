@@ -0,0 +1,234 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from Astra_Core.config import ARQUIVO_APPS, CATALOGO_PONTUACAO_MINIMA
+from core.partida import modulo_tardio
+from core.terminal import console
+
+winshell = modulo_tardio("winshell")
+
+App = namedtuple("App", "nome alvo origem")
+
+EXTENSOES_ATALHO = (".lnk", ".url", ".appref-ms")
+LIXO_MENU = ("uninstall", "desinstalar", "readme", "leia-me", "help", "ajuda", "website", "manual")
+
+def normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", sem_acento.lower()).split())
+
+def trigramas(texto):
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+# ---------- Os leitores de cada tipo de arquivo ----------
+def _ler_atalho(entrada, origem):
+    nome, extensao = os.path.splitext(entrada.name)
+    if extensao.lower() not in EXTENSOES_ATALHO: return None
+    if any(lixo in nome.lower() for lixo in LIXO_MENU): return None
+    return App(nome.strip(), entrada.path, origem)
+
+def _ler_manifesto_steam(entrada, origem):
+    if not (entrada.name.startswith("appmanifest_") and entrada.name.endswith(".acf")): return None
+    with open(entrada.path, "r", encoding="utf-8", errors="ignore") as f: texto = f.read()
+    appid = re.search(r'"appid"\s+"(\d+)"', texto)
+    nome = re.search(r'"name"\s+"([^"]+)"', texto)
+    if not (appid and nome): return None
+    return App(nome.group(1), f"steam://rungameid/{appid.group(1)}", origem)
+
+def _ler_manifesto_epic(entrada, origem):
+    if not entrada.name.endswith(".item"): return None
+    with open(entrada.path, "r", encoding="utf-8", errors="ignore") as f: dados = json.load(f)
+    if not dados.get("DisplayName") or not dados.get("AppName"): return None
+    return App(dados["DisplayName"], f"com.epicgames.launcher://apps/{dados['AppName']}?action=launch&silent=true", origem)
+
+LEITORES = {"atalho": _ler_atalho, "steam": _ler_manifesto_steam, "epic": _ler_manifesto_epic}
+
+def _pastas_steam():
+    raizes = []
+    try:
+        import winreg
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam") as chave:
+            raizes.append(winreg.QueryValueEx(chave, "SteamPath")[0])
+    except (ImportError, OSError):
+        pass
+    raizes.append(os.path.join(os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)"), "Steam"))
+    bibliotecas = []
+    for raiz in raizes:
+        bibliotecas.append(raiz)
+        # As outras bibliotecas (jogos em outro HD) ficam listadas no libraryfolders.vdf
+        try:
+            with open(os.path.join(raiz, "steamapps", "libraryfolders.vdf"), "r", encoding="utf-8", errors="ignore") as f:
+                bibliotecas += [caminho.replace("\\\\", "\\") for caminho in re.findall(r'"path"\s+"([^"]+)"', f.read())]
+        except OSError:
+            pass
+    # O registro guarda "c:/program files (x86)/steam": normaliza para não varrer a mesma biblioteca duas vezes
+    return list(dict.fromkeys(os.path.normcase(os.path.normpath(os.path.join(b, "steamapps"))) for b in bibliotecas))
+
+def _raizes():
+    """(pasta, origem, leitor, recursivo), na ordem de preferência quando o mesmo nome aparece duas vezes."""
+    raizes = []
+    for origem, descobrir, recursivo in (
+        ("área de trabalho", lambda: winshell.desktop(), False),
+        ("área de trabalho", lambda: winshell.desktop(common=True), False),
+        ("menu iniciar", lambda: winshell.start_menu(), True),
+        ("menu iniciar", lambda: winshell.start_menu(common=True), True),
+    ):
+        try: raizes.append((descobrir(), origem, "atalho", recursivo))
+        except Exception: pass
+    raizes += [(pasta, "steam", "steam", False) for pasta in _pastas_steam()]
+    epic = os.path.join(os.environ.get("ProgramData", r"C:\ProgramData"), "Epic", "EpicGamesLauncher", "Data", "Manifests")
+    raizes.append((epic, "epic", "epic", False))
+    return raizes
+
+# O CATÁLOGO DE BEBÊS: tudo que dá para abrir, indexado por trigramas e carregado uma vez só
+class CatalogoApps:
+    def __init__(self, arquivo=ARQUIVO_APPS):
+        self.arquivo = arquivo
+        self._pastas = {}  # pasta -> {"mtime", "apps", "subpastas"}
+        self._apps = []
+        self._por_chave = {}
+        self._chaves = []
+        self._postagens = {}  # trigrama -> [índices de self._apps]
+        self._trigramas = []
+        self._trava = threading.Lock()
+        self._carregado = False
+        self.pastas_relidas = 0
+
+    # ---------- Disco ----------
+    def _carregar(self):
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f: dados = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if dados.get("versao") != 2: return False  # O astra_apps.json antigo era só a Área de Trabalho: varre de novo
+        self._pastas = {pasta: {**item, "apps": [App(*app) for app in item["apps"]]} for pasta, item in dados["pastas"].items()}
+        self._indexar()
+        return True
+
+    def _gravar(self):
+        dados = {"versao": 2, "pastas": {pasta: {**item, "apps": [list(app) for app in item["apps"]]} for pasta, item in self._pastas.items()}}
+        temporario = self.arquivo + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f: json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+        except OSError as e:
+            console.print(f"[red]Catálogo: falha ao gravar '{self.arquivo}':[/red] {e}")
+
+    def garantir(self):
+        """Carrega do disco na primeira vez (ou varre tudo, se não houver catálogo ainda)."""
+        if self._carregado: return
+        with self._trava:
+            if self._carregado: return
+            if not self._carregar(): self._atualizar()
+            self._carregado = True
+
+    # ---------- Varredura incremental ----------
+    def _varrer(self, pasta, origem, leitor, recursivo, novas):
+        try: mtime = os.stat(pasta).st_mtime
+        except OSError: return
+        item = self._pastas.get(pasta)
+        # Pasta com o mesmo mtime não ganhou nem perdeu arquivos: reaproveita o que já foi lido
+        if item is None or item["mtime"] != mtime:
+            apps, subpastas = [], []
+            try:
+                with os.scandir(pasta) as entradas:
+                    for entrada in entradas:
+                        try:
+                            if entrada.is_dir(): subpastas.append(entrada.path)
+                            else:
+                                app = LEITORES[leitor](entrada, origem)
+                                if app: apps.append(app)
+                        except (OSError, ValueError):
+                            continue
+            except OSError:
+                return
+            item = {"mtime": mtime, "apps": apps, "subpastas": subpastas if recursivo else []}
+            self.pastas_relidas += 1
+        novas[pasta] = item
+        for subpasta in item["subpastas"]: self._varrer(subpasta, origem, leitor, recursivo, novas)
+
+    def _atualizar(self):
+        raizes = _raizes()
+        resultados = [{} for _ in raizes]
+        # Cada raiz (Área de Trabalho, Menu Iniciar, bibliotecas da Steam, Epic) numa thread: o gargalo é o disco
+        with ThreadPoolExecutor(max_workers=max(1, len(raizes))) as executor:
+            futuros = [executor.submit(self._varrer, *raiz, novas) for raiz, novas in zip(raizes, resultados)]
+        pastas = {}
+        for raiz, novas, futuro in zip(raizes, resultados, futuros):
+            try: futuro.result()
+            except Exception as e:
+                # Varredura pela metade não apaga ninguém: essa raiz fica com o que já se sabia dela
+                console.print(f"[red]Catálogo: falha ao varrer '{raiz[0]}' (mantendo o que já estava no catálogo):[/red] {e}")
+                novas = {p: item for p, item in self._pastas.items() if p == raiz[0] or p.startswith(raiz[0].rstrip(os.sep) + os.sep)}
+            pastas.update(novas)
+        mudou = pastas.keys() != self._pastas.keys() or any(pastas[p] is not self._pastas.get(p) for p in pastas)
+        self._pastas = pastas
+        self._indexar()
+        if mudou: self._gravar()
+        return mudou
+
+    def atualizar(self):
+        with self._trava:
+            if not self._carregado: self._carregar()  # Parte do que já estava no disco: só relê o que mudou
+            self._atualizar()
+            self._carregado = True
+        return len(self._apps)
+
+    def atualizar_em_segundo_plano(self):
+        threading.Thread(target=self.atualizar, daemon=True).start()
+
+    # ---------- Índice de trigramas ----------
+    def _indexar(self):
+        apps, por_chave = [], {}
+        for item in self._pastas.values():
+            for app in item["apps"]:
+                chave = normalizar(app.nome)
+                if chave and chave not in por_chave:
+                    por_chave[chave] = len(apps)
+                    apps.append(app)
+        chaves = list(por_chave)
+        tri = [trigramas(chave) for chave in chaves]
+        postagens = {}
+        for indice, conjunto in enumerate(tri):
+            for t in conjunto: postagens.setdefault(t, []).append(indice)
+        # Troca tudo de uma vez: quem estiver buscando agora vê o índice velho inteiro ou o novo inteiro
+        self._apps, self._por_chave, self._chaves, self._trigramas, self._postagens = apps, por_chave, chaves, tri, postagens
+
+    def buscar(self, nome, limite=5):
+        """[(pontuação, App)] do mais parecido para o menos parecido."""
+        self.garantir()
+        consulta = normalizar(nome)
+        if not consulta: return []
+        apps, chaves, tri, postagens = self._apps, self._chaves, self._trigramas, self._postagens
+        exato = self._por_chave.get(consulta)
+        if exato is not None and exato < len(apps): return [(1.0, apps[exato])]
+        tri_consulta = trigramas(consulta)
+        comuns = Counter()
+        for t in tri_consulta: comuns.update(postagens.get(t, ()))
+        ranking = []
+        for indice, iguais in comuns.items():
+            pontos = 2 * iguais / (len(tri_consulta) + len(tri[indice]))  # Coeficiente de Dice
+            if consulta in chaves[indice]: pontos = max(pontos, 0.6 + 0.4 * len(consulta) / len(chaves[indice]))
+            ranking.append((pontos, apps[indice]))
+        ranking.sort(key=lambda par: -par[0])
+        return ranking[:limite]
+
+    def resolver(self, nome):
+        """O App com melhor pontuação, se passar da nota mínima; num erro, uma atualização rápida e mais uma chance."""
+        for tentativa in range(2):
+            achados = self.buscar(nome, limite=1)
+            if achados and achados[0][0] >= CATALOGO_PONTUACAO_MINIMA: return achados[0][1]
+            if tentativa == 0: self.atualizar()  # Só stat nas pastas que não mudaram: é barato
+        return None
+
+    def relatorio(self):
+        self.garantir()
+        por_origem = Counter(app.origem for app in self._apps)
+        return f"{len(self._apps)} aplicativos ({', '.join(f'{n} de {o}' for o, n in por_origem.most_common())})"
+
+catalogo_apps = CatalogoApps()
@@ -1,154 +1,316 @@
-import requests
-import json
 import re
 import time
-import base64
-import os
-import pyautogui
+import asyncio
+import queue
+import threading
+from contextlib import nullcontext
+from PIL import Image
 
-from Astra_Core.config import OLLAMA_URL, MODEL_NAME, SYSTEM_PROMPT, VISION_MODEL
+from Astra_Core.config import MODEL_NAME, SYSTEM_PROMPT, OLLAMA_TIMEOUT_PADRAO, OLLAMA_TIMEOUT_VISAO
+from core.ollama_client import cliente_ollama, ErroOllama, ErroRespostaOllama, ErroCanceladoOllama
+from core.escalonador_gpu import PRIORIDADE_VOZ, PRIORIDADE_DISCORD, PRIORIDADE_FUNDO
+from core.cache_respostas import cache_respostas
+from core.sessoes import armazem_sessoes
+from core.contexto_conversa import GerenteConversas
+from core.perfis_geracao import aplicar_perfil, medidor_perfis
+from core.memoria_semantica import memoria_semantica
 from Astra_Core.voz import falar, console
+from Astra_Core.visao import capturar_tela, descrever_imagem, adescrever_arquivo
 
-# Sistema Anti-Alzaheimer
-ARQUIVO_MEMORIA = "astra_memory.json"
+# Sistema Anti-Alzaheimer (agora com uma gaveta por conversa no cofre de sessões)
+def carregar_memoria(sessao="voz"):
+    return armazem_sessoes.contexto(sessao)
 
-def carregar_memoria():
-    try:
-        with open(ARQUIVO_MEMORIA, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError): # ela ignora se o arquivo estiver corrompido!
-        return None
-
-def salvar_memoria(context):
-    with open(ARQUIVO_MEMORIA, "w") as f:
-        json.dump(context, f)
+def salvar_memoria(context, sessao="voz"):
+    armazem_sessoes.atualizar(sessao, context)
 
 # FILTRO DE CONSCIÊNCIA (Novo poder para calar a boca do DeepSeek)
 def limpar_pensamento(texto):
     """Remove o bloco <think> gerado pelo DeepSeek para a Astra não falar sozinha."""
     return re.sub(r'<think>.*?</think>', '', texto, flags=re.DOTALL).strip()
 
-# O Cérebro da Astra/Ollama
-def cerebro_astra(prompt, context=None):
-    payload = {
+def _sufixo_parcial(texto, marca):
+    # Quantos caracteres do fim do texto podem ser o começo da marca (tag cortada entre dois tokens)
+    for tamanho in range(min(len(marca) - 1, len(texto)), 0, -1):
+        if texto.endswith(marca[:tamanho]): return tamanho
+    return 0
+
+# FILTRO DE CONSCIÊNCIA EM TEMPO REAL (versão streaming do limpar_pensamento)
+class FiltroPensamento:
+    """Máquina de estados que joga fora o <think>...</think> enquanto os tokens ainda estão chegando."""
+    ABRE = "<think>"
+    FECHA = "</think>"
+
+    def __init__(self):
+        self.pensando = False
+        self._pendente = ""
+
+    def alimentar(self, pedaco):
+        texto = self._pendente + pedaco
+        self._pendente = ""
+        saida = []
+        while texto:
+            marca = self.FECHA if self.pensando else self.ABRE
+            pos = texto.find(marca)
+            if pos != -1:
+                if not self.pensando: saida.append(texto[:pos])
+                texto = texto[pos + len(marca):]
+                self.pensando = not self.pensando
+                continue
+            # Segura um pedaço de tag incompleta até o próximo token decidir o que ele é
+            guarda = _sufixo_parcial(texto, marca)
+            if not self.pensando: saida.append(texto[:len(texto) - guarda])
+            self._pendente = texto[len(texto) - guarda:]
+            break
+        return "".join(saida)
+
+    def finalizar(self):
+        resto = "" if self.pensando else self._pendente
+        self._pendente = ""
+        return resto
+
+# O FATIADOR DE FRASES (entrega cada frase pronta para a boca da Astra)
+class SeparadorFrases:
+    FIM_DE_FRASE = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+    def __init__(self):
+        self._buffer = ""
+
+    def alimentar(self, texto):
+        self._buffer += texto
+        frases = []
+        while True:
+            fim = self.FIM_DE_FRASE.search(self._buffer)
+            if not fim: break
+            frase = self._buffer[:fim.end()].strip()
+            self._buffer = self._buffer[fim.end():]
+            if frase: frases.append(frase)
+        return frases
+
+    def finalizar(self):
+        frase = self._buffer.strip()
+        self._buffer = ""
+        return [frase] if frase else []
+
+def _gerar_em_fluxo(payload, ao_falar, prioridade, origem):
+    """Consome o NDJSON do Ollama e manda cada frase limpa para a voz enquanto o resto ainda é gerado."""
+    filtro = FiltroPensamento()
+    separador = SeparadorFrases()
+    fila_frases = queue.Queue()
+
+    # A boca roda numa thread própria para a leitura do stream nunca ficar esperando o áudio acabar
+    def locutor():
+        while True:
+            frase = fila_frases.get()
+            if frase is None: return
+            try: ao_falar(frase)
+            except Exception as e: console.print(f"[red]Erro na fala em fluxo:[/red] {e}")
+
+    boca = threading.Thread(target=locutor, daemon=True)
+    boca.start()
+
+    partes = []
+    final = {}
+    try:
+        for pedaco in cliente_ollama.gerar_fluxo(payload, OLLAMA_TIMEOUT_PADRAO, prioridade, origem):
+            texto = filtro.alimentar(pedaco.get("response", ""))
+            partes.append(texto)
+            for frase in separador.alimentar(texto): fila_frases.put(frase)
+            if pedaco.get("done"): final = pedaco
+
+        resto = filtro.finalizar()
+        partes.append(resto)
+        for frase in separador.alimentar(resto) + separador.finalizar(): fila_frases.put(frase)
+    finally:
+        fila_frases.put(None)
+        boca.join()
+
+    final["response"] = "".join(partes).strip()
+    return final
+
+def _payload_chat(prompt, context, perfil="conversa"):
+    return aplicar_perfil({
         "model": MODEL_NAME,
         "prompt": prompt,
         "system": SYSTEM_PROMPT,
         "stream": False,
         "context": context
-    }
-    try:
-        response = requests.post(OLLAMA_URL, json=payload)
-        data = response.json()
-        
-        novo_contexto = data.get("context")
-        salvar_memoria(novo_contexto)
-        
-        # Filtra a resposta antes de devolver (O segredo do R1:8b)
-        resposta_limpa = limpar_pensamento(data["response"])
-        return resposta_limpa, novo_contexto 
-        
-    except Exception as e:
-        console.print(f"[red]Erro no cérebro:[/red] {e}")
-        return "Estou com dor de cabeça (Erro de conexão).", context
-    
+    }, perfil)
+
+def _resumir_conversa(prompt_resumo):
+    return _gerar_texto({"prompt": prompt_resumo}, "resumo", PRIORIDADE_FUNDO, "resumo", "resumo")
+
+# As conversas vivas (voz, canais e pessoas do Discord), cada uma com o seu orçamento de tokens
+gerente_conversas = GerenteConversas(_resumir_conversa)
+
+def obter_conversa(sessao):
+    return gerente_conversas.obter(sessao)
+
+def _segurar_conversa(sessao):
+    return gerente_conversas.usar(sessao) if sessao else nullcontext()
+
+def _preparar_payload(prompt, context, sessao, perfil, lembrancas=""):
+    # Com sessão, quem manda no context é a conversa (o parâmetro context é ignorado)
+    # e o perfil é sempre o de conversa: o context do Ollama só serve para o modelo que o gerou
+    if sessao:
+        prompt, context = obter_conversa(sessao).preparar(prompt)
+        perfil = "conversa"
+        # O que já saiu do context (ou de semanas atrás) volta só quando tem a ver com a pergunta
+        if lembrancas: prompt = f"{lembrancas}\n{prompt}"
+    return _payload_chat(prompt, context, perfil)
+
+def _digerir_resposta(data, prompt, sessao):
+    # Filtra a resposta antes de devolver (O segredo do R1:8b)
+    resposta = limpar_pensamento(data["response"])
+    # Só conversa de verdade atualiza a própria memória (prompt avulso de ferramenta não apaga a voz)
+    if sessao:
+        obter_conversa(sessao).registrar(prompt, resposta, data)
+        memoria_semantica.lembrar(sessao, prompt, resposta)
+    return resposta, data.get("context")
+
+def _chave_cache(payload):
+    return cache_respostas.chave(payload["model"], payload.get("system"), payload["prompt"], payload.get("options"))
+
+# Toda geração passa pelo cronômetro: latência e tokens por intenção
+def _gerar_medido(payload, perfil, prioridade, origem, intencao, ao_falar=None, timeout=OLLAMA_TIMEOUT_PADRAO):
+    inicio = time.perf_counter()
+    if ao_falar: data = _gerar_em_fluxo(payload, ao_falar, prioridade, origem)
+    else: data = cliente_ollama.gerar(payload, timeout, prioridade, origem)
+    medidor_perfis.registrar(intencao, perfil, data, time.perf_counter() - inicio)
+    return data
+
+async def _agerar_medido(payload, perfil, prioridade, origem, intencao, timeout=OLLAMA_TIMEOUT_PADRAO):
+    inicio = time.perf_counter()
+    data = await cliente_ollama.agerar(payload, timeout, prioridade, origem)
+    medidor_perfis.registrar(intencao, perfil, data, time.perf_counter() - inicio)
+    return data
+
+def _gerar_texto(payload, perfil, prioridade, origem, intencao):
+    payload = aplicar_perfil({"stream": False, **payload}, perfil)
+    return limpar_pensamento(_gerar_medido(payload, perfil, prioridade, origem, intencao)["response"])
+
+RESPOSTA_ERRO_CEREBRO = "Estou com dor de cabeça (Erro de conexão)."
+
+# O Cérebro da Astra/Ollama
+# Com ao_falar, a resposta vem em streaming e cada frase já vai sendo falada antes do modelo terminar
+# Sem prioridade explícita é narração de ferramenta: entra no fim da fila da GPU
+# usar_cache só vale para perguntas avulsas (sem context): o mesmo anime/PDF não é gerado duas vezes
+# sessao diz qual conversa carrega e guarda o context (None = pergunta avulsa, não guarda nada)
+# perfil escolhe modelo/options (ver PERFIS_GERACAO); intencao é só o rótulo do cronômetro
+def cerebro_astra(prompt, context=None, ao_falar=None, prioridade=PRIORIDADE_FUNDO, origem="ferramentas", usar_cache=False, sessao=None,
+                  perfil="conversa", intencao=None):
+    # A conversa fica presa na RAM até o turno ser registrado: o salão não a despeja no meio da geração
+    with _segurar_conversa(sessao):
+        lembrancas = memoria_semantica.contexto(prompt, sessao, prioridade, origem) if sessao else ""
+        payload = _preparar_payload(prompt, context, sessao, perfil, lembrancas)
+        perfil = "conversa" if sessao else perfil
+        intencao = intencao or perfil
+        try:
+            if usar_cache and context is None and not sessao and not ao_falar:
+                gerar = lambda: limpar_pensamento(_gerar_medido(payload, perfil, prioridade, origem, intencao)["response"])
+                return cache_respostas.obter_ou_gerar(_chave_cache(payload), gerar), None
+            data = _gerar_medido(payload, perfil, prioridade, origem, intencao, ao_falar)
+            return _digerir_resposta(data, prompt, sessao)
+
+        except ErroCanceladoOllama:
+            return "", context  # Tirado da fila de propósito (o criador mudou de assunto): não é erro
+        except Exception as e:
+            console.print(f"[red]Erro no cérebro:[/red] {e}")
+            if ao_falar: ao_falar(RESPOSTA_ERRO_CEREBRO)
+            return RESPOSTA_ERRO_CEREBRO, context
+
+# O mesmo cérebro, mas sem queimar thread: o Discord espera direto no event loop dele
+async def cerebro_astra_async(prompt, context=None, prioridade=PRIORIDADE_DISCORD, origem="discord", usar_cache=False, sessao=None,
+                              perfil="conversa", intencao=None):
+    # A conversa fica presa na RAM até o turno ser registrado: o salão não a despeja no meio da geração
+    with _segurar_conversa(sessao):
+        # O vetor da pergunta é uma chamada HTTP bloqueante: fora do event loop do Discord
+        lembrancas = await asyncio.to_thread(memoria_semantica.contexto, prompt, sessao, prioridade, origem) if sessao else ""
+        payload = _preparar_payload(prompt, context, sessao, perfil, lembrancas)
+        perfil = "conversa" if sessao else perfil
+        intencao = intencao or perfil
+        try:
+            if usar_cache and context is None and not sessao:
+                async def agerar():
+                    return limpar_pensamento((await _agerar_medido(payload, perfil, prioridade, origem, intencao))["response"])
+                return await cache_respostas.aobter_ou_gerar(_chave_cache(payload), agerar), None
+            data = await _agerar_medido(payload, perfil, prioridade, origem, intencao)
+            return _digerir_resposta(data, prompt, sessao)
+        except Exception as e:
+            console.print(f"[red]Erro no cérebro:[/red] {e}")
+            return RESPOSTA_ERRO_CEREBRO, context
+
+# Peças compartilhadas do Olho de Agamotto
+def _payload_traducao(descricao_ingles, prompt_usuario):
+    prompt_traducao = f"""
+    <role>Astra</role>
+    <directive>Traduza e interprete a descrição visual abaixo baseando-se na pergunta do usuário.</directive>
+    <visual_description>{descricao_ingles}</visual_description>
+    <user_question>{prompt_usuario if prompt_usuario else "O que é isso?"}</user_question>
+    """
+    return aplicar_perfil({"prompt": prompt_traducao, "stream": False}, "traducao_visao")
+
 # Olho de Agamotto (Lê a tela do PC)
 def analisar_tela(prompt_usuario):
     falar("Analisando a tela... (Um momento)")
     
-    caminho_img = "temp_vision.png"
-    
-    # 1. Print e Tratamento da Imagem
-    time.sleep(1.0) 
-    pyautogui.screenshot(caminho_img)
-    
-    if os.path.getsize(caminho_img) < 1000: return "Erro: O print saiu vazio."
+    # 1. Print direto na memória (nada de temp_vision.png indo e voltando do disco)
+    try: tela = capturar_tela()
+    except Exception as e: return f"Erro ao capturar a tela: {e}"
 
-    try:
-        with open(caminho_img, "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode('utf-8')
-    except: return "Erro ao processar imagem."
+    if not tela.getbbox(): return "Erro: O print saiu vazio."
     
     # 2. PASSO A: O Moondream descreve em INGLÊS (Para garantir a precisão)
-    payload_visao = {
-        "model": VISION_MODEL,
-        "prompt": "Describe this image in detail. If there is text, read it.", 
-        "stream": False,
-        "images": [img_b64]
-    }
-    
-    descricao_ingles = ""
-    
+    # Tela quase igual à de agora há pouco reaproveita a descrição; senão entra no lote de visão
     try:
-        # TIMEOUT AUMENTADO PARA 180 SEGUNDOS (Para a RTX 2060 não morrer no swap)
-        response = requests.post(OLLAMA_URL, json=payload_visao, timeout=180)
-        if response.status_code == 200:
-            descricao_ingles = response.json()["response"]
-            if os.path.exists(caminho_img): os.remove(caminho_img)
-        else:
-            return f"Erro na visão: {response.status_code}"
-    except Exception as e:
+        descricao_ingles = descrever_imagem(tela, prioridade=PRIORIDADE_VOZ)
+    except ErroRespostaOllama as e:
+        return f"Erro na visão: {e.status}"
+    except ErroOllama as e:
         return f"O modelo de visão demorou demais ou falhou: {e}"
 
     # 3. PASSO B: O DeepSeek traduz para PORTUGUÊS (JACKPOT!)
-    prompt_traducao = f"""
-    <role>Astra</role>
-    <directive>Traduza e interprete a descrição visual abaixo baseando-se na pergunta do usuário.</directive>
-    <visual_description>{descricao_ingles}</visual_description>
-    <user_question>{prompt_usuario if prompt_usuario else "O que é isso?"}</user_question>
-    """
-
-    payload_traducao = {"model": MODEL_NAME, "prompt": prompt_traducao, "stream": False}
-
     try:
         falar("Processando a imagem com a lógica avançada...")
-        response_trad = requests.post(OLLAMA_URL, json=payload_traducao, timeout=180)
-        if response_trad.status_code == 200:
-            # Filtra o pensamento da tradução também!
-            return limpar_pensamento(response_trad.json()["response"])
-        else:
-            return "Consegui ver (em inglês), mas falhei ao traduzir."
-    except:
+        # Filtra o pensamento da tradução também!
+        return limpar_pensamento(_gerar_medido(_payload_traducao(descricao_ingles, prompt_usuario), "traducao_visao", PRIORIDADE_VOZ, "voz", "visao", timeout=OLLAMA_TIMEOUT_VISAO)["response"])
+    except (ErroRespostaOllama, KeyError):  # KeyError: JSON sem "response"
+        return "Consegui ver (em inglês), mas falhei ao traduzir."
+    except ErroOllama:
         return f"Vi isto: {descricao_ingles} (Falha na tradução)"
 
 # Olho de Agamotto Modificado (Lê arquivos enviados no Discord)
-def analisar_imagem_direta(caminho_img, prompt_usuario):
+def analisar_imagem_direta(caminho_img, prompt_usuario, prioridade=PRIORIDADE_DISCORD, origem="discord"):
     try:
-        with open(caminho_img, "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode('utf-8')
+        with Image.open(caminho_img) as imagem:
+            descricao_ingles = descrever_imagem(imagem, prioridade=prioridade)
+    except ErroRespostaOllama as e:
+        return f"Erro na visão: {e.status}"
+    except ErroOllama as e:
+        return f"O modelo de visão demorou demais ou falhou: {e}"
     except Exception as e:
         return f"As minhas lentes não conseguiram focar no arquivo: {e}"
-    
-    payload_visao = {
-        "model": VISION_MODEL,
-        "prompt": "Describe this image in detail. If there is text, read it.", 
-        "stream": False,
-        "images": [img_b64]
-    }
-    
-    descricao_ingles = ""
+
     try:
-        response = requests.post(OLLAMA_URL, json=payload_visao, timeout=180)
-        if response.status_code == 200:
-            descricao_ingles = response.json()["response"]
-        else:
-            return f"Erro na visão: {response.status_code}"
-    except Exception as e:
-        return f"O modelo de visão demorou demais ou falhou: {e}"
+        return limpar_pensamento(_gerar_medido(_payload_traducao(descricao_ingles, prompt_usuario), "traducao_visao", prioridade, origem, "visao", timeout=OLLAMA_TIMEOUT_VISAO)["response"])
+    except (ErroRespostaOllama, KeyError):  # KeyError: JSON sem "response"
+        return "Consegui ver (em inglês), mas falhei ao traduzir."
+    except ErroOllama:
+        return f"Vi isto: {descricao_ingles} (Falha na tradução)"
 
-    prompt_traducao = f"""
-    <role>Astra</role>
-    <directive>Traduza e interprete a descrição visual abaixo baseando-se na pergunta do usuário.</directive>
-    <visual_description>{descricao_ingles}</visual_description>
-    <user_question>{prompt_usuario if prompt_usuario else "O que é isso?"}</user_question>
-    """
-    payload_traducao = {"model": MODEL_NAME, "prompt": prompt_traducao, "stream": False}
+async def analisar_imagem_direta_async(caminho_img, prompt_usuario, origem="discord"):
+    try:
+        descricao_ingles = await adescrever_arquivo(caminho_img, prioridade=PRIORIDADE_DISCORD)
+    except ErroRespostaOllama as e:
+        return f"Erro na visão: {e.status}"
+    except ErroOllama as e:
+        return f"O modelo de visão demorou demais ou falhou: {e}"
+    except Exception as e:
+        return f"As minhas lentes não conseguiram focar no arquivo: {e}"
 
     try:
-        response_trad = requests.post(OLLAMA_URL, json=payload_traducao, timeout=180)
-        if response_trad.status_code == 200:
-            return limpar_pensamento(response_trad.json()["response"])
-        else:
-            return "Consegui ver (em inglês), mas falhei ao traduzir."
-    except:
-        return f"Vi isto: {descricao_ingles} (Falha na tradução)"
\ No newline at end of file
+        return limpar_pensamento((await _agerar_medido(_payload_traducao(descricao_ingles, prompt_usuario), "traducao_visao", PRIORIDADE_DISCORD, origem, "visao", timeout=OLLAMA_TIMEOUT_VISAO))["response"])
+    except (ErroRespostaOllama, KeyError):  # KeyError: JSON sem "response"
+        return "Consegui ver (em inglês), mas falhei ao traduzir."
+    except ErroOllama:
+        return f"Vi isto: {descricao_ingles} (Falha na tradução)"
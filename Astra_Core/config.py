@@ -1,6 +1,129 @@
-OLLAMA_URL = "http://localhost:11434/api/generate"
+import os
+
+OLLAMA_HOST = "http://localhost:11434"
+OLLAMA_URL = f"{OLLAMA_HOST}/api/generate"
 MODEL_NAME = "deepseek-r1:8b" # O Cérebro
 VISION_MODEL = "minicpm-v" # O Olho de Agamotto
+MODELO_LEVE = "qwen2.5:3b" # A Boca Rápida (narração de ferramentas, sem raciocínio)
+MODELO_EMBEDDINGS = "nomic-embed-text" # A Memória de Elefante (só vetores, ~270 MB de VRAM)
+
+# Tempos de paciência da Ponte Neural (segundos)
+OLLAMA_TIMEOUT_CONEXAO = 5
+OLLAMA_TIMEOUT_PADRAO = 300 # O R1 pensa MUITO antes de responder
+OLLAMA_TIMEOUT_VISAO = 180 # Para a RTX 2060 não morrer no swap
+OLLAMA_TENTATIVAS = 3
+OLLAMA_PARALELO = 1 # Quantas gerações a GPU aguenta ao mesmo tempo (igual ao OLLAMA_NUM_PARALLEL)
+
+# Residência na VRAM: o cérebro mora na placa, o olho só visita
+KEEP_ALIVE_MODELOS = {MODEL_NAME: "30m", MODELO_EMBEDDINGS: "30m", MODELO_LEVE: "30m", VISION_MODEL: "2m"}
+# Quem pede para morar na placa, em ordem de prioridade, e quantos GB ocupa já com o context dos perfis.
+# Só fica fixo quem couber no orçamento; o resto ganha KEEP_ALIVE_FORA_DO_ORCAMENTO (senão cérebro e boca rápida se despejam um ao outro)
+VRAM_ORCAMENTO_GB = 7.0 # Placa de 8 GB: o resto é do Windows e da tela
+VRAM_RESIDENTES_GB = {MODEL_NAME: 5.8, MODELO_EMBEDDINGS: 0.5, MODELO_LEVE: 2.6}
+KEEP_ALIVE_FORA_DO_ORCAMENTO = "1m"
+KEEP_ALIVE_VISAO_FIM_LOTE = 0 # Depois do lote de imagens, a visão libera a VRAM na hora
+VISAO_JANELA_LOTE = 0.25 # Segundos esperando mais imagens para descrever tudo de uma vez
+VISAO_MAX_LOTE = 6
+VISAO_LADO_MAXIMO = 1024 # Pixels no maior lado: o minicpm-v não aproveita um print 4K inteiro
+VISAO_QUALIDADE_JPEG = 85
+VISAO_TAMANHO_HASH = 16 # dHash de 16x16 = 256 bits
+VISAO_DISTANCIA_MAXIMA = 8 # Bits diferentes tolerados para considerar a tela "a mesma"
+VISAO_CACHE_TTL = 5 * 60 # Segundos que uma descrição de tela continua valendo
+VISAO_CACHE_TAMANHO = 16
+
+# Cache de respostas do LLM (perguntas repetidas das ferramentas)
+ARQUIVO_CACHE_RESPOSTAS = "astra_cache_respostas.db"
+CACHE_RESPOSTAS_CAPACIDADE = 256 # Entradas na RAM
+CACHE_RESPOSTAS_MAX_DISCO = 5000 # Entradas no disco
+CACHE_RESPOSTAS_TTL = 6 * 3600 # Segundos
+
+# A rede das ferramentas (geocodificação, clima, busca, anime): uma sessão só, timeout sempre e cache no disco
+# As URLs aceitam variável de ambiente para apontar as ferramentas para um servidor de mentira nos testes
+URL_GEOCODIFICACAO = os.getenv("ASTRA_URL_GEOCODIFICACAO", "https://api.opencagedata.com/geocode/v1/json")
+URL_CLIMA = os.getenv("ASTRA_URL_CLIMA", "https://api.open-meteo.com/v1/forecast")
+URL_ANIME = os.getenv("ASTRA_URL_ANIME", "https://api.jikan.moe/v4/anime")
+ARQUIVO_CACHE_REDE = "astra_cache_rede.db"
+REDE_TIMEOUT = (4, 12) # Segundos (conectar, ler): API lenta não pode travar a voz para sempre
+REDE_TENTATIVAS = 2 # Só para 502/503/504 e conexão recusada
+# Por tipo de endpoint, em segundos: "fresco" serve direto; depois disso, até "velho" serve o que tem e revalida em segundo plano
+# (None = para sempre; passou do "velho", espera a rede de novo)
+POLITICAS_REDE = {
+    "geocodificacao": {"fresco": None, "velho": None}, # Cidade não muda de lugar
+    "clima": {"fresco": 10 * 60, "velho": 3 * 3600},
+    "busca": {"fresco": 3600, "velho": 24 * 3600},
+    "anime": {"fresco": 24 * 3600, "velho": 30 * 24 * 3600},
+}
+
+# Sessões de conversa (o antigo astra_memory.json é migrado para a sessão "voz")
+PASTA_SESSOES = "astra_sessoes"
+ARQUIVO_MEMORIA_ANTIGA = "astra_memory.json"
+SESSOES_ATRASO_GRAVACAO = 2.0 # Segundos juntando atualizações antes de gravar no disco
+
+# Lembretes (data e hora completas; os antigos "HH:MM" são convertidos na primeira leitura)
+ARQUIVO_LEMBRETES = "astra_reminders.json"
+LEMBRETES_VIGIA_MAXIMA = 30 # Segundos máximos dormindo entre conferências (o relógio pode pular se o PC hibernar)
+
+# Catálogo de apps (Área de Trabalho, Menu Iniciar, Steam e Epic), relido só nas pastas que mudaram
+ARQUIVO_APPS = "astra_apps.json"
+CATALOGO_PONTUACAO_MINIMA = 0.45 # Abaixo disso o nome falado não parece com nenhum app do catálogo
+
+# Índice de arquivos do "mande o arquivo" (Área de Trabalho, Documentos e Downloads)
+ARQUIVO_INDICE_ARQUIVOS = "astra_indice_arquivos.db"
+INDICE_ARQUIVOS_INTERVALO = 10 * 60 # Segundos entre uma revarredura incremental e outra
+INDICE_ARQUIVOS_IGNORAR = {"node_modules", ".git", "__pycache__", "$recycle.bin", ".venv", "venv"}
+
+# O Grande Sábio: PDFs inteiros viram trechos indexados (BM25), e só os trechos que importam vão para o modelo
+PASTA_DOCUMENTOS = "astra_documentos"
+DOCUMENTO_TRECHO_PALAVRAS = 180 # Tamanho de cada trecho
+DOCUMENTO_TRECHO_SOBREPOSICAO = 40 # Palavras repetidas entre trechos vizinhos (a frase cortada no meio aparece inteira em um deles)
+DOCUMENTO_TOP_K = 6 # Trechos enviados por pergunta (6 x 180 palavras cabe folgado no num_ctx do perfil "documento")
+DOCUMENTOS_NA_RAM = 8 # Documentos indexados mantidos na memória
+PDF_PROCESSOS = max(1, min(4, (os.cpu_count() or 2) - 1)) # Processos extraindo páginas ao mesmo tempo (um núcleo fica para a Astra)
+PDF_PAGINAS_POR_LOTE = 16 # Mínimo de páginas que cada processo extrai por vez
+PDF_MINIMO_PARALELO = 32 # Abaixo disso o custo de subir os processos não se paga: extrai aqui mesmo
+
+# Sentido Aranha: uma thread amostra CPU/RAM o tempo todo e as ferramentas respondem da última amostra
+TELEMETRIA_INTERVALO = 2 # Segundos entre amostras de CPU/RAM do sistema
+TELEMETRIA_INTERVALO_PROCESSOS = 6 # Segundos entre varreduras da lista de processos (é a parte cara)
+TELEMETRIA_JANELA = 15 * 60 # Segundos de histórico guardados nos anéis
+TELEMETRIA_JANELA_TENDENCIA = 5 * 60 # Segundos olhados para dizer "subindo" ou "descendo"
+
+# Como cada ferramenta responde:
+#   "imediato" = só a resposta montada com os dados (na hora, sem GPU)
+#   "hibrido"  = a resposta montada na hora + o comentário da Astra depois (descartado se o criador já mudou de assunto)
+#   "llm"      = só o comentário da Astra, como antigamente (espera o modelo inteiro)
+MODOS_RESPOSTA = {
+    "hardware": "hibrido",
+    "processos": "hibrido",
+    "clima": "imediato",
+    "anime": "hibrido",
+}
+
+# Orçamento do context: passou disso, os turnos antigos viram resumo
+CONTEXTO_ORCAMENTO_TOKENS = 3000 # Bem abaixo do num_ctx para o prompt eval não explodir
+CONTEXTO_TURNOS_RECENTES = 4 # Turnos mantidos palavra por palavra
+CONVERSAS_MAX_VIVAS = 32 # Conversas (voz + canais/pessoas do Discord) mantidas na RAM ao mesmo tempo
+CONVERSAS_OCIOSIDADE = 30 * 60 # Segundos parada até a conversa ir dormir no disco
+
+# Memória de longo prazo: cada troca vira um vetor, e as lembranças parecidas com a pergunta voltam para o prompt
+PASTA_MEMORIA_SEMANTICA = "astra_memoria"
+MEMORIA_TOP_K = 3 # Lembranças injetadas por pergunta
+MEMORIA_SIMILARIDADE_MINIMA = 0.55 # Cosseno abaixo disso é lembrança fora de assunto
+MEMORIA_TIMEOUT = 15 # Segundos de leitura do HTTP ao vetorizar uma troca nova (em segundo plano)
+MEMORIA_PRAZO_RECORDAR = 1.0 # Segundos para o vetor da pergunta, contando a fila da GPU e a leitura (estourou: responde sem lembranças)
+MEMORIA_PREFIXOS = ("search_document: ", "search_query: ") # O nomic-embed-text pede esses prefixos
+
+# Perfis de geração: cada tipo de pedido com o modelo e as options que ele merece
+# "pensar" liga/desliga o <think> (só é enviado para os modelos de MODELOS_QUE_PENSAM)
+MODELOS_QUE_PENSAM = {MODEL_NAME}
+PERFIS_GERACAO = {
+    "conversa": {"model": MODEL_NAME, "num_ctx": 4096, "temperature": 0.8, "pensar": True},
+    # O num_predict conta também os tokens do <think>: o deepseek-r1 raciocina centenas deles antes da primeira palavra da resposta
+    "documento": {"model": MODEL_NAME, "num_ctx": 8192, "num_predict": 2048, "temperature": 0.3, "pensar": True},
+    "traducao_visao": {"model": MODEL_NAME, "num_ctx": 4096, "num_predict": 400, "temperature": 0.4, "pensar": False},
+    "narracao": {"model": MODELO_LEVE, "num_ctx": 2048, "num_predict": 180, "temperature": 0.9, "stop": ["</directive>", "<role>"]},
+    "resumo": {"model": MODELO_LEVE, "num_ctx": 4096, "num_predict": 300, "temperature": 0.2},
+}
 
 SYSTEM_PROMPT = """
 <role>
@@ -1,18 +1,8 @@
 import os
 import json
 import time
-import requests
-import pyautogui
-import screen_brightness_control as sbc
 from ctypes import cast, POINTER
-import comtypes
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
 from datetime import datetime, timedelta
-import winshell
-from ddgs import DDGS
-import PyPDF2
-import psutil
 from dotenv import load_dotenv
 import shutil
 from pathlib import Path
@@ -20,12 +10,27 @@ from pathlib import Path
 # Importações internas do laboratório
 from Astra_Core.voz import falar, console
 from Astra_Core.cerebro import cerebro_astra
+from core.agenda_lembretes import agenda_lembretes
+from Astra_Core.catalogo_apps import catalogo_apps
+from Astra_Core.indice_arquivos import indice_arquivos
+from core.indice_documentos import indice_documentos
+from core.telemetria import sensor_telemetria
+from Astra_Core.resposta_hibrida import responder
+from core.rede import rede, ErroRede
+from Astra_Core.config import URL_GEOCODIFICACAO, URL_CLIMA, URL_ANIME
+from core.partida import modulo_tardio
+
+# As dependências pesadas das ferramentas só entram na memória no primeiro uso (ou no aquecimento depois do prompt)
+pyautogui = modulo_tardio("pyautogui")
+sbc = modulo_tardio("screen_brightness_control")
+comtypes = modulo_tardio("comtypes")
+pycaw = modulo_tardio("pycaw.pycaw")
+winshell = modulo_tardio("winshell")
 
 
 # Reciclando API´s da Sexta-Feira
 load_dotenv()
 OPENCAGE_KEY = os.getenv("OPENCAGE_KEY")
-OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
 
 # INDIVIDUALIDADE: MESTRE DE ARQUIVOS
 def listar_arquivos(diretorio="."):
@@ -46,27 +51,12 @@ def modificar_arquivo(caminho, novo_conteudo, modo="w"):
         return f"Falha na cirurgia do arquivo: {e}"
     
 def buscar_arquivo_local(nome_alvo):
-    # Para não fritar o PC pesquisando no C: inteiro, vamos focar no ninho do mestre!
-    pastas_alvo = [
-        winshell.desktop(),
-        winshell.my_documents(),
-        os.path.join(os.path.expanduser("~"), "Downloads")
-    ]
-    
-    nome_alvo_lower = nome_alvo.lower()
-    
-    for pasta in pastas_alvo:
-        if not os.path.exists(pasta): continue
-        
-        # O os.walk vai entrar em TODAS as subpastas!
-        for raiz, _, arquivos in os.walk(pasta):
-            for arquivo in arquivos:
-                # Se uma parte do nome bater, é jackpot!
-                if nome_alvo_lower in arquivo.lower():
-                    caminho_completo = os.path.join(raiz, arquivo)
-                    return caminho_completo
-                    
-    return None
+    # O Cão Farejador agora tem memória: o índice (Astra_Core/indice_arquivos.py) já varreu o ninho do mestre
+    return indice_arquivos.melhor(nome_alvo)
+
+def candidatos_arquivo_local(nome_alvo, limite=5):
+    """[(pontos, caminho)] dos arquivos mais parecidos com o nome, do melhor para o pior."""
+    return indice_arquivos.buscar(nome_alvo, limite=limite)
 
 # Astra o demônio do controle
 # Em hipótese alguma altere o código do volume! É gambiarra pura, nem eu mesmo sei como funciona. O Dio Brando morreu por muito menos!
@@ -75,9 +65,9 @@ def mudar_volume(nivel):
         try: comtypes.CoInitialize()
         except: pass
         
-        device = AudioUtilities.GetSpeakers()
+        device = pycaw.AudioUtilities.GetSpeakers()
         interface = device.EndpointVolume
-        volume = cast(interface, POINTER(IAudioEndpointVolume))
+        volume = cast(interface, POINTER(pycaw.IAudioEndpointVolume))
         
         vol_float = min(max(int(nivel) / 100, 0.0), 1.0)
         volume.SetMasterVolumeLevelScalar(vol_float, None)
@@ -99,79 +89,35 @@ def tirar_print():
     pyautogui.screenshot(nome_arquivo)
     return f"Foto da tela capturada: {nome_arquivo}."    
 
-# Sistema Anti-Alzaheimer e Lembretes
-ARQUIVO_LEMBRETES = "astra_reminders.json"
-
+# Sistema Anti-Alzaheimer e Lembretes (o despertador de verdade mora em core/agenda_lembretes.py)
 def agendar_lembrete(tarefa, minutos):
-    hora_alvo = datetime.now() + timedelta(minutes=int(minutos))
-    lembrete = {"tarefa": tarefa, "horario": hora_alvo.strftime("%H:%M")}
-    lista = []
-    try:
-        with open(ARQUIVO_LEMBRETES, "r") as f: lista = json.load(f)
-    except: pass
-    
-    lista.append(lembrete)
-    with open(ARQUIVO_LEMBRETES, "w") as f: json.dump(lista, f)
+    hora_alvo = agenda_lembretes.agendar(tarefa, datetime.now() + timedelta(minutes=int(minutos)))
     return f"Ok, vou te lembrar de {tarefa} às {hora_alvo.strftime('%H:%M')}."
 
-def checar_lembretes():
-    try:
-        with open(ARQUIVO_LEMBRETES, "r") as f: lista = json.load(f)
-    except: return None
-
-    agora = datetime.now().strftime("%H:%M")
-    nova_lista = []
-    lembrete_ativo = None
-
-    for item in lista:
-        if item["horario"] == agora: lembrete_ativo = item["tarefa"]
-        else: nova_lista.append(item)
-    
-    if lembrete_ativo:
-        with open(ARQUIVO_LEMBRETES, "w") as f: json.dump(nova_lista, f)
-    return lembrete_ativo
-
 # PROTOCOLO RADAR (Mapeamento de Apps e Jogos)
-ARQUIVO_APPS = "astra_apps.json"
-
 def escanear_sistema():
     falar("Iniciando varredura da Área de Trabalho. Buscando executáveis e jogos...")
-    desktop = winshell.desktop()
-    apps_encontrados = {}
     try:
-        for arquivo in os.listdir(desktop):
-            if arquivo.endswith(".lnk") or arquivo.endswith(".url"):
-                nome_limpo = arquivo.replace(".lnk", "").replace(".url", "").lower().strip()
-                caminho_completo = os.path.join(desktop, arquivo)
-                apps_encontrados[nome_limpo] = caminho_completo
-        with open(ARQUIVO_APPS, "w", encoding="utf-8") as f:
-            json.dump(apps_encontrados, f, indent=4)
-        return f"Varredura concluída. Mapeei {len(apps_encontrados)} aplicativos na sua Área de Trabalho."
+        catalogo_apps.atualizar()
+        return f"Varredura concluída. Mapeei {catalogo_apps.relatorio()}."
     except Exception as e: return f"Erro ao escanear o sistema: {e}"
 
 # O RADAR DE PROCESSOS 
-def radar_de_processos():
+def _linha_processo(p):
+    instancias = f" x{p['instancias']}" if p["instancias"] > 1 else ""
+    cpu = f"{p['cpu']:.0f}% CPU" if p["cpu"] is not None else "CPU ainda medindo"
+    return f"{p['nome']}{instancias} ({p['ram']:.1f}% RAM, {cpu})"
+
+def radar_de_processos(entregar=None, chave="voz"):
     console.print("[bold yellow]Infiltrando no Gestor de Tarefas do computador...[/bold yellow]")
     
-    processos_vivos = []
-    # pega apenas o que consome mais de 0.5% de RAM
-    for proc in psutil.process_iter(['name', 'memory_percent']):
-        try:
-            mem = proc.info['memory_percent']
-            nome = proc.info['name']
-            if mem is not None and mem > 0.5:
-                processos_vivos.append(f"{nome} ({mem:.1f}% RAM)")
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess): 
-            pass
-    
-    # Limpando duplicatas
-    processos_unicos = list(set(processos_vivos))
+    # A última varredura do sensor de plantão, já somando as instâncias (30 chrome.exe viram um só) e em ordem de RAM
+    maiores = [p for p in sensor_telemetria.top_processos(15) if p["ram"] > 0.5]
     
-    if not processos_unicos:
-        lista_proc = "Apenas processos fantasmas e silenciosos do Windows."
-    else:
-        # Pega os 15 maiores
-        lista_proc = "\n".join(processos_unicos[:15]) 
+    if not maiores:
+        return "Apenas processos fantasmas e silenciosos do Windows."
+    imediata = "Os maiores comilões de RAM agora: " + "; ".join(_linha_processo(p) for p in maiores[:5]) + "."
+    lista_proc = "\n".join(_linha_processo(p) for p in maiores)
     
 # A COLEIRA DE REALIDADE: Instruções muito mais rígidas para o LLM não inventar coisas
     prompt = f"""
@@ -187,33 +133,37 @@ def radar_de_processos():
     2. NÃO inventes programas que não estão nesta lista! Baseia o teu julgamento ESTRITAMENTE no que lês acima.
     </directive>
     """
-
-    resposta, _ = cerebro_astra(prompt)
-    return resposta
+    return responder("processos", imediata, prompt, chave, entregar)
 
 # Reciclando codigo de clima da Sexta-Feira 
 def obter_lat_long(cidade):
-    url = f"https://api.opencagedata.com/geocode/v1/json?q={cidade}&key={OPENCAGE_KEY}&language=pt&pretty=1"
+    # Cidade não muda de lugar: cada uma é geocodificada uma vez só na vida (política "geocodificacao").
+    # Só guarda o que achou a cidade: um "results" vazio (erro de digitação, cota estourada) pergunta de novo da próxima vez
+    params = {"q": " ".join(cidade.lower().split()), "key": OPENCAGE_KEY, "language": "pt", "limit": 1, "no_annotations": 1}
     try:
-        r = requests.get(url).json()
-        if r['results']: return r['results'][0]['geometry']['lat'], r['results'][0]['geometry']['lng']
-    except: pass
+        r = rede.obter_json("geocodificacao", URL_GEOCODIFICACAO, params, guardar_se=lambda r: isinstance(r, dict) and bool(r.get("results")))
+        if r.get('results'): return r['results'][0]['geometry']['lat'], r['results'][0]['geometry']['lng']
+    except (ErroRede, KeyError, IndexError, AttributeError): pass
     return None, None
 
-def obter_clima(cidade):
+def obter_clima(cidade, entregar=None, chave="voz"):
     lat, lng = obter_lat_long(cidade)
     if not lat: return "Não achei essa cidade."
-    url = f"{OPEN_METEO_URL}?latitude={lat}&longitude={lng}&current_weather=true&temperature_unit=celsius"
+    params = {"latitude": lat, "longitude": lng, "current_weather": "true", "temperature_unit": "celsius"}
     try:
-        r = requests.get(url).json()
+        r = rede.obter_json("clima", URL_CLIMA, params)
         temp = r["current_weather"]["temperature"]
-        return f"A temperatura em {cidade} é de {temp} graus."
-    except: return "Erro ao verificar o clima."
+    except (ErroRede, KeyError, TypeError): return "Erro ao verificar o clima."
+    prompt = f"""
+    <role>Astra</role>
+    <directive>Está fazendo {temp} graus em {cidade} agora. Comente o clima do seu jeito.</directive>
+    """
+    return responder("clima", f"A temperatura em {cidade} é de {temp} graus.", prompt, chave, entregar)
     
 def pesquisa_inteligente(termo):
     falar(f"Buscando informações na rede sobre {termo}...")
     try:
-        resultados = DDGS().text(termo, region='wt-wt', max_results=5)
+        resultados = rede.pesquisar(termo, max_resultados=5)
         if not resultados: return "Não encontrei nada na internet sobre isso, senhor."
         contexto_web = "Resultados da Web:\n"
         for r in resultados: contexto_web += f"- {r['title']}: {r['body']}\n"
@@ -222,7 +172,7 @@ def pesquisa_inteligente(termo):
         <directive>Sintetize as informações da Web abaixo de forma direta e sem preâmbulos. Se não achar nada, não invente nada.</directive>
         {contexto_web}
         """
-        resposta, _ = cerebro_astra(prompt)
+        resposta, _ = cerebro_astra(prompt, usar_cache=True, perfil="narracao", intencao="pesquisa")
         return resposta
     except Exception as e:
         console.print(f"[red]Erro na Web:[/red] {e}")
@@ -246,64 +196,54 @@ def estudar_pdf(nome_arquivo, pergunta_usuario="Faça um resumo dos pontos princ
     if not caminho_pdf: return f"Não encontrei nenhum PDF chamado '{nome_arquivo}'."
 
     falar("Documento encontrado. Absorvendo conhecimento... (Isso pode exigir um pouco da placa de vídeo)")
-    texto_extraido = ""
-    try:
-        with open(caminho_pdf, 'rb') as f:
-            leitor = PyPDF2.PdfReader(f)
-            limite_paginas = min(len(leitor.pages), 5)
-            for i in range(limite_paginas): texto_extraido += leitor.pages[i].extract_text() + "\n"
+    try: documento = indice_documentos.abrir(caminho_pdf)
     except Exception as e: return f"Erro ao tentar ler o PDF: {e}"
 
-    if not texto_extraido.strip(): return "O documento parece estar vazio."
+    if not documento.trechos: return "O documento parece estar vazio."
 
+    # Só os trechos que respondem a pergunta vão para o modelo (ou uma amostra do documento inteiro, se for resumo)
     prompt = f"""
     <role>Astra</role>
-    <directive>Responda baseando-se APENAS no texto do documento. PEDIDO DO USUÁRIO: {pergunta_usuario}</directive>
-    <document_text>{texto_extraido}</document_text>
+    <directive>Responda baseando-se APENAS nos trechos do documento ({documento.nome}, {documento.total_paginas} páginas). PEDIDO DO USUÁRIO: {pergunta_usuario}</directive>
+    <document_text>{documento.contexto(pergunta_usuario)}</document_text>
     """
-    resposta, _ = cerebro_astra(prompt)
+    resposta, _ = cerebro_astra(prompt, usar_cache=True, perfil="documento", intencao="pdf")
     return resposta
 
 # O RASTREADOR OTAKU (Integração Jikan/MyAnimeList) - COM CORREÇÃO DO CLOUDFLARE
-def rastreador_otaku(nome_anime):
+def rastreador_otaku(nome_anime, entregar=None, chave="voz"):
     falar(f"Ativando o Rastreador Otaku. Colocando '{nome_anime}' na mira...")
-    url = f"https://api.jikan.moe/v4/anime?q={nome_anime}&limit=1"
     try:
-        # A MÁGICA ESTÁ AQUI: Disfarce de Navegador para enganar o Cloudflare
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-        r = requests.get(url, headers=headers, timeout=15).json()
+        # O disfarce de navegador para o Cloudflare já vem de fábrica na sessão da rede
+        r = rede.obter_json("anime", URL_ANIME, {"q": " ".join(nome_anime.lower().split()), "limit": 1})
         
         if not r.get("data"): return f"Péssimas notícias! A base de dados não tem nenhum registro de '{nome_anime}'."
         
         anime = r["data"][0]
+        episodios = f"{anime['episodes']} episódios" if anime.get("episodes") else "episódios ainda em aberto"
+        imediata = f"Alvo na mira: {anime.get('title', '?')}! Nota {anime.get('score', '?')}/10, {episodios}."
         prompt = f"""
         <role>Astra</role>
         <directive>Você puxou os dados do MyAnimeList. Entregue as informações absurdamente empolgada. Comente a nota e resuma a sinopse.</directive>
         <anime_data>Título: {anime.get("title", "?")}\nNota: {anime.get("score", "?")}/10\nEpisódios: {anime.get("episodes", "?")}\nSinopse: {anime.get("synopsis", "Sem sinopse.")}</anime_data>
         """
-        resposta, _ = cerebro_astra(prompt)
-        return resposta
+        return responder("anime", imediata, prompt, chave, entregar, usar_cache=True)
     except Exception as e: return f"O Rastreador Otaku superaqueceu e explodiu! O erro foi: {e}"
 
 # O SENTIDO ARANHA DE HARDWARE (Monitorização psutil)
-def relatorio_hardware():
-    falar("A ler os sensores internos do nosso lindo bebé...")
-    cpu_uso = psutil.cpu_percent(interval=1)
-    ram_uso = psutil.virtual_memory().percent
-    
-    # Magia Negra: Descobrir o processo vilão que está comendo a RAM
-    processo_fome = "Nenhum"
-    max_ram = 0
-    for proc in psutil.process_iter(['name', 'memory_percent']):
-        try:
-            if proc.info['memory_percent'] is not None and proc.info['memory_percent'] > max_ram:
-                max_ram = proc.info['memory_percent']
-                processo_fome = proc.info['name']
-        except: pass
-            
+def relatorio_hardware(entregar=None, chave="voz"):
+    # Nada de ficar 1s parada no cpu_percent: o sensor de plantão já tem a foto de agora e o histórico
+    agora = sensor_telemetria.instantaneo()
+    fome = sensor_telemetria.top_processos(1)
+    processo_fome, max_ram = (fome[0]["nome"], fome[0]["ram"]) if fome else ("Nenhum", 0.0)
+    tendencias = sensor_telemetria.descrever_tendencias()
+    crescendo = ", ".join(f"{nome} (+{mb:.0f} MB/min)" for nome, mb in sensor_telemetria.processos_crescendo())
+    historico = "; ".join(tendencias + ([f"RAM crescendo em: {crescendo}"] if crescendo else [])) or "estável nos últimos minutos"
+    imediata = (f"CPU em {agora['cpu']:.0f}%, RAM em {agora['ram']:.0f}% ({agora['ram_usada_gb']:.1f} de {agora['ram_total_gb']:.1f} GB). "
+                f"Quem mais come RAM: {processo_fome} ({max_ram:.1f}%). Tendência: {historico}.")
+
     prompt = f"""
     <role>Astra</role>
-    <directive>Diagnóstico de hardware: CPU={cpu_uso}%, RAM={ram_uso}%. Maior consumidor: '{processo_fome}' ({max_ram:.1f}%). Faça um diagnóstico caótico!</directive>
+    <directive>Diagnóstico de hardware: CPU={agora['cpu']:.0f}%, RAM={agora['ram']:.0f}% ({agora['ram_usada_gb']:.1f} de {agora['ram_total_gb']:.1f} GB). Maior consumidor: '{processo_fome}' ({max_ram:.1f}%). Tendência: {historico}. Faça um diagnóstico caótico!</directive>
     """
-    resposta, _ = cerebro_astra(prompt)
-    return resposta
\ No newline at end of file
+    return responder("hardware", imediata, prompt, chave, entregar)
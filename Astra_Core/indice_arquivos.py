@@ -0,0 +1,175 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from Astra_Core.config import ARQUIVO_INDICE_ARQUIVOS, INDICE_ARQUIVOS_INTERVALO, INDICE_ARQUIVOS_IGNORAR
+from Astra_Core.catalogo_apps import normalizar, trigramas
+from core.partida import modulo_tardio
+from core.terminal import console
+
+winshell = modulo_tardio("winshell")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pastas (caminho TEXT PRIMARY KEY, pai TEXT, mtime REAL);
+CREATE INDEX IF NOT EXISTS pastas_pai ON pastas(pai);
+CREATE TABLE IF NOT EXISTS arquivos (id INTEGER PRIMARY KEY, caminho TEXT UNIQUE, pasta TEXT, nome TEXT, chave TEXT, tamanho INTEGER, mtime REAL);
+CREATE INDEX IF NOT EXISTS arquivos_pasta ON arquivos(pasta);
+"""
+# A busca por pedaço de nome: FTS5 com tokenizador de trigramas, espelhando a coluna "chave" (nome normalizado)
+ESQUEMA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS nomes USING fts5(chave, content='arquivos', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS arquivos_ai AFTER INSERT ON arquivos BEGIN
+    INSERT INTO nomes(rowid, chave) VALUES (new.id, new.chave);
+END;
+CREATE TRIGGER IF NOT EXISTS arquivos_ad AFTER DELETE ON arquivos BEGIN
+    INSERT INTO nomes(nomes, rowid, chave) VALUES ('delete', old.id, old.chave);
+END;
+"""
+
+def _pastas_raiz():
+    raizes = []
+    for descobrir in (lambda: winshell.desktop(), lambda: winshell.my_documents(),
+                      lambda: os.path.join(os.path.expanduser("~"), "Downloads")):
+        try: raizes.append(os.path.normpath(descobrir()))
+        except Exception: pass
+    return list(dict.fromkeys(raizes))
+
+def _sem_extensao(chave):
+    partes = chave.rsplit(" ", 1)
+    return partes[0] if len(partes) == 2 and len(partes[1]) <= 4 else chave
+
+# O CÃO FAREJADOR COM MEMÓRIA: os nomes dos arquivos ficam num SQLite, a busca não toca mais no disco
+class IndiceArquivos:
+    def __init__(self, arquivo=ARQUIVO_INDICE_ARQUIVOS, raizes=None, intervalo=INDICE_ARQUIVOS_INTERVALO):
+        self.arquivo = arquivo
+        self.raizes = raizes
+        self.intervalo = intervalo
+        self._trava_escrita = threading.Lock()
+        self._trava_leitura = threading.Lock()
+        self._leitor = None
+        self._tem_fts = None
+        self._pronto = threading.Event()
+        self._vigia = None
+        self.pastas_relidas = 0
+
+    def _conectar(self):
+        banco = sqlite3.connect(self.arquivo, check_same_thread=False)
+        banco.execute("PRAGMA journal_mode=WAL")  # Quem busca não espera quem está varrendo
+        banco.executescript(ESQUEMA)
+        if self._tem_fts is None:
+            try:
+                banco.executescript(ESQUEMA_FTS)
+                self._tem_fts = True
+            except sqlite3.OperationalError:
+                self._tem_fts = False  # SQLite sem FTS5/trigram: a busca cai no LIKE, mais lenta mas funciona
+        return banco
+
+    # ---------- Varredura incremental ----------
+    def _varrer(self, banco, pasta, pai):
+        try: mtime = os.stat(pasta).st_mtime
+        except OSError: return
+        linha = banco.execute("SELECT mtime FROM pastas WHERE caminho = ?", (pasta,)).fetchone()
+        if linha and linha[0] == mtime:
+            # Nada entrou nem saiu desta pasta: só desce para conferir as subpastas
+            subpastas = [s for (s,) in banco.execute("SELECT caminho FROM pastas WHERE pai = ?", (pasta,))]
+        else:
+            arquivos, subpastas = [], []
+            try:
+                with os.scandir(pasta) as entradas:
+                    for entrada in entradas:
+                        if entrada.name.startswith(".") or entrada.name.lower() in INDICE_ARQUIVOS_IGNORAR: continue
+                        try:
+                            if entrada.is_dir(follow_symlinks=False): subpastas.append(entrada.path)
+                            elif entrada.is_file():
+                                info = entrada.stat()
+                                arquivos.append((entrada.path, pasta, entrada.name, normalizar(entrada.name), info.st_size, info.st_mtime))
+                        except OSError:
+                            continue
+            except OSError:
+                return
+            with banco:
+                banco.execute("DELETE FROM arquivos WHERE pasta = ?", (pasta,))
+                banco.executemany("INSERT INTO arquivos (caminho, pasta, nome, chave, tamanho, mtime) VALUES (?, ?, ?, ?, ?, ?)", arquivos)
+                # Subpastas que sumiram levam junto tudo o que estava embaixo delas
+                vivas = set(subpastas)
+                for (antiga,) in banco.execute("SELECT caminho FROM pastas WHERE pai = ?", (pasta,)).fetchall():
+                    if antiga not in vivas: self._esquecer_arvore(banco, antiga)
+                banco.execute("INSERT OR REPLACE INTO pastas VALUES (?, ?, ?)", (pasta, pai, mtime))
+            self.pastas_relidas += 1
+        for subpasta in subpastas: self._varrer(banco, subpasta, pasta)
+
+    def _esquecer_arvore(self, banco, pasta):
+        for (filha,) in banco.execute("SELECT caminho FROM pastas WHERE pai = ?", (pasta,)).fetchall():
+            self._esquecer_arvore(banco, filha)
+        banco.execute("DELETE FROM arquivos WHERE pasta = ?", (pasta,))
+        banco.execute("DELETE FROM pastas WHERE caminho = ?", (pasta,))
+
+    def atualizar(self):
+        with self._trava_escrita:
+            banco = self._conectar()
+            try:
+                for raiz in (self.raizes if self.raizes is not None else _pastas_raiz()):
+                    self._varrer(banco, raiz, None)
+                total = banco.execute("SELECT COUNT(*) FROM arquivos").fetchone()[0]
+            finally:
+                banco.close()
+        self._pronto.set()
+        return total
+
+    def iniciar_vigia(self):
+        """Primeira varredura agora e revarreduras incrementais de tempos em tempos, tudo em segundo plano."""
+        if self._vigia is not None: return
+        def vigiar():
+            while True:
+                try: self.atualizar()
+                except Exception as e: console.print(f"[red]Índice de arquivos: varredura falhou:[/red] {e}")
+                time.sleep(self.intervalo)
+        self._vigia = threading.Thread(target=vigiar, daemon=True)
+        self._vigia.start()
+
+    # ---------- Busca ----------
+    def _candidatos(self, banco, consulta):
+        if self._tem_fts and len(consulta) >= 3:
+            # Quem contém a consulta inteira, mais quem divide trigramas com ela (os "quase iguais")
+            exatos = banco.execute("SELECT a.caminho, a.chave, a.mtime FROM nomes JOIN arquivos a ON a.id = nomes.rowid "
+                                   "WHERE nomes MATCH ? LIMIT 200", ('"' + consulta.replace('"', '""') + '"',)).fetchall()
+            pedacos = " OR ".join('"' + t.replace('"', '""') + '"' for t in trigramas(consulta) if t.strip() and len(t.strip()) == 3)
+            parecidos = banco.execute("SELECT a.caminho, a.chave, a.mtime FROM nomes JOIN arquivos a ON a.id = nomes.rowid "
+                                      "WHERE nomes MATCH ? ORDER BY rank LIMIT 200", (pedacos,)).fetchall() if pedacos else []
+            return exatos + parecidos
+        return banco.execute("SELECT caminho, chave, mtime FROM arquivos WHERE chave LIKE ? LIMIT 200", (f"%{consulta}%",)).fetchall()
+
+    def buscar(self, nome, limite=5):
+        """[(pontos, caminho)]: nome exato > começo do nome > pedaço do nome > parecido, com bônus para os recentes."""
+        if not self._pronto.is_set():
+            if self._vigia is None: self.atualizar()
+            else: self._pronto.wait(timeout=30)
+        consulta = normalizar(nome)
+        if not consulta: return []
+        with self._trava_leitura:
+            if self._leitor is None: self._leitor = self._conectar()
+            linhas = self._candidatos(self._leitor, consulta)
+        tri_consulta = trigramas(consulta)
+        agora = time.time()
+        pontuados = {}
+        for caminho, chave, mtime in linhas:
+            if caminho in pontuados: continue
+            if consulta in (chave, _sem_extensao(chave)): pontos = 3.0
+            elif chave.startswith(consulta): pontos = 2.0
+            elif consulta in chave: pontos = 1.5
+            else:
+                tri = trigramas(chave)
+                pontos = 2 * len(tri_consulta & tri) / (len(tri_consulta) + len(tri))  # Dice, entre 0 e 1
+            # Mexido há pouco vale mais: meia-vida de um mês
+            pontos += 0.3 * math.exp(-max(0.0, agora - mtime) / (30 * 86400))
+            pontuados[caminho] = pontos
+        ranking = sorted(((p, c) for c, p in pontuados.items()), reverse=True)
+        return ranking[:limite]
+
+    def melhor(self, nome):
+        achados = self.buscar(nome, limite=1)
+        return achados[0][1] if achados and achados[0][0] >= 0.6 else None
+
+indice_arquivos = IndiceArquivos()
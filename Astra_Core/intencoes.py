@@ -0,0 +1,108 @@
+import re
+
+def _sem_pedaco(palavra):
+    # Palavra de verdade só sai inteira ("em" não arranca pedaço de "belém"); ".pdf" sai onde estiver
+    escapada = re.escape(palavra)
+    return rf"\b{escapada}\b" if palavra[0].isalnum() and palavra[-1].isalnum() else escapada
+
+def _regex_da_arvore(no):
+    ramos = [re.escape(letra) + _regex_da_arvore(filho) for letra, filho in no.items() if letra]
+    if not ramos: return ""
+    corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+    # Gatilho que termina aqui mas pode continuar: o "?" guloso prefere o mais comprido
+    return f"(?:{corpo})?" if "" in no else corpo
+
+class Intencao:
+    __slots__ = ("nome", "gatilhos", "exatos", "exige", "extrair", "limpar", "_remover")
+
+    def __init__(self, nome, gatilhos=(), exatos=(), exige=(), extrair=None, limpar=()):
+        self.nome = nome
+        self.gatilhos = tuple(gatilhos)  # Aparecer em qualquer lugar do comando já basta
+        self.exatos = tuple(exatos)  # Só vale se o comando for exatamente isso
+        self.exige = tuple(exige)  # Palavras que também precisam estar no comando ("desligar" + "pc")
+        self.extrair = extrair  # None, "resto" (o comando sem o gatilho) ou "numero"
+        self.limpar = tuple(limpar)  # Enfeites que saem do resto junto com o gatilho
+        self._remover = re.compile("|".join([re.escape(g) for g in sorted(self.gatilhos, key=len, reverse=True)] + [_sem_pedaco(p) for p in self.limpar])) if self.gatilhos or self.limpar else None
+
+    def argumento(self, comando):
+        if self.extrair == "numero":
+            numero = re.search(r"\d+", comando)
+            return int(numero.group()) if numero else None
+        if self.extrair == "resto":
+            resto = self._remover.sub(" ", comando) if self._remover else comando
+            return " ".join(resto.split())
+        return None
+
+# O LIVRO DE FEITIÇOS: a ordem da lista é a prioridade (quem vem antes ganha quando dois gatilhos aparecem juntos)
+INTENCOES = [
+    Intencao("arquivo", ["me mande o arquivo", "enviar arquivo", "procure o arquivo", "mande o arquivo"], extrair="resto"),
+    Intencao("modo_chat", ["modo chat"]),
+    Intencao("modo_voz", ["modo voz"]),
+    Intencao("ajuda", ["gatilhos", "suas funções"]),
+    Intencao("hardware", ["status do sistema", "como está o hardware", "sentido aranha"]),
+    Intencao("fila_gpu", ["fila da gpu"]),
+    Intencao("relatorio_partida", ["relatório de partida", "relatorio de partida"]),
+    Intencao("processos", ["processos abertos", "programas abertos", "o que está rodando", "gerenciador de tarefas"]),
+    Intencao("anime", ["procurar anime", "buscar anime", "rastrear anime"], extrair="resto", limpar=["astra"]),
+    Intencao("pdf", ["ler pdf", "estudar documento", "analisar documento"], extrair="resto", limpar=["astra", ".pdf"]),
+    Intencao("visao", ["veja isso", "analise", "o que é isso", "na minha tela", "descreva a tela"], extrair="resto"),
+    Intencao("escanear", ["escanear"]),
+    Intencao("volume", ["volume"], extrair="numero"),
+    Intencao("brilho", ["brilho"], extrair="numero"),
+    Intencao("print", ["print"], exatos=["tela", "ecrã"]),
+    Intencao("lixeira", ["esvaziar lixeira"]),
+    Intencao("desligar", ["desligar"], exige=["pc"]),
+    Intencao("tocar", ["tocar"], extrair="resto"),
+    Intencao("clima", ["clima"], extrair="resto", limpar=["em"]),
+    Intencao("busca", ["pesquise", "pesquisar", "busque", "quem é", "o que é"], extrair="resto", limpar=["astra"]),
+    Intencao("sair", ["sair"]),
+    Intencao("abrir", ["abrir"], extrair="resto"),
+    Intencao("fechar", ["fechar"], extrair="resto"),
+]
+
+# O ROTEADOR: todos os gatilhos viram UMA regex só, compilada uma vez
+class RoteadorIntencoes:
+    def __init__(self, intencoes=INTENCOES, apenas=None):
+        self.intencoes = [i for i in intencoes if apenas is None or i.nome in apenas]
+        self._prioridade = {intencao.nome: n for n, intencao in enumerate(self.intencoes)}
+        self._exatos = {}
+        for intencao in self.intencoes:
+            for frase in intencao.exatos: self._exatos.setdefault(frase, intencao)
+        # Os gatilhos viram uma árvore de prefixos e a árvore vira a regex: cada posição do comando custa
+        # uma descida na árvore, não um teste por gatilho (com centenas de intenções isso faz toda a diferença)
+        arvore = {}
+        for intencao in self.intencoes:
+            for gatilho in intencao.gatilhos:
+                no = arvore
+                for letra in gatilho: no = no.setdefault(letra, {})
+                no.setdefault("", set()).add(intencao)
+        # O lookahead acha gatilhos sobrepostos ("o que é" dentro de "o que é isso"); o maior ganha em cada posição,
+        # então cada gatilho também responde pelas intenções dos gatilhos que são prefixo dele
+        self._padrao = re.compile("(?=(" + _regex_da_arvore(arvore) + "))") if arvore else None
+        self._donos = {}
+        for gatilho in {g for i in self.intencoes for g in i.gatilhos}:
+            no, donos = arvore, set()
+            for letra in gatilho:
+                no = no[letra]
+                donos |= no.get("", set())
+            self._donos[gatilho] = sorted(donos, key=lambda i: self._prioridade[i.nome])
+
+    def rotear(self, comando):
+        """Devolve (nome da intenção, argumento) ou (None, None) se for papo para o cérebro."""
+        comando = comando.strip()
+        melhor = self._exatos.get(comando)
+        if self._padrao is not None:
+            for achado in self._padrao.finditer(comando):
+                for intencao in self._donos[achado.group(1)]:
+                    if melhor is not None and self._prioridade[intencao.nome] >= self._prioridade[melhor.nome]: break
+                    if all(p in comando for p in intencao.exige):
+                        melhor = intencao
+                        break
+        if melhor is None: return None, None
+        return melhor.nome, melhor.argumento(comando)
+
+roteador_cli = RoteadorIntencoes(apenas={i.nome for i in INTENCOES} - {"arquivo"})
+# No Discord o print só sai com o comando exato (como no bot antigo): "como usar print no python" ou "blueprint do projeto"
+# não podem mandar a tela do PC para o canal
+PRINT_EXATO = Intencao("print", exatos=["print", "tela", "ecrã"])
+roteador_discord = RoteadorIntencoes([PRINT_EXATO if i.nome == "print" else i for i in INTENCOES], apenas={"arquivo", "ajuda", "hardware", "processos", "anime", "print", "clima", "abrir", "fechar"})
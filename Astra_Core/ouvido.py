@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+
+import speech_recognition as sr
+
+from Astra_Core.voz import console
+
+OUVIDO_CALIBRACAO = 1.0 # Segundos ouvindo o silêncio na primeira calibração
+OUVIDO_RECALIBRAR = 300 # A cada quantos segundos (num momento de silêncio) ele reajusta o ruído ambiente
+OUVIDO_MAX_FRASE = 8 # Segundos máximos de uma frase
+OUVIDO_PAUSA_FIM = 0.6 # Silêncio que encerra uma frase
+IDIOMA = "pt-BR"
+
+# O OUVIDO QUE NUNCA FECHA: um microfone aberto, uma thread recortando frases e outra transcrevendo
+class Ouvido:
+    def __init__(self, ocupado=lambda: False):
+        self.rec = sr.Recognizer()
+        self.rec.dynamic_energy_threshold = True  # O limiar vai se ajustando sozinho entre uma frase e outra
+        self.rec.pause_threshold = OUVIDO_PAUSA_FIM
+        self.ocupado = ocupado  # função que diz se a Astra está falando (para não calibrar em cima da voz dela)
+        self._frases = queue.Queue()  # (áudio, ouvida durante a fala da Astra)
+        self._comandos = queue.Queue()  # (texto, ouvida durante a fala) ou a exceção para quem consumir
+        self._ativo = threading.Event()
+        self._trava = threading.Lock()
+        self._captura = None
+        self._reconhecedor = None
+        self._calibrado_em = 0.0
+        self._falhou_em = float("-inf")
+
+    def iniciar(self):
+        self._ativo.set()
+        with self._trava:
+            if self._reconhecedor is None:
+                self._reconhecedor = threading.Thread(target=self._loop_reconhecimento, daemon=True)
+                self._reconhecedor.start()
+            if self._captura is not None and self._captura.is_alive(): return
+            if time.monotonic() - self._falhou_em < 10: return  # Microfone acabou de falhar: dá um respiro antes de tentar de novo
+            self._captura = threading.Thread(target=self._loop_captura, daemon=True)
+            self._captura.start()
+        console.print("[dim]Ouvindo...[/dim]")
+
+    def pausar(self):
+        """Para de escutar (modo chat) e joga fora o que ainda não foi consumido."""
+        self._ativo.clear()
+        for fila in (self._frases, self._comandos):
+            while True:
+                try: fila.get_nowait()
+                except queue.Empty: break
+
+    def _calibrar(self, fonte, duracao):
+        self.rec.adjust_for_ambient_noise(fonte, duration=duracao)
+        self._calibrado_em = time.monotonic()
+
+    def _loop_captura(self):
+        try:
+            with sr.Microphone() as fonte:
+                self._calibrar(fonte, OUVIDO_CALIBRACAO)
+                while True:
+                    self._ativo.wait()
+                    falando_antes = self.ocupado()
+                    try:
+                        audio = self.rec.listen(fonte, timeout=1, phrase_time_limit=OUVIDO_MAX_FRASE)
+                    except sr.WaitTimeoutError:
+                        # Um segundo de silêncio: boa hora para reajustar o ruído ambiente, se já passou da hora
+                        if time.monotonic() - self._calibrado_em > OUVIDO_RECALIBRAR and not self.ocupado():
+                            self._calibrar(fonte, 0.5)
+                        continue
+                    if self._ativo.is_set(): self._frases.put((audio, falando_antes or self.ocupado()))
+        except Exception as e:
+            # Sem microfone: quem consome ouve "Minha audição falhou." e o próximo iniciar() tenta de novo
+            self._falhou_em = time.monotonic()
+            self._comandos.put(sr.RequestError(f"microfone indisponível: {e}"))
+
+    def _loop_reconhecimento(self):
+        # Transcreve a frase N enquanto o microfone já está recortando a N+1
+        while True:
+            audio, durante_fala = self._frases.get()
+            try: texto = self.rec.recognize_google(audio, language=IDIOMA).lower()
+            except sr.UnknownValueError: continue
+            except sr.RequestError as e: texto = e
+            if not self._ativo.is_set(): continue
+            self._comandos.put(texto if isinstance(texto, Exception) else (texto, durante_fala))
+
+    def proximo_comando(self, timeout=None):
+        """Devolve (texto, ouvido_durante_a_fala); sr.WaitTimeoutError se ninguém disse nada a tempo."""
+        try: item = self._comandos.get(timeout=timeout)
+        except queue.Empty: raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        if isinstance(item, Exception): raise item
+        return item
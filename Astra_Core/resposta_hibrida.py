@@ -0,0 +1,75 @@
+import threading
+from collections import Counter
+
+from Astra_Core.config import MODOS_RESPOSTA
+from Astra_Core.cerebro import cerebro_astra, RESPOSTA_ERRO_CEREBRO
+from core.escalonador_gpu import PRIORIDADE_FUNDO
+from core.ollama_client import cliente_ollama
+from core.terminal import console
+
+# Vai no fim do prompt do comentário: os números já foram entregues, a Astra só dá o tempero
+NOTA_COMENTARIO = "\n(Os dados acima JÁ foram ditos ao criador. Não os repita: faça só um comentário curto, de no máximo 2 frases, no seu estilo.)"
+
+def origem_comentario(chave):
+    return f"comentario:{chave}"
+
+# O RELÓGIO DE TURNOS: cada comando novo avança o turno da conversa; comentário de turno velho não é entregue
+class ControleTurnos:
+    def __init__(self, escalonador=None):
+        self.escalonador = escalonador or cliente_ollama.escalonador
+        self._trava = threading.Lock()
+        self._turnos = Counter()
+        self.contagem = Counter()
+
+    def novo(self, chave):
+        """O criador falou de novo nessa conversa: o que estava pendente do turno anterior perde a vez na GPU."""
+        with self._trava:
+            self._turnos[chave] += 1
+            turno = self._turnos[chave]
+        if self.escalonador.cancelar_origem(origem_comentario(chave), prioridade_minima=PRIORIDADE_FUNDO):
+            with self._trava: self.contagem["cancelados na fila"] += 1
+        return turno
+
+    def atual(self, chave):
+        with self._trava: return self._turnos[chave]
+
+    def vigente(self, chave, turno):
+        with self._trava: return self._turnos[chave] == turno
+
+    def contar(self, evento):
+        with self._trava: self.contagem[evento] += 1
+
+    def relatorio(self):
+        with self._trava: contagem = dict(self.contagem)
+        if not contagem: return "Comentários das ferramentas: nenhum ainda"
+        return "Comentários das ferramentas: " + ", ".join(f"{evento}={n}" for evento, n in sorted(contagem.items()))
+
+turnos = ControleTurnos()
+
+def responder(intencao, imediata, prompt=None, chave="voz", entregar=None, usar_cache=False):
+    """A resposta da ferramenta conforme MODOS_RESPOSTA; no modo híbrido o comentário chega depois por entregar(texto)."""
+    modo = MODOS_RESPOSTA.get(intencao, "llm")
+    if not prompt or modo == "imediato": return imediata
+    if modo == "llm":
+        resposta, _ = cerebro_astra(prompt, usar_cache=usar_cache, perfil="narracao", intencao=intencao)
+        return resposta
+    if entregar is None: return imediata  # Ninguém para receber o comentário depois: fica só o que é certo
+
+    turno = turnos.atual(chave)
+
+    def comentar():
+        resposta, _ = cerebro_astra(prompt + NOTA_COMENTARIO, usar_cache=usar_cache, origem=origem_comentario(chave),
+                                    prioridade=PRIORIDADE_FUNDO, perfil="narracao", intencao=f"{intencao}_comentario")
+        # O criador já pediu outra coisa: comentário atrasado só atrapalharia
+        # E o comentário é só tempero: se o Ollama falhou, a "dor de cabeça" não vai para o ar depois da resposta certa
+        if not resposta or resposta == RESPOSTA_ERRO_CEREBRO or not turnos.vigente(chave, turno):
+            turnos.contar("descartados")
+            return
+        try:
+            entregar(resposta)
+            turnos.contar("entregues")
+        except Exception as e:
+            console.print(f"[red]Resposta híbrida: falha ao entregar o comentário:[/red] {e}")
+
+    threading.Thread(target=comentar, daemon=True).start()
+    return imediata
@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import threading
+import time
+from collections import deque
+from io import BytesIO
+
+from PIL import Image
+
+from Astra_Core.config import (
+    VISAO_LADO_MAXIMO, VISAO_QUALIDADE_JPEG, VISAO_TAMANHO_HASH, VISAO_DISTANCIA_MAXIMA,
+    VISAO_CACHE_TTL, VISAO_CACHE_TAMANHO, VISION_MODEL
+)
+from core.ollama_client import cliente_ollama, ErroRespostaOllama
+from core.escalonador_gpu import PRIORIDADE_FUNDO
+from core.partida import modulo_tardio
+
+pyautogui = modulo_tardio("pyautogui")
+
+PROMPT_VISAO = "Describe this image in detail. If there is text, read it."
+
+# O PRINT QUE NUNCA TOCA O DISCO
+def capturar_tela():
+    return pyautogui.screenshot()
+
+def preparar_imagem(imagem):
+    """Reduz para o tamanho que o modelo de visão realmente enxerga e devolve o JPEG em base64."""
+    imagem = imagem.convert("RGB")
+    imagem.thumbnail((VISAO_LADO_MAXIMO, VISAO_LADO_MAXIMO), Image.LANCZOS)
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=VISAO_QUALIDADE_JPEG)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+def hash_perceptual(imagem, tamanho=VISAO_TAMANHO_HASH):
+    """dHash: compara cada pixel com o vizinho numa miniatura em cinza (tamanho² bits)."""
+    miniatura = imagem.convert("L").resize((tamanho + 1, tamanho), Image.BILINEAR)
+    pixels = miniatura.tobytes()  # Modo "L": um byte por pixel
+    bits = 0
+    for linha in range(tamanho):
+        base = linha * (tamanho + 1)
+        for coluna in range(tamanho):
+            bits = (bits << 1) | (pixels[base + coluna] > pixels[base + coluna + 1])
+    return bits
+
+def distancia_hash(a, b):
+    return bin(a ^ b).count("1")
+
+# A MEMÓRIA FOTOGRÁFICA: tela quase igual à de agora há pouco = mesma descrição
+class CacheVisao:
+    def __init__(self, tamanho=VISAO_CACHE_TAMANHO, ttl=VISAO_CACHE_TTL, distancia_maxima=VISAO_DISTANCIA_MAXIMA):
+        self.ttl = ttl
+        self.distancia_maxima = distancia_maxima
+        self._entradas = deque(maxlen=tamanho)  # (hash, descrição, criado_em)
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def buscar(self, assinatura):
+        agora = time.monotonic()
+        with self._trava:
+            melhor = None
+            for hash_visto, descricao, criado_em in self._entradas:
+                if agora - criado_em > self.ttl: continue
+                distancia = distancia_hash(assinatura, hash_visto)
+                if distancia <= self.distancia_maxima and (melhor is None or distancia < melhor[0]):
+                    melhor = (distancia, descricao)
+            if melhor is None:
+                self.faltas += 1
+                return None
+            self.acertos += 1
+            return melhor[1]
+
+    def guardar(self, assinatura, descricao):
+        with self._trava:
+            self._entradas.append((assinatura, descricao, time.monotonic()))
+
+    def relatorio(self):
+        total = self.acertos + self.faltas
+        return f"Cache de visão: {self.acertos}/{total} telas reaproveitadas ({len(self._entradas)} guardadas)"
+
+cache_visao = CacheVisao()
+
+def _payload_visao(img_b64):
+    return {"model": VISION_MODEL, "prompt": PROMPT_VISAO, "stream": False, "images": [img_b64]}
+
+def _preparar(imagem):
+    return hash_perceptual(imagem), preparar_imagem(imagem)
+
+def _descricao(resposta):
+    # JSON sem "response" (o Ollama às vezes manda {"error": ...} com 200) vira erro do Ollama, não KeyError solto no loop de voz
+    try: return resposta["response"]
+    except (KeyError, TypeError) as e:
+        raise ErroRespostaOllama(f"O modelo de visão respondeu sem descrição: {str(resposta)[:200]}", status=200) from e
+
+def descrever_imagem(imagem, prioridade=PRIORIDADE_FUNDO):
+    """Descrição em inglês da imagem (PIL); pula o modelo de visão se já viu algo quase idêntico."""
+    assinatura = hash_perceptual(imagem)
+    descricao = cache_visao.buscar(assinatura)
+    if descricao is not None: return descricao
+    descricao = _descricao(cliente_ollama.residencia.descrever(_payload_visao(preparar_imagem(imagem)), prioridade=prioridade))
+    cache_visao.guardar(assinatura, descricao)
+    return descricao
+
+async def adescrever_arquivo(caminho_img, prioridade=PRIORIDADE_FUNDO):
+    # Decodificar e encolher a imagem é trabalho de CPU: fica fora do event loop do Discord
+    def abrir():
+        with Image.open(caminho_img) as imagem:
+            return _preparar(imagem)
+    assinatura, img_b64 = await asyncio.to_thread(abrir)
+    descricao = cache_visao.buscar(assinatura)
+    if descricao is not None: return descricao
+    descricao = _descricao(await cliente_ollama.residencia.adescrever(_payload_visao(img_b64), prioridade=prioridade))
+    cache_visao.guardar(assinatura, descricao)
+    return descricao
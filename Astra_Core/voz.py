@@ -1,9 +1,23 @@
 import asyncio
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from io import BytesIO
+
 import edge_tts
 import pygame
-from rich.console import Console
 
-console = Console()
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+from core.terminal import console
 
 # Inicia a "caixa de som" do laboratório
 try:
@@ -11,33 +25,325 @@ try:
 except Exception as e:
     console.print(f"[yellow]Aviso: Não foi possível iniciar o mixer de áudio ({e})[/yellow]")
 
-# O Ficheiro temporário onde a voz será forjada
-ARQUIVO_AUDIO = "voz_astra.mp3"
-
 # A Voz da Deusa Cibernética (Herdada do projeto Kobayashi)
-VOICE_NAME = "pt-BR-ThalitaNeural" 
+VOICE_NAME = "pt-BR-ThalitaNeural"
+VOICE_RATE = "+0%"
+VOICE_PITCH = "+0Hz"
+VOZ_ORCAMENTO_LATENCIA = 2.5 # Segundos que a voz neural tem para entregar o áudio antes do plano B local
+VOZ_FOLGA_ULTIMO_MOTOR = 8 # O último motor da lista (sem plano B depois dele) espera até orçamento x isso; estourou, a frase é pulada
+
+# O Baú de Falas: cada frase vira um mp3 com nome = hash (texto, voz, velocidade, tom)
+PASTA_CACHE_VOZ = "astra_voz_cache"
+CACHE_VOZ_MAX_DISCO = 200 * 1024 * 1024 # Bytes no disco antes de jogar fora as falas menos usadas
+CACHE_VOZ_MAX_RAM = 16 * 1024 * 1024 # Bytes das falas quentes que ficam na memória
+
+# Falas fixas que já nascem prontas na inicialização
+FRASES_CONHECIDAS = [
+    "Sistemas online.",
+    "Sistemas online. Memória restaurada.",
+    "Ativando teclado.",
+    "Ativando microfone.",
+    "Exibindo o manual com nossos bebês.",
+    "Analisando a tela... (Um momento)",
+    "Processando a imagem com a lógica avançada...",
+    "A ler os sensores internos do nosso lindo bebé...",
+    "Iniciando varredura da Área de Trabalho. Buscando executáveis e jogos...",
+    "Documento encontrado. Absorvendo conhecimento... (Isso pode exigir um pouco da placa de vídeo)",
+    "Lixeira esvaziada.",
+    "App não encontrado.",
+    "Minha audição falhou.",
+    "Estou com dor de cabeça (Erro de conexão).",
+    "Encerrando.",
+]
+
+class CacheVoz:
+    def __init__(self, pasta=PASTA_CACHE_VOZ, max_disco=CACHE_VOZ_MAX_DISCO, max_ram=CACHE_VOZ_MAX_RAM):
+        self.pasta = pasta
+        self.max_disco = max_disco
+        self.max_ram = max_ram
+        self._quentes = OrderedDict()  # chave -> bytes do mp3 (LRU)
+        self._bytes_ram = 0
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def chave(texto, voz=VOICE_NAME, velocidade=VOICE_RATE, tom=VOICE_PITCH):
+        return hashlib.sha256(f"{voz}|{velocidade}|{tom}|{texto}".encode("utf-8")).hexdigest()
+
+    def caminho(self, chave):
+        return os.path.join(self.pasta, chave + ".mp3")
+
+    def _guardar_ram(self, chave, audio):
+        if chave in self._quentes: self._bytes_ram -= len(self._quentes.pop(chave))
+        self._quentes[chave] = audio
+        self._bytes_ram += len(audio)
+        while self._bytes_ram > self.max_ram and len(self._quentes) > 1:
+            _, velho = self._quentes.popitem(last=False)
+            self._bytes_ram -= len(velho)
+
+    def obter(self, chave):
+        with self._trava:
+            audio = self._quentes.get(chave)
+            if audio is not None:
+                self._quentes.move_to_end(chave)
+                return audio
+        try:
+            with open(self.caminho(chave), "rb") as f: audio = f.read()
+            os.utime(self.caminho(chave))  # O mtime marca o último uso para a faxina do LRU
+        except OSError:
+            return None
+        with self._trava: self._guardar_ram(chave, audio)
+        return audio
+
+    def guardar(self, chave, audio):
+        with self._trava: self._guardar_ram(chave, audio)
+        temporario = self.caminho(chave) + ".tmp"
+        try:
+            os.makedirs(self.pasta, exist_ok=True)  # Só na primeira fala guardada: importar a voz não espalha pastas pelo diretório
+            with open(temporario, "wb") as f: f.write(audio)
+            os.replace(temporario, self.caminho(chave))
+            self._faxina()
+        except OSError as e:
+            console.print(f"[yellow]Aviso: não consegui guardar a fala no baú ({e})[/yellow]")
+
+    def _faxina(self):
+        arquivos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.name.endswith(".mp3"):
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.max_disco: break
+            try: os.remove(caminho); total -= tamanho
+            except OSError: pass
+
+cache_voz = CacheVoz()
+
+# Um event loop só para o edge-tts, vivo o tempo todo (nada de asyncio.run a cada frase)
+_loop_voz = asyncio.new_event_loop()
+threading.Thread(target=_loop_voz.run_forever, daemon=True).start()
 
 async def _gerar_voz_neural(texto):
-    """Gera o áudio mp3 utilizando a API da Microsoft."""
-    comunicar = edge_tts.Communicate(texto, VOICE_NAME)
-    await comunicar.save(ARQUIVO_AUDIO)
+    """Gera o áudio mp3 utilizando a API da Microsoft, direto na memória."""
+    comunicar = edge_tts.Communicate(texto, VOICE_NAME, rate=VOICE_RATE, pitch=VOICE_PITCH)
+    audio = bytearray()
+    async for pedaco in comunicar.stream():
+        if pedaco["type"] == "audio": audio.extend(pedaco["data"])
+    return bytes(audio)
 
-# A Nova Boca
-def falar(texto):
-    console.print(f"[bold cyan]Astra:[/bold cyan] {texto}")
-    
-    try:
-        asyncio.run(_gerar_voz_neural(texto))
-        
-        # Carrega e liberta a magia acústica!
-        pygame.mixer.music.load(ARQUIVO_AUDIO)
+# OS MOTORES DE VOZ: todos devolvem um Future com os bytes do áudio, em ordem de preferência
+class MotorEdge:
+    nome = "edge-tts"
+    formato = "mp3"
+    guardar_no_bau = True
+    disponivel = True
+
+    def iniciar(self, texto):
+        return asyncio.run_coroutine_threadsafe(_gerar_voz_neural(texto), _loop_voz)
+
+class MotorPyttsx3:
+    """Plano B offline: a voz do sistema operacional, sem internet nenhuma."""
+    nome = "pyttsx3"
+    formato = "wav"
+    guardar_no_bau = False  # Voz robótica não entra no baú; na próxima vez a neural tenta de novo
+
+    def __init__(self):
+        self.disponivel = pyttsx3 is not None
+        # O SAPI odeia trocar de thread: o motor nasce e morre sempre na mesma
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voz-local")
+        self._motor = None
+
+    def iniciar(self, texto):
+        return self._executor.submit(self._sintetizar, texto)
+
+    def _sintetizar(self, texto):
+        if self._motor is None:
+            self._motor = pyttsx3.init()
+            for voz in self._motor.getProperty("voices"):
+                if any(p in f"{voz.id} {voz.name}".lower() for p in ("pt-br", "pt_br", "portug", "brazil")):
+                    self._motor.setProperty("voice", voz.id)
+                    break
+        descritor, caminho = tempfile.mkstemp(suffix=".wav")
+        os.close(descritor)
+        try:
+            self._motor.save_to_file(texto, caminho)
+            self._motor.runAndWait()
+            with open(caminho, "rb") as f: return f.read()
+        finally:
+            try: os.remove(caminho)
+            except OSError: pass
+
+MOTORES_VOZ = [MotorEdge(), MotorPyttsx3()]
+
+# O CRONÔMETRO DA GARGANTA: quanto cada motor demora e quantas vezes o plano B salvou o dia
+class MedidorVoz:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.acertos_bau = 0
+        self.reservas = 0
+        self._motores = defaultdict(lambda: {"falas": 0, "segundos": 0.0, "maximo": 0.0, "falhas": 0, "estouros": 0})
+
+    def registrar(self, motor, segundos=None, falhou=False, estourou=False):
+        with self._trava:
+            item = self._motores[motor]
+            if falhou: item["falhas"] += 1
+            if estourou: item["estouros"] += 1
+            if segundos is not None:
+                item["falas"] += 1
+                item["segundos"] += segundos
+                item["maximo"] = max(item["maximo"], segundos)
+
+    def contar(self, campo):
+        with self._trava: setattr(self, campo, getattr(self, campo) + 1)
+
+    def relatorio(self):
+        with self._trava:
+            linhas = [f"Voz: {self.acertos_bau} falas saíram do baú, plano B local usado {self.reservas}x"]
+            for nome, item in self._motores.items():
+                media = item["segundos"] / item["falas"] if item["falas"] else 0.0
+                linhas.append(f"  {nome}: {item['falas']} sínteses, {media:.2f}s em média (pior {item['maximo']:.2f}s), "
+                              f"{item['estouros']} estouros de orçamento, {item['falhas']} falhas")
+            return "\n".join(linhas)
+
+medidor_voz = MedidorVoz()
+
+def _disparar(motor, texto, chave):
+    inicio = time.perf_counter()
+    futuro = motor.iniciar(texto)
+
+    def ao_terminar(f):
+        if f.exception() is not None:
+            medidor_voz.registrar(motor.nome, falhou=True)
+            return
+        medidor_voz.registrar(motor.nome, time.perf_counter() - inicio)
+        # Mesmo se estourou o orçamento, a voz neural termina em segundo plano e já vai para o baú
+        if motor.guardar_no_bau: cache_voz.guardar(chave, f.result())
+
+    futuro.add_done_callback(ao_terminar)
+    return futuro
+
+def sintetizar(texto, orcamento=VOZ_ORCAMENTO_LATENCIA):
+    """Devolve (áudio, formato): do baú, do primeiro motor que responder dentro do orçamento ou do último da lista (com prazo maior)."""
+    chave = cache_voz.chave(texto)
+    audio = cache_voz.obter(chave)
+    if audio is not None:
+        medidor_voz.contar("acertos_bau")
+        return audio, "mp3"
+
+    motores = [motor for motor in MOTORES_VOZ if motor.disponivel]
+    erro = None
+    for i, motor in enumerate(motores):
+        ultimo = i == len(motores) - 1
+        try:
+            # Nem o último espera para sempre: edge-tts sem pyttsx3 numa rede travada seguraria todas as frases seguintes
+            audio = _disparar(motor, texto, chave).result(timeout=orcamento * VOZ_FOLGA_ULTIMO_MOTOR if ultimo else orcamento)
+        except FuturesTimeout:
+            medidor_voz.registrar(motor.nome, estourou=True)
+            if ultimo: erro = TimeoutError(f"{motor.nome} passou de {orcamento * VOZ_FOLGA_ULTIMO_MOTOR:.0f}s")
+            continue
+        except Exception as e:
+            erro = e
+            continue
+        if i > 0: medidor_voz.contar("reservas")
+        return audio, motor.formato
+    raise RuntimeError(f"nenhum motor de voz respondeu ({erro})")
+
+def pre_sintetizar(frases=FRASES_CONHECIDAS):
+    """Forja as falas fixas em segundo plano para os avisos tocarem na hora."""
+    def forjar():
+        neural = MOTORES_VOZ[0]
+        for frase in frases:
+            chave = cache_voz.chave(frase)
+            if cache_voz.obter(chave) is not None: continue
+            try: _disparar(neural, frase, chave).result()
+            except Exception: return  # Sem internet agora: elas serão forjadas na primeira vez que forem ditas
+    threading.Thread(target=forjar, daemon=True).start()
+
+# A BOCA QUE NÃO TRAVA NINGUÉM: uma thread forja a próxima frase enquanto a outra toca a atual
+class Locutor:
+    def __init__(self, antecipacao=2):
+        self._fila_sintese = queue.Queue()
+        self._fila_audio = queue.Queue(maxsize=antecipacao)  # Quantas falas ficam prontas esperando a vez
+        self._geracao = 0  # Interromper = mudar de geração; tudo que for da geração velha vira lixo
+        self._pendentes = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop_sintese, daemon=True).start()
+        threading.Thread(target=self._loop_tocador, daemon=True).start()
+
+    def falar(self, texto):
+        with self._cond:
+            self._pendentes += 1
+            geracao = self._geracao
+        self._fila_sintese.put((geracao, texto))
+
+    def _vigente(self, geracao):
+        return geracao == self._geracao
+
+    def _concluir(self):
+        with self._cond:
+            self._pendentes -= 1
+            if self._pendentes == 0: self._cond.notify_all()
+
+    def _loop_sintese(self):
+        while True:
+            geracao, texto = self._fila_sintese.get()
+            if not self._vigente(geracao): self._concluir(); continue
+            try: audio = sintetizar(texto)
+            except Exception as e:
+                console.print(f"[bold red]Curto-circuito na caixa de voz:[/bold red] {e}")
+                self._concluir(); continue
+            self._fila_audio.put((geracao, *audio))
+
+    def _loop_tocador(self):
+        while True:
+            geracao, audio, formato = self._fila_audio.get()
+            try:
+                if self._vigente(geracao): self._tocar(geracao, audio, formato)
+            except Exception as e:
+                console.print(f"[bold red]Curto-circuito na caixa de voz:[/bold red] {e}")
+            finally:
+                self._concluir()
+
+    def _tocar(self, geracao, audio, formato):
+        # Carrega e liberta a magia acústica direto da memória, sem arquivo no meio!
+        pygame.mixer.music.load(BytesIO(audio), formato)
         pygame.mixer.music.play()
-        
-        # Trava a execução do terminal enquanto ela fala, para não atropelar os áudios
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10) # Limita a CPU para não explodir a máquina
-            
+        with self._cond:
+            while pygame.mixer.music.get_busy() and self._vigente(geracao):
+                self._cond.wait(0.05)  # Acorda na hora se alguém mandar calar
+        if not self._vigente(geracao): pygame.mixer.music.stop()
         pygame.mixer.music.unload()
-        
-    except Exception as e:
-        console.print(f"[bold red]Curto-circuito na caixa de voz:[/bold red] {e}")
\ No newline at end of file
+
+    def interromper(self):
+        with self._cond:
+            self._geracao += 1
+            self._cond.notify_all()
+        # O que nem foi forjado ainda é só descartar; o que já está pronto o tocador joga fora
+        while True:
+            try: self._fila_sintese.get_nowait()
+            except queue.Empty: break
+            self._concluir()
+
+    def aguardar(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pendentes == 0, timeout)
+
+    def falando(self):
+        return self._pendentes > 0
+
+locutor = Locutor()
+
+# A Nova Boca: só enfileira e volta, quem fala é o Locutor
+def falar(texto):
+    console.print(f"[bold cyan]Astra:[/bold cyan] {texto}")
+    locutor.falar(texto)
+
+def interromper_fala():
+    locutor.interromper()
+
+def aguardar_fala(timeout=None):
+    """Espera a Astra terminar tudo o que está na fila (True se terminou dentro do timeout)."""
+    return locutor.aguardar(timeout)
+
+def falando():
+    return locutor.falando()
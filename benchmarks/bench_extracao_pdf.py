@@ -0,0 +1,77 @@
+"""Quanto custa ler um PDF grande: extração sequencial, repartida entre processos e direto do cache do disco.
+
+Gera um PDF de várias centenas de páginas de texto (sem depender de nada além do PyPDF2 para ler).
+
+Uso: python benchmarks/bench_extracao_pdf.py [páginas] [processos]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Astra_Core.config import PDF_PROCESSOS
+from core.extrator_pdf import ExtratorPdf, hash_conteudo
+
+PALAVRAS = ("motor sistema instalação configuração rede usuário senha backup servidor disco memória garantia "
+            "placa vídeo driver atualização firmware energia ventoinha temperatura").split()
+
+def gerar_pdf(caminho, paginas, linhas_por_pagina=45):
+    """Escreve o PDF na mão: uma fonte Helvetica, uma página com ~45 linhas de texto por objeto."""
+    aleatorio = random.Random(42)
+    objetos = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    filhos = []
+    for numero in range(paginas):
+        linhas = [f"Pagina {numero + 1}."] + [" ".join(aleatorio.choice(PALAVRAS) for _ in range(12)) for _ in range(linhas_por_pagina)]
+        texto = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({linha.encode('latin-1', 'replace').decode('latin-1')}) Tj T*" for linha in linhas) + " ET"
+        fluxo = texto.encode("latin-1", "replace")
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(fluxo) + fluxo + b"\nendstream")
+        conteudo = len(objetos)
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % conteudo)
+        filhos.append(len(objetos))
+    objetos[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % n for n in filhos) + b"] /Count %d >>" % paginas
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, corpo in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + corpo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % posicao for posicao in posicoes)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    with open(caminho, "wb") as f: f.write(saida)
+
+def medir(nome, funcao):
+    inicio = time.perf_counter()
+    paginas = funcao()
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:<34} {segundos * 1000:10.1f} ms  ({len(paginas)} páginas, {sum(len(p) for p in paginas) // 1024} KB de texto)")
+    return paginas
+
+def main():
+    paginas = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    processos = int(sys.argv[2]) if len(sys.argv) > 2 else max(2, PDF_PROCESSOS)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "manual.pdf")
+        gerar_pdf(caminho, paginas)
+        print(f"PDF de teste: {paginas} páginas, {os.path.getsize(caminho) // 1024} KB, {os.cpu_count()} núcleos\n")
+        chave = hash_conteudo(caminho)
+
+        sequencial = ExtratorPdf(pasta=os.path.join(pasta, "cache_seq"), processos=1)
+        paralelo = ExtratorPdf(pasta=os.path.join(pasta, "cache_par"), processos=processos)
+        # Sobe os processos antes de medir: na Astra o pool fica de pé entre um PDF e outro
+        list(paralelo._executor().map(abs, range(processos)))
+
+        base = medir("sequencial (1 processo)", lambda: sequencial.extrair(caminho, chave))
+        resultado = medir(f"repartido ({processos} processos)", lambda: paralelo.extrair(caminho, chave))
+        medir("cache do disco (mesmo conteúdo)", lambda: paralelo.extrair(caminho, chave))
+        assert resultado == base, "o texto paralelo tem que sair idêntico ao sequencial"
+
+        inicio = time.perf_counter()
+        primeira = next(iter(ExtratorPdf(pasta=os.path.join(pasta, "cache_fluxo"), processos=processos).paginas(caminho)))
+        print(f"{'primeira página em fluxo':<34} {(time.perf_counter() - inicio) * 1000:10.1f} ms  (página {primeira[0] + 1})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Quanto custa decidir a ferramenta: a velha cadeia de `any(g in comando ...)` contra o roteador compilado.
+
+Uso: python benchmarks/bench_intencoes.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Astra_Core.intencoes import INTENCOES, Intencao, RoteadorIntencoes
+
+REPETICOES = 2000
+COMANDOS = [
+    "astra, como você está hoje?",  # Cai no cérebro: o pior caso da cadeia (testa tudo)
+    "abrir chrome",  # Um dos últimos da cadeia
+    "status do sistema",  # Um dos primeiros
+    "clima em belo horizonte",
+]
+
+def intencoes_sinteticas(quantidade):
+    aleatorio = random.Random(42)
+    silabas = ["ra", "te", "mo", "li", "ze", "ka", "nu", "po", "vi", "so"]
+    extras = []
+    for n in range(quantidade):
+        gatilhos = ["".join(aleatorio.choice(silabas) for _ in range(4)) + f" {n}" for _ in range(3)]
+        extras.append(Intencao(f"sintetica_{n}", gatilhos))
+    return extras
+
+def cadeia_antiga(intencoes):
+    # Exatamente o que o main() fazia: uma varredura de substring por gatilho, na ordem do elif
+    def rotear(comando):
+        for intencao in intencoes:
+            if any(g in comando for g in intencao.gatilhos) and all(p in comando for p in intencao.exige):
+                return intencao.nome
+        return None
+    return rotear
+
+def medir(rotear):
+    tempo = timeit.timeit(lambda: [rotear(c) for c in COMANDOS], number=REPETICOES)
+    return tempo / (REPETICOES * len(COMANDOS)) * 1e6
+
+def main():
+    print(f"{'intenções':>10} {'gatilhos':>9} {'cadeia (µs)':>12} {'roteador (µs)':>14} {'compilar (ms)':>14}")
+    for extra in (0, 25, 100, 400, 1600):
+        intencoes = INTENCOES + intencoes_sinteticas(extra)
+        inicio = timeit.default_timer()
+        roteador = RoteadorIntencoes(intencoes)
+        compilar = (timeit.default_timer() - inicio) * 1e3
+        gatilhos = sum(len(i.gatilhos) for i in intencoes)
+        print(f"{len(intencoes):>10} {gatilhos:>9} {medir(cadeia_antiga(intencoes)):>12.2f} {medir(roteador.rotear):>14.2f} {compilar:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from Astra_Core.config import ARQUIVO_LEMBRETES, LEMBRETES_VIGIA_MAXIMA
+from core.terminal import console
+
+def mensagem_lembrete(tarefa, quando, atraso):
+    # Atraso pequeno (a thread acordou uns segundos depois) não merece desculpa
+    if atraso.total_seconds() < 60: return f"Lembrete: {tarefa}"
+    return f"Lembrete atrasado (era para {quando.strftime('%d/%m %H:%M')}): {tarefa}"
+
+# O DESPERTADOR: um heap com o próximo lembrete no topo e uma thread que dorme até a hora dele
+class AgendaLembretes:
+    def __init__(self, arquivo=ARQUIVO_LEMBRETES, vigia_maxima=LEMBRETES_VIGIA_MAXIMA):
+        self.arquivo = arquivo
+        self.vigia_maxima = vigia_maxima
+        self._heap = []  # (quando, ordem, tarefa)
+        self._ordem = itertools.count()
+        self._ouvintes = []
+        self._cond = threading.Condition()
+        self._vigia = None
+        self._carregar()
+
+    # ---------- Disco (write-through: toda mudança já vai para o arquivo) ----------
+    def _carregar(self):
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f: lista = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if not isinstance(lista, list):
+            console.print(f"[yellow]Lembretes: '{self.arquivo}' não é uma lista de lembretes; começando com a agenda vazia[/yellow]")
+            return
+        # Um lembrete estragado (editado à mão, horário "25:99"...) é descartado sozinho, sem derrubar a partida da Astra
+        reescrever = False
+        for item in lista:
+            try:
+                if "quando" in item:
+                    quando = datetime.fromisoformat(item["quando"])
+                else:
+                    quando = self._converter_horario(item["horario"])
+                    reescrever = True
+                tarefa = item["tarefa"]
+            except (ValueError, KeyError, TypeError) as e:
+                console.print(f"[yellow]Lembretes: ignorando lembrete inválido {item!r}:[/yellow] {e}")
+                reescrever = True
+                continue
+            heapq.heappush(self._heap, (quando, next(self._ordem), tarefa))
+        if reescrever: self._gravar()
+
+    @staticmethod
+    def _converter_horario(horario):
+        # Formato antigo só tinha "HH:MM": vale hoje, a não ser que isso tenha passado há mais de 12h (aí era amanhã)
+        agora = datetime.now()
+        hora, minuto = map(int, horario.split(":"))
+        quando = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        if agora - quando > timedelta(hours=12): quando += timedelta(days=1)
+        return quando
+
+    def _gravar(self):
+        lista = [{"tarefa": tarefa, "quando": quando.isoformat(timespec="seconds")} for quando, _, tarefa in sorted(self._heap)]
+        temporario = self.arquivo + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f: json.dump(lista, f, ensure_ascii=False, indent=1)
+            os.replace(temporario, self.arquivo)
+        except OSError as e:
+            console.print(f"[red]Lembretes: falha ao gravar '{self.arquivo}':[/red] {e}")
+
+    # ---------- API ----------
+    def agendar(self, tarefa, quando):
+        with self._cond:
+            heapq.heappush(self._heap, (quando, next(self._ordem), tarefa))
+            self._gravar()
+            self._cond.notify()  # Pode ser o novo primeiro da fila: a vigia recalcula o sono
+        return quando
+
+    def pendentes(self):
+        with self._cond:
+            return [(quando, tarefa) for quando, _, tarefa in sorted(self._heap)]
+
+    def inscrever(self, ouvinte):
+        """ouvinte(tarefa, quando, atraso) é chamado na thread da vigia; precisa ser rápido (só enfileirar)."""
+        with self._cond: self._ouvintes.append(ouvinte)
+
+    def iniciar(self):
+        # Chamado depois de os ouvintes se inscreverem: os atrasados (PC desligado, etc.) disparam logo de cara
+        with self._cond:
+            if self._vigia is not None: return
+            self._vigia = threading.Thread(target=self._loop_vigia, daemon=True)
+            self._vigia.start()
+
+    def _loop_vigia(self):
+        while True:
+            with self._cond:
+                while True:
+                    agora = datetime.now()
+                    if self._heap and self._heap[0][0] <= agora: break
+                    espera = (self._heap[0][0] - agora).total_seconds() if self._heap else self.vigia_maxima
+                    self._cond.wait(min(espera, self.vigia_maxima))
+                vencidos = []
+                while self._heap and self._heap[0][0] <= agora:
+                    quando, _, tarefa = heapq.heappop(self._heap)
+                    vencidos.append((tarefa, quando, agora - quando))
+                self._gravar()
+                ouvintes = list(self._ouvintes)
+            for tarefa, quando, atraso in vencidos:
+                for ouvinte in ouvintes:
+                    try: ouvinte(tarefa, quando, atraso)
+                    except Exception as e: console.print(f"[red]Lembretes: um ouvinte falhou:[/red] {e}")
+
+agenda_lembretes = AgendaLembretes()
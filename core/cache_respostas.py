@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from Astra_Core.config import ARQUIVO_CACHE_RESPOSTAS, CACHE_RESPOSTAS_CAPACIDADE, CACHE_RESPOSTAS_TTL, CACHE_RESPOSTAS_MAX_DISCO
+
+# A MEMÓRIA DE PEIXINHO DOURADO (só que com HD): respostas prontas para perguntas repetidas
+class CacheRespostas:
+    def __init__(self, arquivo=ARQUIVO_CACHE_RESPOSTAS, capacidade=CACHE_RESPOSTAS_CAPACIDADE,
+                 ttl=CACHE_RESPOSTAS_TTL, max_disco=CACHE_RESPOSTAS_MAX_DISCO):
+        self.arquivo = arquivo
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.max_disco = max_disco
+
+        self._trava = threading.Lock()
+        self._memoria = OrderedDict()  # chave -> (expira_em, resposta), em ordem de uso (LRU)
+        self._voando = {}  # chave -> Future da geração que já está rodando
+        self._banco = None
+        self.contagem = Counter()
+
+    @staticmethod
+    def chave(modelo, system, prompt, opcoes=None):
+        bruto = json.dumps([modelo, system, prompt, opcoes or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    # ---------- Camada de disco (sobrevive a reinícios) ----------
+    def _disco(self):
+        if self._banco is None:
+            self._banco = sqlite3.connect(self.arquivo, check_same_thread=False)
+            self._banco.execute("CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, resposta TEXT, expira_em REAL, usado_em REAL)")
+            self._banco.execute("DELETE FROM respostas WHERE expira_em < ?", (time.time(),))
+            self._banco.commit()
+        return self._banco
+
+    def _ler_disco(self, chave, agora):
+        linha = self._disco().execute("SELECT resposta, expira_em FROM respostas WHERE chave = ?", (chave,)).fetchone()
+        if not linha: return None
+        banco = self._disco()
+        if linha[1] < agora:
+            banco.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            banco.commit()
+            return None
+        banco.execute("UPDATE respostas SET usado_em = ? WHERE chave = ?", (agora, chave))
+        banco.commit()
+        return linha
+
+    def _gravar_disco(self, chave, resposta, expira_em, agora):
+        banco = self._disco()
+        banco.execute("INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?)", (chave, resposta, expira_em, agora))
+        # Faxina: o disco também tem limite, sai quem está há mais tempo sem uso
+        banco.execute("DELETE FROM respostas WHERE chave IN (SELECT chave FROM respostas ORDER BY usado_em DESC LIMIT -1 OFFSET ?)", (self.max_disco,))
+        banco.commit()
+
+    # ---------- Consulta ----------
+    def obter(self, chave):
+        agora = time.time()
+        with self._trava:
+            item = self._memoria.get(chave)
+            if item and item[0] >= agora:
+                self._memoria.move_to_end(chave)
+                self.contagem["acertos_memoria"] += 1
+                return item[1]
+            if item: del self._memoria[chave]
+
+            try: linha = self._ler_disco(chave, agora)
+            except sqlite3.Error: linha = None
+            if linha:
+                self._guardar_memoria(chave, linha[0], linha[1])
+                self.contagem["acertos_disco"] += 1
+                return linha[0]
+            self.contagem["faltas"] += 1
+            return None
+
+    def _guardar_memoria(self, chave, resposta, expira_em):
+        self._memoria[chave] = (expira_em, resposta)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.capacidade:
+            self._memoria.popitem(last=False)
+
+    def guardar(self, chave, resposta):
+        agora = time.time()
+        expira_em = agora + self.ttl
+        with self._trava:
+            self._guardar_memoria(chave, resposta, expira_em)
+            try: self._gravar_disco(chave, resposta, expira_em, agora)
+            except sqlite3.Error: pass  # Sem disco, o cache de memória continua valendo
+
+    # ---------- Single-flight: pedidos iguais ao mesmo tempo dividem uma geração ----------
+    def _reservar(self, chave):
+        with self._trava:
+            # Alguém pode ter terminado a mesma geração entre o obter() e agora
+            item = self._memoria.get(chave)
+            if item and item[0] >= time.time():
+                futuro = Future()
+                futuro.set_result(item[1])
+                return futuro, False
+            futuro = self._voando.get(chave)
+            if futuro is not None:
+                self.contagem["coalescidos"] += 1
+                return futuro, False
+            futuro = Future()
+            self._voando[chave] = futuro
+            return futuro, True
+
+    def _concluir(self, chave, futuro, resposta=None, erro=None):
+        with self._trava:
+            self._voando.pop(chave, None)
+        if erro is not None: futuro.set_exception(erro)
+        else: futuro.set_result(resposta)
+
+    def obter_ou_gerar(self, chave, gerar):
+        resposta = self.obter(chave)
+        if resposta is not None: return resposta
+
+        futuro, dono = self._reservar(chave)
+        if not dono: return futuro.result()
+        try:
+            resposta = gerar()
+        except BaseException as e:
+            self._concluir(chave, futuro, erro=e)
+            raise
+        self.guardar(chave, resposta)
+        self._concluir(chave, futuro, resposta)
+        return resposta
+
+    async def aobter_ou_gerar(self, chave, agerar):
+        resposta = self.obter(chave)
+        if resposta is not None: return resposta
+
+        futuro, dono = self._reservar(chave)
+        # Funciona até entre threads: a voz gera e o Discord só espera o resultado
+        if not dono: return await asyncio.wrap_future(futuro)
+        try:
+            resposta = await agerar()
+        except BaseException as e:
+            self._concluir(chave, futuro, erro=e)
+            raise
+        self.guardar(chave, resposta)
+        self._concluir(chave, futuro, resposta)
+        return resposta
+
+    # ---------- Painel ----------
+    def estatisticas(self):
+        with self._trava:
+            acertos = self.contagem["acertos_memoria"] + self.contagem["acertos_disco"]
+            total = acertos + self.contagem["faltas"]
+            return {
+                **self.contagem,
+                "em_memoria": len(self._memoria),
+                "taxa_acerto": acertos / total if total else 0.0,
+            }
+
+    def relatorio(self):
+        est = self.estatisticas()
+        return (f"Cache de respostas: {est['taxa_acerto']:.0%} de acerto | memória={est.get('acertos_memoria', 0)} "
+                f"disco={est.get('acertos_disco', 0)} faltas={est.get('faltas', 0)} coalescidos={est.get('coalescidos', 0)} "
+                f"({est['em_memoria']} na RAM)")
+
+# O cache único que a voz e o Discord dividem
+cache_respostas = CacheRespostas()
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from Astra_Core.config import CONTEXTO_ORCAMENTO_TOKENS, CONTEXTO_TURNOS_RECENTES, CONVERSAS_MAX_VIVAS, CONVERSAS_OCIOSIDADE
+from core.sessoes import armazem_sessoes
+from core.terminal import console
+
+PROMPT_RESUMO = """
+<directive>
+Resuma a conversa abaixo entre o criador e a Astra em tópicos curtos (máximo de 150 palavras).
+Preserve nomes, fatos, preferências, decisões e pendências do criador. Não invente nada.
+</directive>
+<resumo_anterior>{resumo}</resumo_anterior>
+<conversa>
+{conversa}
+</conversa>
+"""
+
+def _formatar_turnos(turnos):
+    return "\n".join(f"Criador: {t['criador']}\nAstra: {t['astra']}" for t in turnos)
+
+# A DIETA DO CONTEXTO: conversa longa vira resumo, só os últimos turnos ficam palavra por palavra
+class Conversa:
+    def __init__(self, nome, resumir, armazem=armazem_sessoes,
+                 orcamento=CONTEXTO_ORCAMENTO_TOKENS, turnos_recentes=CONTEXTO_TURNOS_RECENTES):
+        self.nome = nome
+        self.resumir = resumir  # função(prompt) -> texto, quem chama é o cérebro
+        self.armazem = armazem
+        self.orcamento = orcamento
+        self.turnos_recentes = turnos_recentes
+        self.sessao = armazem.carregar(nome)
+        self._trava = threading.Lock()
+        self._compactando = False
+        self.em_uso = 0  # Gerações segurando esta conversa (quem mexe é o GerenteConversas, com a trava dele)
+
+    @property
+    def meta(self):
+        return self.sessao.meta
+
+    def preparar(self, prompt):
+        """Devolve (prompt, context) para o Ollama: o context guardado ou, depois de compactar, o resumo em texto."""
+        with self._trava:
+            if not self.meta.get("reconstruir"):
+                return prompt, self.sessao.contexto_ollama()
+            partes = []
+            if self.meta.get("resumo"): partes.append(f"<memoria_resumida>{self.meta['resumo']}</memoria_resumida>")
+            if self.meta.get("turnos"): partes.append(f"<turnos_recentes>\n{_formatar_turnos(self.meta['turnos'])}\n</turnos_recentes>")
+            partes.append(prompt)
+            return "\n".join(partes), None
+
+    def registrar(self, prompt, resposta, data):
+        novo_contexto = data.get("context") or []
+        # O prompt_eval_count conta o que o Ollama mastigou agora; o context devolvido é o total acumulado
+        tokens = max(len(novo_contexto), (data.get("prompt_eval_count") or 0) + (data.get("eval_count") or 0))
+        with self._trava:
+            turnos = self.meta.setdefault("turnos", [])
+            turnos.append({"criador": prompt, "astra": resposta})
+            self.armazem.atualizar(self.nome, novo_contexto, turnos=turnos, tokens=tokens, reconstruir=False,
+                                   ultimo_prompt_eval=data.get("prompt_eval_count") or 0)
+            estourou = tokens > self.orcamento
+            precisa_compactar = estourou and len(turnos) > self.turnos_recentes and not self._compactando
+            if precisa_compactar: self._compactando = True
+            elif estourou and len(turnos) <= self.turnos_recentes:
+                # Nada antigo para resumir (ex: memória herdada do astra_memory.json): recomeça só com os turnos em texto
+                self.armazem.atualizar(self.nome, [], reconstruir=True, tokens=0)
+        if precisa_compactar:
+            # O resumo roda depois da resposta já entregue: ninguém espera por ele
+            threading.Thread(target=self._compactar, daemon=True).start()
+
+    def _compactar(self):
+        try:
+            with self._trava:
+                turnos = list(self.meta.get("turnos", []))
+                antigos = turnos[:-self.turnos_recentes]
+                resumo_anterior = self.meta.get("resumo", "")
+            if not antigos: return
+
+            resumo = self.resumir(PROMPT_RESUMO.format(resumo=resumo_anterior or "(nenhum)", conversa=_formatar_turnos(antigos)))
+            if not resumo: return
+
+            with self._trava:
+                # Turnos que chegaram durante o resumo continuam intactos
+                restantes = self.meta.get("turnos", [])[len(antigos):]
+                self.armazem.atualizar(self.nome, [], turnos=restantes, resumo=resumo, reconstruir=True,
+                                       tokens=0, compactacoes=self.meta.get("compactacoes", 0) + 1)
+        except Exception as e:
+            console.print(f"[red]Contexto: falha ao compactar '{self.nome}':[/red] {e}")
+        finally:
+            self._compactando = False
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "tokens": self.meta.get("tokens", 0),
+                "orcamento": self.orcamento,
+                "turnos_verbatim": len(self.meta.get("turnos", [])),
+                "compactacoes": self.meta.get("compactacoes", 0),
+                "ultimo_prompt_eval": self.meta.get("ultimo_prompt_eval", 0),
+            }
+
+# O SALÃO DE CONVERSAS: só as quentes ficam na RAM, o resto dorme no cofre de sessões
+class GerenteConversas:
+    def __init__(self, resumir, armazem=armazem_sessoes, max_vivas=CONVERSAS_MAX_VIVAS,
+                 ociosidade=CONVERSAS_OCIOSIDADE, fixas=("voz",)):
+        self.resumir = resumir
+        self.armazem = armazem
+        self.max_vivas = max_vivas
+        self.ociosidade = ociosidade
+        self.fixas = set(fixas)  # A conversa de voz nunca expira por ociosidade
+        self._vivas = OrderedDict()  # nome -> [conversa, último uso], em ordem de uso (LRU)
+        self._trava = threading.Lock()
+        self.despejadas = 0
+
+    def obter(self, nome, reservar=False):
+        """A conversa viva (acordando do cofre se preciso). A faxina das ociosas roda aqui, em cada obter: não há relógio próprio."""
+        agora = time.monotonic()
+        with self._trava:
+            item = self._vivas.get(nome)
+            if item is None:
+                item = self._vivas[nome] = [Conversa(nome, self.resumir, self.armazem), agora]
+            item[1] = agora
+            self._vivas.move_to_end(nome)
+            if reservar: item[0].em_uso += 1
+            despejar = self._escolher_despejos(agora)
+        # Dormir = gravar no disco e sair da RAM; na próxima mensagem ela acorda do cofre com o context intacto
+        for conversa in despejar: self.armazem.liberar(conversa.nome)
+        return item[0]
+
+    @contextmanager
+    def usar(self, nome):
+        """Segura a conversa na RAM do preparar() ao registrar(): ela não dorme no meio de uma geração."""
+        conversa = self.obter(nome, reservar=True)
+        try: yield conversa
+        finally:
+            with self._trava: conversa.em_uso -= 1
+
+    def _escolher_despejos(self, agora):
+        # Conversa gerando ou resumindo não dorme: o turno (ou o resumo) iria parar numa sessão já liberada
+        ocupada = lambda conversa: conversa.em_uso or conversa._compactando
+        despejar = []
+        for nome, (conversa, ultimo_uso) in list(self._vivas.items()):
+            if nome not in self.fixas and agora - ultimo_uso > self.ociosidade and not ocupada(conversa):
+                despejar.append(self._vivas.pop(nome)[0])
+        # Lotou: saem as paradas há mais tempo (se todas estiverem ocupadas, fica acima do limite até alguma terminar)
+        for nome, (conversa, _) in list(self._vivas.items()):
+            if len(self._vivas) <= self.max_vivas: break
+            if not ocupada(conversa): despejar.append(self._vivas.pop(nome)[0])
+        self.despejadas += len(despejar)
+        return despejar
+
+    def estatisticas(self):
+        with self._trava:
+            return {"vivas": len(self._vivas), "max_vivas": self.max_vivas, "despejadas": self.despejadas}
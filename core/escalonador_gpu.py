@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+# Classes de prioridade (número menor passa na frente)
+PRIORIDADE_VOZ = 0      # Quem está falando com a Astra agora
+PRIORIDADE_DISCORD = 1  # Mensagens do bolso
+PRIORIDADE_FUNDO = 2    # Narração de ferramentas e tarefas de segundo plano
+
+NOMES_PRIORIDADE = {PRIORIDADE_VOZ: "voz", PRIORIDADE_DISCORD: "discord", PRIORIDADE_FUNDO: "fundo"}
+
+class PedidoCancelado(Exception):
+    """O pedido saiu da fila antes de ganhar a vez na GPU."""
+
+class EsperaEsgotada(PedidoCancelado):
+    """O pedido desistiu da fila: a vez na GPU não chegou dentro do prazo dele."""
+
+class _Ficha:
+    __slots__ = ("prioridade", "origem", "criado_em", "admitido", "cancelado", "avisar")
+
+    def __init__(self, prioridade, origem, avisar):
+        self.prioridade = prioridade
+        self.origem = origem
+        self.criado_em = time.monotonic()
+        self.admitido = False
+        self.cancelado = False
+        self.avisar = avisar
+
+# O PORTEIRO DA GPU: ninguém entra no Ollama sem ficha
+class EscalonadorGPU:
+    def __init__(self, limite=1, janela_estatisticas=200):
+        self.limite = limite
+        self._trava = threading.Lock()
+        # prioridade -> {origem: deque de fichas}; a ordem do OrderedDict é o rodízio entre origens
+        self._filas = {p: OrderedDict() for p in NOMES_PRIORIDADE}
+        self._na_fila = {p: 0 for p in NOMES_PRIORIDADE}
+        self._ativos = 0
+        self._esperas = {p: deque(maxlen=janela_estatisticas) for p in NOMES_PRIORIDADE}
+        self._atendidos = 0
+        self._cancelados = 0
+
+    # ---------- Miolo (sempre com a trava segura) ----------
+    def _proxima(self):
+        for prioridade in sorted(self._filas):
+            origens = self._filas[prioridade]
+            while origens:
+                origem, fila = next(iter(origens.items()))
+                ficha = fila.popleft()
+                if fila: origens.move_to_end(origem)  # Rodízio justo: a próxima origem joga na próxima vaga
+                else: del origens[origem]
+                if ficha.cancelado: continue
+                self._na_fila[prioridade] -= 1
+                return ficha
+        return None
+
+    def _despachar(self):
+        while self._ativos < self.limite:
+            ficha = self._proxima()
+            if ficha is None: return
+            ficha.admitido = True
+            self._ativos += 1
+            self._atendidos += 1
+            self._esperas[ficha.prioridade].append(time.monotonic() - ficha.criado_em)
+            ficha.avisar()
+
+    def _entrar(self, prioridade, origem, avisar):
+        if prioridade not in self._filas: raise ValueError(f"Prioridade desconhecida: {prioridade}")
+        ficha = _Ficha(prioridade, origem, avisar)
+        with self._trava:
+            self._filas[prioridade].setdefault(origem, deque()).append(ficha)
+            self._na_fila[prioridade] += 1
+            self._despachar()
+        return ficha
+
+    def _sair(self, ficha):
+        with self._trava:
+            if ficha.admitido:
+                self._ativos -= 1
+                self._despachar()
+            elif not ficha.cancelado:
+                # Desistiu enquanto esperava: vira fantasma e o _proxima pula ela
+                ficha.cancelado = True
+                self._na_fila[ficha.prioridade] -= 1
+                self._cancelados += 1
+
+    # ---------- Portas de entrada ----------
+    @contextmanager
+    def vaga(self, prioridade=PRIORIDADE_FUNDO, origem="astra", espera_maxima=None):
+        chegou = threading.Event()
+        ficha = self._entrar(prioridade, origem, chegou.set)
+        try:
+            # Com espera_maxima, quem tem pressa desiste da fila em vez de esperar a GPU desocupar
+            if not chegou.wait(espera_maxima) and not ficha.admitido:
+                raise EsperaEsgotada(f"Pedido de '{origem}' desistiu após {espera_maxima}s na fila")
+            if ficha.cancelado: raise PedidoCancelado(f"Pedido de '{origem}' cancelado na fila")
+            yield ficha
+        finally:
+            self._sair(ficha)
+
+    @asynccontextmanager
+    async def vaga_async(self, prioridade=PRIORIDADE_DISCORD, origem="astra"):
+        loop = asyncio.get_running_loop()
+        chegou = loop.create_future()
+
+        def avisar():
+            loop.call_soon_threadsafe(lambda: chegou.done() or chegou.set_result(None))
+
+        ficha = self._entrar(prioridade, origem, avisar)
+        try:
+            await chegou
+            if ficha.cancelado: raise PedidoCancelado(f"Pedido de '{origem}' cancelado na fila")
+            yield ficha
+        finally:
+            self._sair(ficha)
+
+    def cancelar_origem(self, origem, prioridade_minima=PRIORIDADE_VOZ):
+        """Tira da fila tudo que ainda não começou dessa origem (quem já está na GPU termina)."""
+        avisos = []
+        with self._trava:
+            for prioridade, origens in self._filas.items():
+                if prioridade < prioridade_minima or origem not in origens: continue
+                for ficha in origens.pop(origem):
+                    if ficha.cancelado: continue
+                    ficha.cancelado = True
+                    self._na_fila[prioridade] -= 1
+                    self._cancelados += 1
+                    avisos.append(ficha.avisar)
+        for avisar in avisos: avisar()
+        return len(avisos)
+
+    # ---------- Painel de contenção ----------
+    def estatisticas(self):
+        with self._trava:
+            esperas = {}
+            for prioridade, amostras in self._esperas.items():
+                ordenadas = sorted(amostras)
+                esperas[NOMES_PRIORIDADE[prioridade]] = {
+                    "media_s": sum(ordenadas) / len(ordenadas) if ordenadas else 0.0,
+                    "p95_s": ordenadas[int(len(ordenadas) * 0.95)] if ordenadas else 0.0,
+                    "max_s": ordenadas[-1] if ordenadas else 0.0,
+                }
+            return {
+                "ativos": self._ativos,
+                "limite": self.limite,
+                "na_fila": {NOMES_PRIORIDADE[p]: n for p, n in self._na_fila.items()},
+                "atendidos": self._atendidos,
+                "cancelados": self._cancelados,
+                "espera": esperas,
+            }
+
+    def relatorio(self):
+        est = self.estatisticas()
+        linhas = [f"GPU: {est['ativos']}/{est['limite']} ocupadas | atendidos={est['atendidos']} cancelados={est['cancelados']}"]
+        for nome, espera in est["espera"].items():
+            linhas.append(f"  {nome}: fila={est['na_fila'][nome]} espera média={espera['media_s']:.2f}s p95={espera['p95_s']:.2f}s máx={espera['max_s']:.2f}s")
+        return "\n".join(linhas)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from Astra_Core.config import PASTA_DOCUMENTOS, PDF_PROCESSOS, PDF_PAGINAS_POR_LOTE, PDF_MINIMO_PARALELO
+from core.trabalhador_pdf import ler_pdf, extrair_lote
+from core.terminal import console
+
+def hash_conteudo(caminho):
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""): resumo.update(bloco)
+    return resumo.hexdigest()
+
+# A LINHA DE MONTAGEM DO GRANDE SÁBIO: páginas repartidas entre processos, texto guardado pelo hash do conteúdo
+class ExtratorPdf:
+    def __init__(self, pasta=PASTA_DOCUMENTOS, processos=PDF_PROCESSOS, lote=PDF_PAGINAS_POR_LOTE, minimo_paralelo=PDF_MINIMO_PARALELO):
+        self.pasta = pasta
+        self.processos = processos
+        self.lote = lote
+        self.minimo_paralelo = minimo_paralelo
+        self._pool = None
+        self._trava = threading.Lock()
+
+    def _executor(self):
+        # Os processos só sobem no primeiro PDF grande e ficam de pé para os próximos.
+        # Spawn em todo sistema (igual ao Windows): a função que roda lá dentro mora no trabalhador_pdf, que só depende do PyPDF2
+        with self._trava:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processos, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _descartar(self, executor):
+        # Um processo do pool morreu (PDF que derruba o PyPDF2, falta de memória...): o pool inteiro fica inútil,
+        # então o próximo PDF grande sobe um novo
+        with self._trava:
+            if self._pool is executor: self._pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _arquivo_cache(self, chave):
+        return os.path.join(self.pasta, f"{chave}.json")
+
+    def _ler_cache(self, chave):
+        try:
+            with open(self._arquivo_cache(chave), "r", encoding="utf-8") as f: return json.load(f)["paginas"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+
+    def _gravar_cache(self, chave, paginas):
+        arquivo = self._arquivo_cache(chave)
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            temporario = arquivo + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f: json.dump({"paginas": paginas}, f, ensure_ascii=False)
+            os.replace(temporario, arquivo)
+        except OSError as e:
+            console.print(f"[red]Extrator PDF: falha ao gravar o texto extraído:[/red] {e}")
+
+    def paginas(self, caminho):
+        """Gera (índice da página, texto) conforme cada lote fica pronto, fora de ordem quando há paralelismo."""
+        with open(caminho, "rb") as f:
+            leitor = ler_pdf(f)
+            total = len(leitor.pages)
+            if total < self.minimo_paralelo or self.processos <= 1:
+                # PDF pequeno (ou máquina sem núcleo sobrando): aqui mesmo, página por página
+                for indice, pagina in enumerate(leitor.pages): yield indice, pagina.extract_text() or ""
+                return
+        # Cada lote relê a estrutura do PDF no seu processo: lotes grandes (uns 3 por processo) diluem esse custo
+        lote = max(self.lote, -(-total // (self.processos * 3)))
+        lotes = {inicio: min(total, inicio + lote) for inicio in range(0, total, lote)}
+        executor = self._executor()
+        futuros = []
+        try:
+            try:
+                futuros = [executor.submit(extrair_lote, caminho, inicio, fim) for inicio, fim in lotes.items()]
+                for futuro in as_completed(futuros):
+                    inicio, textos = futuro.result()
+                    del lotes[inicio]
+                    yield from enumerate(textos, inicio)
+            except BrokenProcessPool as e:
+                console.print(f"[yellow]Extrator PDF: o pool de processos quebrou; terminando '{os.path.basename(caminho)}' aqui mesmo:[/yellow] {e}")
+                self._descartar(executor)
+                for inicio, fim in list(lotes.items()):
+                    yield from enumerate(extrair_lote(caminho, inicio, fim)[1], inicio)
+        finally:
+            for futuro in futuros: futuro.cancel()  # Quem desistiu no meio não deixa o pool ocupado à toa
+
+    def extrair(self, caminho, chave=None):
+        """Lista com o texto de cada página; do cache do disco quando esse conteúdo já foi lido uma vez."""
+        chave = chave or hash_conteudo(caminho)
+        paginas = self._ler_cache(chave)
+        if paginas is not None: return paginas
+        recebidas = dict(self.paginas(caminho))
+        paginas = [recebidas[i] for i in range(len(recebidas))]
+        self._gravar_cache(chave, paginas)
+        return paginas
+
+extrator_pdf = ExtratorPdf()
@@ -0,0 +1,113 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+from Astra_Core.config import DOCUMENTO_TRECHO_PALAVRAS, DOCUMENTO_TRECHO_SOBREPOSICAO, DOCUMENTO_TOP_K, DOCUMENTOS_NA_RAM
+from core.extrator_pdf import extrator_pdf, hash_conteudo
+
+# Palavras que aparecem em todo trecho e só atrapalham a pontuação
+PALAVRAS_VAZIAS = set("""
+a o e as os um uma uns umas de da do das dos em na no nas nos por para pra com sem que se ao aos
+é ser foi são era isso isto esse essa este esta qual quais como onde quando sobre mais menos muito
+me te lhe eu voce você ele ela eles elas meu minha seu sua the of and to in is
+""".split())
+PEDIDO_DE_RESUMO = re.compile(r"resum|pontos principais|do que se trata|sobre o que|vis[aã]o geral|explique o documento")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    return [palavra for palavra in re.findall(r"[a-z0-9]+", sem_acento) if len(palavra) > 1 and palavra not in PALAVRAS_VAZIAS]
+
+def _picar(paginas, palavras_por_trecho=DOCUMENTO_TRECHO_PALAVRAS, sobreposicao=DOCUMENTO_TRECHO_SOBREPOSICAO):
+    """[(página inicial, texto)]: janelas de palavras que atravessam as quebras de página."""
+    palavras = []  # (palavra, número da página)
+    for numero, texto in enumerate(paginas, 1): palavras += [(palavra, numero) for palavra in texto.split()]
+    passo = max(1, palavras_por_trecho - sobreposicao)
+    trechos = []
+    for inicio in range(0, len(palavras), passo):
+        janela = palavras[inicio:inicio + palavras_por_trecho]
+        trechos.append((janela[0][1], " ".join(palavra for palavra, _ in janela)))
+        if inicio + palavras_por_trecho >= len(palavras): break
+    return trechos
+
+# O FICHÁRIO DO GRANDE SÁBIO: um PDF lido uma vez, picado em trechos e indexado com BM25
+class Documento:
+    def __init__(self, nome, paginas):
+        self.nome = nome
+        self.total_paginas = len(paginas)
+        self.trechos = _picar(paginas)
+        self._frequencias = [Counter(tokenizar(texto)) for _, texto in self.trechos]
+        self._tamanhos = [sum(freq.values()) for freq in self._frequencias]
+        self._media = (sum(self._tamanhos) / len(self._tamanhos)) if self._tamanhos else 0.0
+        self._postagens = {}  # termo -> [índices dos trechos]
+        for indice, freq in enumerate(self._frequencias):
+            for termo in freq: self._postagens.setdefault(termo, []).append(indice)
+
+    def _idf(self, termo):
+        n = len(self._postagens.get(termo, ()))
+        return math.log(1 + (len(self.trechos) - n + 0.5) / (n + 0.5))
+
+    def buscar(self, pergunta, k=DOCUMENTO_TOP_K):
+        """[(pontos, índice do trecho)] pelo BM25, só dos trechos que têm pelo menos um termo da pergunta."""
+        pontos = Counter()
+        for termo in set(tokenizar(pergunta)):
+            idf = self._idf(termo)
+            for indice in self._postagens.get(termo, ()):
+                tf = self._frequencias[indice][termo]
+                normalizacao = 1 - BM25_B + BM25_B * self._tamanhos[indice] / (self._media or 1)
+                pontos[indice] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * normalizacao)
+        return [(valor, indice) for indice, valor in pontos.most_common(k)]
+
+    def espalhados(self, k=DOCUMENTO_TOP_K):
+        """k trechos distribuídos do começo ao fim: para resumo, o documento inteiro tem que aparecer."""
+        if len(self.trechos) <= k: return list(range(len(self.trechos)))
+        return sorted({round(i * (len(self.trechos) - 1) / (k - 1)) for i in range(k)})
+
+    def trechos_para(self, pergunta, k=DOCUMENTO_TOP_K):
+        """Índices dos trechos a mandar para o modelo, na ordem em que aparecem no documento."""
+        if not pergunta or PEDIDO_DE_RESUMO.search(pergunta.lower()): return self.espalhados(k)
+        achados = self.buscar(pergunta, k)
+        if not achados: return self.espalhados(k)  # Nenhum termo bateu: melhor uma visão geral do que nada
+        return sorted(indice for _, indice in achados)
+
+    def contexto(self, pergunta, k=DOCUMENTO_TOP_K):
+        """O texto que vai no <document_text>, com a página de cada trecho marcada."""
+        return "\n\n".join(f"[página {self.trechos[i][0]}] {self.trechos[i][1]}" for i in self.trechos_para(pergunta, k))
+
+class IndiceDocumentos:
+    def __init__(self, capacidade=DOCUMENTOS_NA_RAM):
+        self.capacidade = capacidade
+        self._trava = threading.Lock()
+        self._hashes = {}  # (caminho, mtime, tamanho) -> hash do conteúdo
+        self._memoria = OrderedDict()  # hash -> Documento (LRU)
+
+    def _hash(self, caminho):
+        info = os.stat(caminho)
+        assinatura = (os.path.abspath(caminho), info.st_mtime, info.st_size)
+        # Mesmo caminho com o mesmo mtime: nem relê o arquivo para calcular o hash
+        if assinatura not in self._hashes:
+            if len(self._hashes) > 256: self._hashes.clear()  # Os temporários do Discord não acumulam para sempre
+            self._hashes[assinatura] = hash_conteudo(caminho)
+        return self._hashes[assinatura]
+
+    def abrir(self, caminho):
+        """O Documento indexado do PDF (extrai e indexa só na primeira vez que vê esse conteúdo)."""
+        with self._trava:
+            chave = self._hash(caminho)
+            documento = self._memoria.get(chave)
+            if documento is not None:
+                self._memoria.move_to_end(chave)
+                return documento
+        # Extrair e indexar fora da trava: um PDF gigante não segura a pergunta de quem já está na RAM
+        documento = Documento(os.path.basename(caminho), extrator_pdf.extrair(caminho, chave))
+        with self._trava:
+            self._memoria[chave] = documento
+            while len(self._memoria) > self.capacidade: self._memoria.popitem(last=False)
+            return documento
+
+indice_documentos = IndiceDocumentos()
@@ -0,0 +1,226 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from Astra_Core.config import (PASTA_MEMORIA_SEMANTICA, MODELO_EMBEDDINGS, MEMORIA_TOP_K, MEMORIA_SIMILARIDADE_MINIMA,
+                               MEMORIA_TIMEOUT, MEMORIA_PRAZO_RECORDAR, MEMORIA_PREFIXOS, CONTEXTO_TURNOS_RECENTES)
+from core.escalonador_gpu import PRIORIDADE_FUNDO, PedidoCancelado
+from core.ollama_client import cliente_ollama, ErroOllama, ErroTimeoutOllama
+from core.partida import modulo_tardio
+from core.terminal import console
+
+np = modulo_tardio("numpy")
+
+LINHAS_INICIAIS = 256  # A matriz dobra de tamanho quando enche
+MAX_CARACTERES = 2000  # O que passa disso nem o nomic-embed-text aproveita
+PAUSA_APOS_ERRO = 5 * 60  # Modelo de embeddings ausente/Ollama fora: tenta de novo só depois disso
+
+def _quando_foi(quando):
+    dias = (datetime.now() - datetime.fromisoformat(quando)).days
+    if dias <= 0: return "hoje"
+    if dias == 1: return "ontem"
+    return f"há {dias} dias"
+
+def _cortar(texto, limite=300):
+    return texto if len(texto) <= limite else texto[:limite].rsplit(" ", 1)[0] + "..."
+
+# A MEMÓRIA DE ELEFANTE: cada troca vira um vetor numa matriz mapeada no disco; a pergunta nova busca as parecidas
+class MemoriaSemantica:
+    def __init__(self, pasta=PASTA_MEMORIA_SEMANTICA, modelo=MODELO_EMBEDDINGS, top_k=MEMORIA_TOP_K,
+                 minima=MEMORIA_SIMILARIDADE_MINIMA, ignorar_recentes=CONTEXTO_TURNOS_RECENTES, cliente=cliente_ollama,
+                 prazo_recordar=MEMORIA_PRAZO_RECORDAR):
+        # Uma pasta por modelo: vetores de modelos diferentes não se comparam
+        self.pasta = os.path.join(pasta, re.sub(r"[^\w.-]+", "_", modelo))
+        self.modelo = modelo
+        self.top_k = top_k
+        self.minima = minima
+        self.ignorar_recentes = ignorar_recentes  # Os últimos turnos já estão no prompt palavra por palavra
+        self.cliente = cliente
+        self.prazo_recordar = prazo_recordar
+        self._trava = threading.Lock()
+        self._carregada = False
+        self._vetores = None  # np.memmap (capacidade, dimensão) float32, linhas normalizadas
+        self._dimensao = None
+        self._linhas = 0
+        self._sessoes = array("i")  # id da sessão de cada linha
+        self._posicoes = array("q")  # onde a linha começa no lembrancas.jsonl
+        self._ids_sessao = {}
+        self._fila = queue.Queue()
+        self._escritor = None
+        self._pausada_ate = 0.0
+        self.sem_tempo = 0  # Perguntas respondidas sem lembranças porque o vetor não chegou no prazo
+
+    @property
+    def _arquivo_vetores(self):
+        return os.path.join(self.pasta, "vetores.f32")
+
+    @property
+    def _arquivo_textos(self):
+        return os.path.join(self.pasta, "lembrancas.jsonl")
+
+    @property
+    def _arquivo_meta(self):
+        return os.path.join(self.pasta, "meta.json")
+
+    # ---------- Disco ----------
+    def _carregar(self):
+        if self._carregada: return
+        self._carregada = True
+        try:
+            with open(self._arquivo_meta, "r", encoding="utf-8") as f: self._dimensao = json.load(f)["dimensao"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return
+        # O jsonl é gravado depois do vetor: toda linha dele tem o seu vetor garantido no disco
+        try:
+            with open(self._arquivo_textos, "rb+") as f:
+                posicao = 0
+                for bruto in f:
+                    try: sessao = json.loads(bruto)["sessao"]
+                    except (ValueError, KeyError): break  # Linha cortada no meio (queda de energia): para aqui
+                    self._sessoes.append(self._id_sessao(sessao))
+                    self._posicoes.append(posicao)
+                    posicao += len(bruto)
+                f.truncate(posicao)  # A próxima lembrança não pode grudar no pedaço quebrado
+        except OSError:
+            return
+        self._linhas = len(self._posicoes)
+        capacidade = os.path.getsize(self._arquivo_vetores) // (4 * self._dimensao) if os.path.exists(self._arquivo_vetores) else 0
+        if capacidade < self._linhas:
+            console.print("[yellow]Memória: vetores e lembranças fora de sincronia, recomeçando do zero.[/yellow]")
+            self._linhas = 0
+            self._sessoes, self._posicoes = array("i"), array("q")
+            return
+        if capacidade: self._vetores = np.memmap(self._arquivo_vetores, dtype="float32", mode="r+", shape=(capacidade, self._dimensao))
+
+    def _id_sessao(self, sessao):
+        if sessao not in self._ids_sessao: self._ids_sessao[sessao] = len(self._ids_sessao)
+        return self._ids_sessao[sessao]
+
+    def _garantir_espaco(self, dimensao):
+        if self._dimensao is None:
+            self._dimensao = dimensao
+            os.makedirs(self.pasta, exist_ok=True)
+            with open(self._arquivo_meta, "w", encoding="utf-8") as f: json.dump({"modelo": self.modelo, "dimensao": dimensao}, f)
+        capacidade = self._vetores.shape[0] if self._vetores is not None else 0
+        if self._linhas < capacidade: return
+        # Cresce o arquivo (dobrando) e remapeia: o que já estava gravado continua no mesmo lugar
+        nova = max(LINHAS_INICIAIS, capacidade * 2)
+        if self._vetores is not None:
+            # O Windows não deixa mudar o tamanho de um arquivo mapeado: solta o mapa antes
+            self._vetores.flush()
+            self._vetores = None
+        with open(self._arquivo_vetores, "ab") as f: f.truncate(nova * dimensao * 4)
+        self._vetores = np.memmap(self._arquivo_vetores, dtype="float32", mode="r+", shape=(nova, dimensao))
+
+    # ---------- Vetores ----------
+    def _vetorizar(self, texto, prefixo, prioridade, origem, prazo=None):
+        """Vetor normalizado do texto; com prazo, a fila da GPU e a leitura juntas não passam dele."""
+        if time.monotonic() < self._pausada_ate: return None
+        payload = self.cliente.residencia.preparar({"model": self.modelo, "input": prefixo + texto[:MAX_CARACTERES]})
+        inicio = time.monotonic()
+        try:
+            if prazo is None: data = self.cliente.chamar("/api/embed", payload, MEMORIA_TIMEOUT, prioridade, origem)
+            else:
+                with self.cliente.escalonador.vaga(prioridade, origem, espera_maxima=prazo):
+                    restante = max(0.05, prazo - (time.monotonic() - inicio))
+                    data = self.cliente.chamar_direto("/api/embed", payload, restante)
+            self.cliente.residencia.registrar(self.modelo, data)
+            vetor = np.asarray(data["embeddings"][0], dtype="float32")
+        except (PedidoCancelado, ErroOllama, KeyError, IndexError) as e:
+            if prazo is not None and isinstance(e, (PedidoCancelado, ErroTimeoutOllama)):
+                # GPU ocupada ou embed lento: a pergunta segue sem lembranças (e sem pausar a memória, o modelo está lá)
+                with self._trava: self.sem_tempo += 1
+                return None
+            self._pausada_ate = time.monotonic() + PAUSA_APOS_ERRO
+            console.print(f"[red]Memória: sem embeddings do '{self.modelo}' (tento de novo em {PAUSA_APOS_ERRO // 60} min):[/red] {e}")
+            return None
+        norma = float(np.linalg.norm(vetor))
+        return vetor / norma if norma else None
+
+    # ---------- API ----------
+    def lembrar(self, sessao, criador, astra):
+        """Guarda a troca em segundo plano (o vetor é calculado na fila de fundo da GPU)."""
+        if len(criador.split()) < 3: return  # "oi", "valeu": nada que valha lembrar semanas depois
+        if self._escritor is None:
+            with self._trava:
+                if self._escritor is None:
+                    self._escritor = threading.Thread(target=self._loop_escritor, daemon=True)
+                    self._escritor.start()
+        self._fila.put((sessao, criador, astra, datetime.now().isoformat(timespec="seconds")))
+
+    def _loop_escritor(self):
+        while True:
+            sessao, criador, astra, quando = self._fila.get()
+            try: self._gravar(sessao, criador, astra, quando)
+            except Exception as e: console.print(f"[red]Memória: falha ao guardar uma lembrança:[/red] {e}")
+
+    def _gravar(self, sessao, criador, astra, quando):
+        vetor = self._vetorizar(f"Criador: {criador}\nAstra: {astra}", MEMORIA_PREFIXOS[0], PRIORIDADE_FUNDO, "memoria")
+        if vetor is None: return
+        linha = (json.dumps({"sessao": sessao, "quando": quando, "criador": criador, "astra": astra}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._trava:
+            self._carregar()
+            if self._dimensao is not None and vetor.shape[0] != self._dimensao: return
+            self._garantir_espaco(vetor.shape[0])
+            self._vetores[self._linhas] = vetor
+            self._vetores.flush()
+            with open(self._arquivo_textos, "ab") as f:
+                posicao = f.tell()
+                f.write(linha)
+            self._posicoes.append(posicao)
+            self._sessoes.append(self._id_sessao(sessao))
+            self._linhas += 1
+
+    def recordar(self, consulta, sessao, prioridade=PRIORIDADE_FUNDO, origem="memoria"):
+        """[(similaridade, lembrança)] da mesma sessão, das mais parecidas com a consulta para as menos."""
+        with self._trava:
+            self._carregar()
+            if not self._linhas or sessao not in self._ids_sessao: return []
+        vetor = self._vetorizar(consulta, MEMORIA_PREFIXOS[1], prioridade, origem, self.prazo_recordar)
+        if vetor is None: return []
+        with self._trava:
+            if vetor.shape[0] != self._dimensao: return []
+            n = self._linhas
+            sessoes = np.frombuffer(self._sessoes, dtype=np.int32, count=n)
+            candidatas = np.flatnonzero(sessoes == self._ids_sessao[sessao])
+            if self.ignorar_recentes: candidatas = candidatas[:-self.ignorar_recentes]
+            if not candidatas.size: return []
+            # Linhas normalizadas: o produto escalar já é o cosseno, tudo numa multiplicação só
+            similaridades = self._vetores[candidatas] @ vetor
+            k = min(self.top_k, similaridades.size)
+            melhores = np.argpartition(-similaridades, k - 1)[:k]
+            melhores = melhores[np.argsort(-similaridades[melhores])]
+            escolhidas = [(float(similaridades[i]), self._posicoes[candidatas[i]]) for i in melhores if similaridades[i] >= self.minima]
+            lembrancas = []
+            with open(self._arquivo_textos, "rb") as f:
+                for similaridade, posicao in escolhidas:
+                    f.seek(posicao)
+                    lembrancas.append((similaridade, json.loads(f.readline())))
+        return lembrancas
+
+    def contexto(self, consulta, sessao, prioridade=PRIORIDADE_FUNDO, origem="memoria"):
+        """O bloco <lembrancas> para ir antes da pergunta (vazio se nada do passado tiver a ver)."""
+        try: lembrancas = self.recordar(consulta, sessao, prioridade, origem)
+        except Exception as e:
+            console.print(f"[red]Memória: não consegui recordar:[/red] {e}")  # Sem lembranças a conversa segue normal
+            return ""
+        if not lembrancas: return ""
+        linhas = [f"- ({_quando_foi(item['quando'])}) Criador: {_cortar(item['criador'])} | Astra: {_cortar(item['astra'])}"
+                  for _, item in sorted(lembrancas, key=lambda par: par[1]["quando"])]
+        return "<lembrancas>\n" + "\n".join(linhas) + "\n</lembrancas>"
+
+    def relatorio(self):
+        e = self.estatisticas()
+        return f"Memória de longo prazo: {e['lembrancas']} lembranças em {e['sessoes']} conversas ({e['na_fila']} na fila para vetorizar, {e['sem_tempo']} perguntas sem lembranças por falta de tempo)"
+
+    def estatisticas(self):
+        with self._trava:
+            self._carregar()
+            return {"lembrancas": self._linhas, "sessoes": len(self._ids_sessao), "dimensao": self._dimensao, "na_fila": self._fila.qsize(), "sem_tempo": self.sem_tempo}
+
+memoria_semantica = MemoriaSemantica()
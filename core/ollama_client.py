@@ -0,0 +1,197 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Astra_Core.config import OLLAMA_HOST, OLLAMA_TIMEOUT_CONEXAO, OLLAMA_TIMEOUT_PADRAO, OLLAMA_TENTATIVAS, OLLAMA_PARALELO
+from core.escalonador_gpu import EscalonadorGPU, PedidoCancelado, PRIORIDADE_FUNDO
+from core.residencia_modelos import GerenteResidencia
+
+# Status que valem uma nova tentativa (Ollama ocupado ou reiniciando)
+STATUS_TRANSITORIOS = {429, 502, 503, 504}
+
+# Os erros do Ollama agora têm nome e sobrenome
+class ErroOllama(Exception):
+    def __init__(self, mensagem, status=None, tentativas=1):
+        super().__init__(mensagem)
+        self.status = status
+        self.tentativas = tentativas
+
+class ErroConexaoOllama(ErroOllama):
+    """O servidor do Ollama não respondeu (desligado, porta errada, conexão caiu)."""
+
+class ErroTimeoutOllama(ErroOllama):
+    """O modelo demorou mais do que o tempo combinado."""
+
+class ErroRespostaOllama(ErroOllama):
+    """O Ollama respondeu, mas com status de erro ou JSON quebrado."""
+
+class ErroCanceladoOllama(ErroOllama):
+    """O pedido foi cancelado enquanto esperava a vez na GPU."""
+
+# A Ponte Neural: uma conexão keep-alive reaproveitada por todo o laboratório
+class ClienteOllama:
+    def __init__(self, host=OLLAMA_HOST, timeout=OLLAMA_TIMEOUT_PADRAO, tentativas=OLLAMA_TENTATIVAS, espera_base=0.5, escalonador=None):
+        self.host = host.rstrip("/")
+        # Todo tráfego passa pelo porteiro da GPU (voz > Discord > fundo)
+        self.escalonador = escalonador or EscalonadorGPU(limite=OLLAMA_PARALELO)
+        # E o zelador da VRAM decide o keep_alive de cada modelo e agrupa as visões
+        self.residencia = GerenteResidencia(self)
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+
+        self._sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=0)
+        self._sessao.mount("http://", adaptador)
+        self._sessao.mount("https://", adaptador)
+
+        # Cada event loop (voz, Discord) ganha a sua própria sessão aiohttp
+        self._sessoes_async = {}
+        self._trava_async = threading.Lock()
+
+    def _url(self, rota):
+        return f"{self.host}/{rota.lstrip('/')}"
+
+    def _espera(self, tentativa):
+        return self.espera_base * (2 ** tentativa) + random.uniform(0, self.espera_base)
+
+    # ---------- Modo síncrono (thread principal de voz) ----------
+    def _post(self, rota, payload, timeout, stream=False):
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            try:
+                response = self._sessao.post(self._url(rota), json=payload, stream=stream,
+                                             timeout=(OLLAMA_TIMEOUT_CONEXAO, timeout or self.timeout))
+            except requests.Timeout as e:
+                # Geração lenta não se resolve tentando de novo, só dobraria a espera
+                raise ErroTimeoutOllama(f"O Ollama passou de {timeout or self.timeout}s em {rota}", tentativas=tentativa + 1) from e
+            except requests.ConnectionError as e:
+                ultimo_erro = ErroConexaoOllama(f"Sem conexão com o Ollama em {self.host}: {e}", tentativas=tentativa + 1)
+            else:
+                if response.status_code == 200: return response
+                erro = ErroRespostaOllama(f"O Ollama respondeu {response.status_code} em {rota}: {response.text[:200]}",
+                                          status=response.status_code, tentativas=tentativa + 1)
+                response.close()
+                if response.status_code not in STATUS_TRANSITORIOS: raise erro
+                ultimo_erro = erro
+
+            if tentativa + 1 < self.tentativas: time.sleep(self._espera(tentativa))
+        raise ultimo_erro
+
+    def chamar_direto(self, rota, payload, timeout=None):
+        """Chamada sem passar pelo porteiro (só para quem já está segurando uma vaga)."""
+        response = self._post(rota, payload, timeout)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise ErroRespostaOllama(f"JSON inválido vindo de {rota}", status=response.status_code) from e
+
+    def chamar(self, rota, payload, timeout=None, prioridade=PRIORIDADE_FUNDO, origem="astra", espera_maxima=None):
+        try:
+            with self.escalonador.vaga(prioridade, origem, espera_maxima):
+                return self.chamar_direto(rota, payload, timeout)
+        except PedidoCancelado as e:
+            raise ErroCanceladoOllama(str(e)) from e
+
+    def gerar(self, payload, timeout=None, prioridade=PRIORIDADE_FUNDO, origem="astra"):
+        payload = self.residencia.preparar({**payload, "stream": False})
+        data = self.chamar("/api/generate", payload, timeout, prioridade, origem)
+        self.residencia.registrar(payload.get("model"), data)
+        return data
+
+    def gerar_fluxo(self, payload, timeout=None, prioridade=PRIORIDADE_FUNDO, origem="astra"):
+        """Gera os pedaços do NDJSON do /api/generate conforme o modelo vai cuspindo tokens."""
+        payload = self.residencia.preparar({**payload, "stream": True})
+        try:
+            with self.escalonador.vaga(prioridade, origem):
+                for pedaco in self._ler_fluxo(payload, timeout):
+                    if pedaco.get("done"): self.residencia.registrar(payload.get("model"), pedaco)
+                    yield pedaco
+        except PedidoCancelado as e:
+            raise ErroCanceladoOllama(str(e)) from e
+
+    def _ler_fluxo(self, payload, timeout):
+        response = self._post("/api/generate", payload, timeout, stream=True)
+        with response:
+            try:
+                for linha in response.iter_lines():
+                    if not linha: continue
+                    pedaco = json.loads(linha)
+                    if "error" in pedaco: raise ErroRespostaOllama(f"O Ollama abortou a geração: {pedaco['error']}")
+                    yield pedaco
+                    if pedaco.get("done"): return
+            except requests.Timeout as e:
+                raise ErroTimeoutOllama(f"O stream do Ollama ficou mudo por mais de {timeout or self.timeout}s") from e
+            except requests.ConnectionError as e:
+                raise ErroConexaoOllama(f"O stream do Ollama caiu no meio: {e}") from e
+            except ValueError as e:
+                raise ErroRespostaOllama("Linha de NDJSON quebrada no stream") from e
+
+    # ---------- Modo assíncrono nativo (bot do Discord) ----------
+    async def _sessao_atual(self):
+        import aiohttp  # Já vem junto com o discord.py
+
+        loop = asyncio.get_running_loop()
+        with self._trava_async:
+            sessao = self._sessoes_async.get(loop)
+            if sessao is None or sessao.closed:
+                sessao = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=60))
+                self._sessoes_async[loop] = sessao
+        return sessao
+
+    async def achamar(self, rota, payload, timeout=None, prioridade=PRIORIDADE_FUNDO, origem="astra"):
+        try:
+            async with self.escalonador.vaga_async(prioridade, origem):
+                return await self._achamar(rota, payload, timeout)
+        except PedidoCancelado as e:
+            raise ErroCanceladoOllama(str(e)) from e
+
+    async def _achamar(self, rota, payload, timeout):
+        import aiohttp
+
+        sessao = await self._sessao_atual()
+        limite = aiohttp.ClientTimeout(total=timeout or self.timeout, connect=OLLAMA_TIMEOUT_CONEXAO)
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            try:
+                async with sessao.post(self._url(rota), json=payload, timeout=limite) as response:
+                    if response.status == 200:
+                        try:
+                            return await response.json(content_type=None)
+                        except ValueError as e:
+                            raise ErroRespostaOllama(f"JSON inválido vindo de {rota}", status=200) from e
+                    texto = await response.text()
+                    erro = ErroRespostaOllama(f"O Ollama respondeu {response.status} em {rota}: {texto[:200]}",
+                                              status=response.status, tentativas=tentativa + 1)
+                    if response.status not in STATUS_TRANSITORIOS: raise erro
+                    ultimo_erro = erro
+            except asyncio.TimeoutError as e:
+                raise ErroTimeoutOllama(f"O Ollama passou de {timeout or self.timeout}s em {rota}", tentativas=tentativa + 1) from e
+            except aiohttp.ClientError as e:
+                ultimo_erro = ErroConexaoOllama(f"Sem conexão com o Ollama em {self.host}: {e}", tentativas=tentativa + 1)
+
+            if tentativa + 1 < self.tentativas: await asyncio.sleep(self._espera(tentativa))
+        raise ultimo_erro
+
+    async def agerar(self, payload, timeout=None, prioridade=PRIORIDADE_FUNDO, origem="astra"):
+        payload = self.residencia.preparar({**payload, "stream": False})
+        data = await self.achamar("/api/generate", payload, timeout, prioridade, origem)
+        self.residencia.registrar(payload.get("model"), data)
+        return data
+
+    async def afechar(self):
+        loop = asyncio.get_running_loop()
+        with self._trava_async:
+            sessao = self._sessoes_async.pop(loop, None)
+        if sessao and not sessao.closed: await sessao.close()
+
+    def fechar(self):
+        self._sessao.close()
+
+# A instância única que a voz e o Discord dividem
+cliente_ollama = ClienteOllama()
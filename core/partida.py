@@ -0,0 +1,124 @@
+import builtins
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# O CRONÔMETRO DA PARTIDA: quanto cada import e cada etapa custam até o prompt aparecer
+class CronometroPartida:
+    def __init__(self):
+        self._inicio = time.perf_counter()
+        self._fim = None
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self._import_original = None
+        self.imports = []  # (módulo, segundos)
+        self.etapas = []  # (nome, segundos)
+        self.tardios = []  # (módulo, segundos, momento)
+
+    def iniciar(self):
+        """Passa a cronometrar os imports de primeiro nível (o custo dos imports aninhados entra no pai)."""
+        if self._import_original is not None: return
+        self._import_original = original = builtins.__import__
+        local = self._local
+
+        def import_cronometrado(nome, globais=None, locais=None, lista=(), nivel=0):
+            profundidade = getattr(local, "profundidade", 0)
+            if profundidade or nivel or nome in sys.modules:
+                local.profundidade = profundidade + 1
+                try: return original(nome, globais, locais, lista, nivel)
+                finally: local.profundidade = profundidade
+            local.profundidade = 1
+            inicio = time.perf_counter()
+            try: return original(nome, globais, locais, lista, nivel)
+            finally:
+                local.profundidade = 0
+                with self._trava: self.imports.append((nome, time.perf_counter() - inicio))
+
+        builtins.__import__ = import_cronometrado
+
+    def encerrar(self):
+        """O prompt apareceu: para de cronometrar imports e fecha o tempo de partida."""
+        if self._import_original is not None:
+            builtins.__import__ = self._import_original
+            self._import_original = None
+        if self._fim is None: self._fim = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try: yield
+        finally:
+            with self._trava: self.etapas.append((nome, time.perf_counter() - inicio))
+
+    def registrar_tardio(self, nome, segundos, momento):
+        with self._trava: self.tardios.append((nome, segundos, momento))
+
+    def relatorio(self, limite=15):
+        fim = self._fim if self._fim is not None else time.perf_counter()
+        with self._trava:
+            imports = sorted(self.imports, key=lambda item: -item[1])[:limite]
+            etapas, tardios = list(self.etapas), list(self.tardios)
+        linhas = [f"Partida da Astra: {fim - self._inicio:.2f}s até o prompt"]
+        linhas.append("  Imports da partida (os mais caros):")
+        linhas += [f"    {nome:<32} {segundos * 1000:8.1f} ms" for nome, segundos in imports] or ["    (nenhum medido)"]
+        linhas.append("  Etapas:")
+        linhas += [f"    {nome:<32} {segundos * 1000:8.1f} ms" for nome, segundos in etapas] or ["    (nenhuma medida)"]
+        linhas.append("  Carregados sob demanda:")
+        linhas += [f"    {nome:<32} {segundos * 1000:8.1f} ms ({momento})" for nome, segundos, momento in tardios] or ["    (nenhum ainda)"]
+        return "\n".join(linhas)
+
+cronometro_partida = CronometroPartida()
+
+# A GAVETA DE FERRAMENTAS: o módulo só é importado quando alguém mexer nele pela primeira vez
+class ModuloTardio:
+    def __init__(self, nome):
+        object.__setattr__(self, "_nome", nome)
+        object.__setattr__(self, "_modulo", None)
+        object.__setattr__(self, "_trava", threading.Lock())
+
+    def _carregar(self, momento="primeiro uso"):
+        modulo = self._modulo
+        if modulo is not None: return modulo
+        with self._trava:
+            if self._modulo is None:
+                inicio = time.perf_counter()
+                modulo = importlib.import_module(self._nome)
+                cronometro_partida.registrar_tardio(self._nome, time.perf_counter() - inicio, momento)
+                object.__setattr__(self, "_modulo", modulo)
+            return self._modulo
+
+    @property
+    def carregado(self):
+        return self._modulo is not None
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __setattr__(self, atributo, valor):
+        setattr(self._carregar(), atributo, valor)
+
+    def __repr__(self):
+        return f"<módulo tardio {self._nome} ({'carregado' if self.carregado else 'na gaveta'})>"
+
+_gaveta = {}
+_trava_gaveta = threading.Lock()
+
+def modulo_tardio(nome):
+    """Um substituto do `import nome` que só importa de verdade no primeiro acesso a um atributo."""
+    with _trava_gaveta:
+        if nome not in _gaveta: _gaveta[nome] = ModuloTardio(nome)
+        return _gaveta[nome]
+
+def aquecer_em_segundo_plano(nomes=None):
+    """Importa (numa thread) o que ainda está na gaveta, para o primeiro uso já encontrar tudo pronto."""
+    def aquecer():
+        with _trava_gaveta: pendentes = [m for nome, m in _gaveta.items() if nomes is None or nome in nomes]
+        for modulo in pendentes:
+            if modulo.carregado: continue
+            try: modulo._carregar("aquecimento")
+            except Exception as e:
+                from core.terminal import console  # Local: este módulo é o primeiro da partida e não puxa o rich junto
+                console.print(f"[yellow]Partida: não consegui pré-carregar '{modulo._nome}':[/yellow] {e}")
+    threading.Thread(target=aquecer, daemon=True).start()
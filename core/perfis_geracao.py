@@ -0,0 +1,47 @@
+import threading
+from collections import defaultdict
+
+from Astra_Core.config import PERFIS_GERACAO, MODELOS_QUE_PENSAM
+
+OPCOES_OLLAMA = ("num_predict", "num_ctx", "temperature", "stop")
+
+def aplicar_perfil(payload, nome_perfil):
+    """Coloca modelo, options e o liga/desliga do <think> do perfil no payload."""
+    perfil = PERFIS_GERACAO[nome_perfil]
+    payload = {**payload, "model": perfil["model"]}
+    opcoes = {chave: perfil[chave] for chave in OPCOES_OLLAMA if chave in perfil}
+    if opcoes: payload["options"] = {**payload.get("options", {}), **opcoes}
+    # Só modelo raciocinador entende o "think"; nos outros o campo nem vai
+    if perfil["model"] in MODELOS_QUE_PENSAM and "pensar" in perfil:
+        payload["think"] = perfil["pensar"]
+    return payload
+
+# O CRONÔMETRO DE INTENÇÕES: quanto cada tipo de pedido custa em tempo e tokens
+class MedidorPerfis:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._dados = defaultdict(lambda: {"chamadas": 0, "segundos": 0.0, "tokens_gerados": 0, "tokens_prompt": 0, "segundos_geracao": 0.0})
+
+    def registrar(self, intencao, perfil, data, segundos):
+        with self._trava:
+            item = self._dados[(intencao, perfil)]
+            item["chamadas"] += 1
+            item["segundos"] += segundos
+            item["tokens_gerados"] += data.get("eval_count") or 0
+            item["tokens_prompt"] += data.get("prompt_eval_count") or 0
+            item["segundos_geracao"] += (data.get("eval_duration") or 0) / 1e9
+
+    def estatisticas(self):
+        with self._trava:
+            return {chave: dict(item) for chave, item in self._dados.items()}
+
+    def relatorio(self):
+        linhas = []
+        for (intencao, perfil), item in sorted(self.estatisticas().items()):
+            n = item["chamadas"]
+            tok_s = item["tokens_gerados"] / item["segundos_geracao"] if item["segundos_geracao"] else 0.0
+            linhas.append(f"  {intencao} [{perfil} → {PERFIS_GERACAO[perfil]['model']}]: {n}x, {item['segundos'] / n:.1f}s/resposta, "
+                          f"{item['tokens_gerados'] // n} tokens gerados, {item['tokens_prompt'] // n} de prompt, {tok_s:.0f} tok/s")
+        return "Perfis de geração:\n" + ("\n".join(linhas) if linhas else "  (nada medido ainda)")
+
+medidor_perfis = MedidorPerfis()
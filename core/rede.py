@@ -0,0 +1,171 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from Astra_Core.config import ARQUIVO_CACHE_REDE, POLITICAS_REDE, REDE_TIMEOUT, REDE_TENTATIVAS
+from core.partida import modulo_tardio
+from core.terminal import console
+
+ddgs = modulo_tardio("ddgs")
+
+# O disfarce de navegador que o Cloudflare da Jikan exige (as outras APIs não se importam)
+NAVEGADOR = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+class ErroRede(Exception):
+    pass
+
+# O POMBO-CORREIO COM DIÁRIO: uma sessão de conexões reaproveitadas e um caderno no disco com o que a internet já respondeu
+class RedeFerramentas:
+    def __init__(self, arquivo=ARQUIVO_CACHE_REDE, politicas=POLITICAS_REDE, timeout=REDE_TIMEOUT, tentativas=REDE_TENTATIVAS):
+        self.arquivo = arquivo
+        self.politicas = politicas
+        self.timeout = timeout
+
+        self.sessao = requests.Session()
+        self.sessao.headers["User-Agent"] = NAVEGADOR
+        # Só repete o que é seguro repetir: conexão recusada e gateway mal-humorado
+        repeticao = Retry(total=tentativas, read=0, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                          allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=repeticao)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+
+        self._trava = threading.Lock()
+        self._banco = None
+        self._voando = {}  # chave -> Future da busca que já está na rede
+        self._revalidador = None
+        self._busca = None  # Um DDGS só, reaproveitado entre as pesquisas
+        self._trava_busca = threading.Lock()
+        self.contagem = Counter()
+
+    @staticmethod
+    def chave(politica, alvo, params=None):
+        bruto = json.dumps([politica, alvo, params or {}], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    # ---------- Caderno no disco ----------
+    def _disco(self):
+        if self._banco is None:
+            self._banco = sqlite3.connect(self.arquivo, check_same_thread=False)
+            self._banco.execute("CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, politica TEXT, corpo TEXT, guardado_em REAL)")
+            # Faxina da partida: o que já passou até do prazo de "velho" não serve nem como quebra-galho
+            agora = time.time()
+            for politica, regras in self.politicas.items():
+                if regras["velho"] is not None:
+                    self._banco.execute("DELETE FROM respostas WHERE politica = ? AND guardado_em < ?", (politica, agora - regras["velho"]))
+            self._banco.commit()
+        return self._banco
+
+    def _ler(self, chave):
+        with self._trava:
+            try: linha = self._disco().execute("SELECT corpo, guardado_em FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            except sqlite3.Error: return None
+        if not linha: return None
+        return json.loads(linha[0]), linha[1]
+
+    def _gravar(self, chave, politica, valor):
+        corpo = json.dumps(valor, ensure_ascii=False)
+        with self._trava:
+            try:
+                banco = self._disco()
+                banco.execute("INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?)", (chave, politica, corpo, time.time()))
+                banco.commit()
+            except sqlite3.Error: pass  # Sem disco a resposta ainda chega, só não fica guardada
+
+    # ---------- Rede (single-flight: a mesma pergunta ao mesmo tempo vai uma vez só) ----------
+    def _buscar_e_guardar(self, politica, chave, buscar, guardar_se=None):
+        with self._trava:
+            futuro = self._voando.get(chave)
+            dono = futuro is None
+            if dono: futuro = self._voando[chave] = Future()
+            else: self.contagem["coalescidos"] += 1
+        if not dono: return futuro.result()
+        try:
+            valor = buscar()
+        except BaseException as e:
+            with self._trava:
+                self._voando.pop(chave, None)
+                self.contagem["erros"] += 1
+            futuro.set_exception(e)
+            raise
+        # Resposta vazia ("cidade não encontrada", busca bloqueada) chega a quem pediu, mas não vira verdade no caderno
+        if guardar_se is None or guardar_se(valor): self._gravar(chave, politica, valor)
+        with self._trava:
+            self._voando.pop(chave, None)
+            self.contagem["rede"] += 1
+        futuro.set_result(valor)
+        return valor
+
+    def _revalidar(self, politica, chave, buscar, guardar_se):
+        with self._trava:
+            if chave in self._voando: return  # Alguém já foi buscar a versão nova
+            if self._revalidador is None: self._revalidador = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rede")
+        self._revalidador.submit(self._revalidar_agora, politica, chave, buscar, guardar_se)
+
+    def _revalidar_agora(self, politica, chave, buscar, guardar_se):
+        try: self._buscar_e_guardar(politica, chave, buscar, guardar_se)
+        except Exception as e: console.print(f"[yellow]Rede: revalidação de '{politica}' falhou (a cópia velha continua valendo):[/yellow] {e}")
+
+    def consultar(self, politica, chave, buscar, guardar_se=None):
+        """O valor de buscar() conforme a política: fresco do disco, velho do disco revalidando por trás, ou da rede.
+        guardar_se(valor) falso deixa a resposta fora do disco."""
+        regras = self.politicas[politica]
+        item = self._ler(chave)
+        if item is not None:
+            valor, guardado_em = item
+            idade = time.time() - guardado_em
+            if regras["fresco"] is None or idade <= regras["fresco"]:
+                with self._trava: self.contagem["frescos"] += 1
+                return valor
+            if regras["velho"] is None or idade <= regras["velho"]:
+                # Stale-while-revalidate: o criador ouve a resposta de agora, a próxima já vem atualizada
+                with self._trava: self.contagem["velhos"] += 1
+                self._revalidar(politica, chave, buscar, guardar_se)
+                return valor
+        try:
+            return self._buscar_e_guardar(politica, chave, buscar, guardar_se)
+        except ErroRede:
+            if item is None: raise
+            # Internet caiu: resposta vencida ainda é melhor que resposta nenhuma
+            with self._trava: self.contagem["velhos_por_erro"] += 1
+            return item[0]
+
+    # ---------- API das ferramentas ----------
+    def obter_json(self, politica, url, params=None, headers=None, guardar_se=None):
+        def buscar():
+            try:
+                resposta = self.sessao.get(url, params=params, headers=headers, timeout=self.timeout)
+                resposta.raise_for_status()
+                return resposta.json()
+            except (requests.RequestException, ValueError) as e:
+                raise ErroRede(f"{url}: {e}") from e
+        return self.consultar(politica, self.chave(politica, url, params), buscar, guardar_se)
+
+    def pesquisar(self, termo, max_resultados=5):
+        """Resultados do DuckDuckGo ([{title, href, body}]) com a política "busca"."""
+        def buscar():
+            with self._trava_busca:
+                try:
+                    if self._busca is None: self._busca = ddgs.DDGS(timeout=self.timeout[1])
+                    return self._busca.text(termo, region="wt-wt", max_results=max_resultados) or []
+                except Exception as e:
+                    self._busca = None  # Sessão do DDGS bloqueada/quebrada: a próxima pesquisa começa limpa
+                    raise ErroRede(f"DuckDuckGo: {e}") from e
+        parametros = {"q": " ".join(termo.lower().split()), "max": max_resultados}
+        return self.consultar("busca", self.chave("busca", "ddgs", parametros), buscar, guardar_se=bool)
+
+    # ---------- Painel ----------
+    def relatorio(self):
+        with self._trava: contagem = dict(self.contagem)
+        if not contagem: return "Rede das ferramentas: nenhuma consulta ainda"
+        return "Rede das ferramentas: " + " ".join(f"{evento}={n}" for evento, n in sorted(contagem.items()))
+
+rede = RedeFerramentas()
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from Astra_Core.config import (
+    MODEL_NAME, VISION_MODEL, KEEP_ALIVE_MODELOS, KEEP_ALIVE_VISAO_FIM_LOTE,
+    VISAO_JANELA_LOTE, VISAO_MAX_LOTE, OLLAMA_TIMEOUT_VISAO,
+    VRAM_ORCAMENTO_GB, VRAM_RESIDENTES_GB, KEEP_ALIVE_FORA_DO_ORCAMENTO
+)
+from core.escalonador_gpu import PRIORIDADE_FUNDO
+
+# Acima disso o Ollama teve que (re)carregar o modelo na VRAM
+LIMIAR_CARGA_S = 0.5
+
+# O ZELADOR DA VRAM: decide quem mora na placa de vídeo e por quanto tempo
+class GerenteResidencia:
+    def __init__(self, cliente, keep_alive=KEEP_ALIVE_MODELOS, janela_lote=VISAO_JANELA_LOTE, max_lote=VISAO_MAX_LOTE,
+                 orcamento_gb=VRAM_ORCAMENTO_GB, residentes_gb=VRAM_RESIDENTES_GB, keep_alive_fora=KEEP_ALIVE_FORA_DO_ORCAMENTO):
+        self.cliente = cliente
+        self.keep_alive = dict(keep_alive)
+        self.orcamento_gb = orcamento_gb
+        self.residentes, self.fora_do_orcamento = self._distribuir(residentes_gb, keep_alive_fora)
+        self.janela_lote = janela_lote
+        self.max_lote = max_lote
+
+        self._trava = threading.Lock()
+        self.modelo_atual = None
+        self.cargas = Counter()
+        self.recargas_residentes = 0  # Residente que teve de subir de novo: alguém o despejou (o pingue-pongue)
+        self.trocas = 0
+        self.lotes_visao = 0
+        self.imagens_descritas = 0
+
+        self._pendentes_visao = []
+        self._tem_visao = threading.Condition()
+        self._operario = None
+
+    def _distribuir(self, residentes_gb, keep_alive_fora):
+        """Fixa na VRAM, por ordem de prioridade, só quem cabe no orçamento; o resto vira visita rápida."""
+        residentes, fora, usado = [], [], 0.0
+        for modelo, gb in residentes_gb.items():
+            if usado + gb <= self.orcamento_gb:
+                residentes.append(modelo)
+                usado += gb
+            else:
+                fora.append(modelo)
+                self.keep_alive[modelo] = keep_alive_fora
+        self.vram_fixa_gb = usado
+        return residentes, fora
+
+    # ---------- Contabilidade ----------
+    def preparar(self, payload):
+        modelo = payload.get("model")
+        if "keep_alive" not in payload and modelo in self.keep_alive:
+            payload = {**payload, "keep_alive": self.keep_alive[modelo]}
+        return payload
+
+    def registrar(self, modelo, data):
+        carregou = (data.get("load_duration") or 0) / 1e9 > LIMIAR_CARGA_S
+        with self._trava:
+            if modelo != self.modelo_atual:
+                if self.modelo_atual is not None: self.trocas += 1
+                self.modelo_atual = modelo
+            if carregou:
+                if modelo in self.residentes and self.cargas[modelo]: self.recargas_residentes += 1
+                self.cargas[modelo] += 1
+
+    def preaquecer(self, modelo=MODEL_NAME, prioridade=PRIORIDADE_FUNDO):
+        """Carrega o modelo na VRAM sem gerar nada (prompt vazio), já com o keep_alive dele."""
+        self.cliente.gerar({"model": modelo}, prioridade=prioridade, origem="residencia")
+
+    def preaquecer_em_segundo_plano(self, modelo=MODEL_NAME):
+        def aquecer():
+            try: self.preaquecer(modelo)
+            except Exception: pass  # Se o Ollama não estiver de pé, a primeira pergunta carrega o modelo
+        threading.Thread(target=aquecer, daemon=True).start()
+
+    # ---------- Lotes de visão ----------
+    def _enfileirar_visao(self, payload, prioridade, timeout):
+        futuro = Future()
+        with self._tem_visao:
+            self._pendentes_visao.append((payload, prioridade, timeout, futuro))
+            if self._operario is None:
+                self._operario = threading.Thread(target=self._loop_visao, daemon=True)
+                self._operario.start()
+            self._tem_visao.notify()
+        return futuro
+
+    def descrever(self, payload_visao, prioridade=PRIORIDADE_FUNDO, timeout=OLLAMA_TIMEOUT_VISAO):
+        return self._enfileirar_visao(payload_visao, prioridade, timeout).result()
+
+    async def adescrever(self, payload_visao, prioridade=PRIORIDADE_FUNDO, timeout=OLLAMA_TIMEOUT_VISAO):
+        return await asyncio.wrap_future(self._enfileirar_visao(payload_visao, prioridade, timeout))
+
+    def _loop_visao(self):
+        while True:
+            with self._tem_visao:
+                while not self._pendentes_visao: self._tem_visao.wait()
+            # Segura um pouquinho para juntar as imagens que chegarem juntas (ex: 3 anexos no Discord)
+            time.sleep(self.janela_lote)
+            self._processar_lote()
+
+    def _processar_lote(self):
+        with self._tem_visao:
+            prioridade = min(p for _, p, _, _ in self._pendentes_visao)
+        try:
+            with self.cliente.escalonador.vaga(prioridade, "visao"):
+                self.lotes_visao += 1
+                feitos = 0
+                while feitos < self.max_lote:
+                    with self._tem_visao:
+                        if not self._pendentes_visao: break
+                        payload, _, timeout, futuro = self._pendentes_visao.pop(0)
+                        ultimo = not self._pendentes_visao or feitos + 1 == self.max_lote
+                    if not futuro.set_running_or_notify_cancel(): continue
+                    payload = self.preparar({**payload, "model": payload.get("model", VISION_MODEL), "stream": False})
+                    # Último do lote: o modelo de visão sai da VRAM para o cérebro voltar rápido
+                    if ultimo: payload["keep_alive"] = KEEP_ALIVE_VISAO_FIM_LOTE
+                    try:
+                        data = self.cliente.chamar_direto("/api/generate", payload, timeout)
+                        self.registrar(payload["model"], data)
+                        self.imagens_descritas += 1
+                        futuro.set_result(data)
+                    except Exception as e:
+                        futuro.set_exception(e)
+                    feitos += 1
+        except Exception as e:
+            with self._tem_visao:
+                pendentes, self._pendentes_visao = self._pendentes_visao, []
+            for _, _, _, futuro in pendentes:
+                if futuro.set_running_or_notify_cancel(): futuro.set_exception(e)
+            return
+
+        with self._tem_visao:
+            sobrou = bool(self._pendentes_visao)
+        if not sobrou: self.preaquecer_em_segundo_plano(MODEL_NAME)
+
+    # ---------- Painel ----------
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "modelo_atual": self.modelo_atual,
+                "cargas": dict(self.cargas),
+                "trocas": self.trocas,
+                "recargas_residentes": self.recargas_residentes,
+                "lotes_visao": self.lotes_visao,
+                "imagens_descritas": self.imagens_descritas,
+            }
+
+    def relatorio(self):
+        est = self.estatisticas()
+        cargas = ", ".join(f"{m}={n}" for m, n in est["cargas"].items()) or "nenhuma"
+        media = est["imagens_descritas"] / est["lotes_visao"] if est["lotes_visao"] else 0
+        fora = ", ".join(f"{m} ({self.keep_alive[m]})" for m in self.fora_do_orcamento) or "ninguém"
+        return (f"VRAM: residente={est['modelo_atual'] or '?'} | trocas={est['trocas']} | cargas: {cargas}\n"
+                f"  orçamento {self.orcamento_gb:.1f} GB: fixos={', '.join(self.residentes)} ({self.vram_fixa_gb:.1f} GB) | "
+                f"visitas rápidas={fora} | recargas de fixos={est['recargas_residentes']}\n"
+                f"  visão: {est['imagens_descritas']} imagens em {est['lotes_visao']} lotes ({media:.1f}/lote)")
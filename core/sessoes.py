@@ -0,0 +1,174 @@
+import atexit
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from Astra_Core.config import PASTA_SESSOES, SESSOES_ATRASO_GRAVACAO, ARQUIVO_MEMORIA_ANTIGA
+from core.terminal import console
+
+# Formato do arquivo: MAGICA | crc32 | tamanho do meta | meta (JSON) | tokens (int32 little-endian)
+MAGICA = b"ASTRSES1"
+CABECALHO = struct.Struct("<8sII")
+
+class Sessao:
+    __slots__ = ("nome", "contexto", "meta")
+
+    def __init__(self, nome, contexto=None, meta=None):
+        self.nome = nome
+        self.contexto = contexto if contexto is not None else array("i")
+        self.meta = meta or {}
+
+    def contexto_ollama(self):
+        return self.contexto.tolist() if self.contexto else None
+
+def _codificar(sessao):
+    tokens = array("i", sessao.contexto)
+    if sys.byteorder == "big": tokens.byteswap()
+    meta = json.dumps(sessao.meta, ensure_ascii=False).encode("utf-8")
+    corpo = meta + tokens.tobytes()
+    return CABECALHO.pack(MAGICA, zlib.crc32(corpo), len(meta)) + corpo
+
+def _decodificar(nome, bruto):
+    if len(bruto) < CABECALHO.size: raise ValueError("arquivo truncado")
+    magica, crc, tamanho_meta = CABECALHO.unpack_from(bruto)
+    corpo = bruto[CABECALHO.size:]
+    if magica != MAGICA: raise ValueError("não é uma sessão da Astra")
+    if zlib.crc32(corpo) != crc: raise ValueError("checksum não bate (arquivo corrompido)")
+    tokens = array("i")
+    tokens.frombytes(corpo[tamanho_meta:])
+    if sys.byteorder == "big": tokens.byteswap()
+    return Sessao(nome, tokens, json.loads(corpo[:tamanho_meta].decode("utf-8")))
+
+# O COFRE DE MEMÓRIAS: uma sessão por conversa, gravada fora do caminho quente
+class ArmazemSessoes:
+    def __init__(self, pasta=PASTA_SESSOES, atraso_gravacao=SESSOES_ATRASO_GRAVACAO):
+        self.pasta = pasta
+        self.atraso_gravacao = atraso_gravacao
+        self._sessoes = {}
+        self._sujas = set()
+        self._trava = threading.Lock()
+        self._trava_disco = threading.Lock()  # Só um gravador por vez (escritor ou atexit)
+        self._acordar = threading.Condition(self._trava)
+        self._escritor = None
+        self._limpar_restos()
+        atexit.register(self.descarregar)
+
+    def _arquivo(self, nome):
+        return os.path.join(self.pasta, re.sub(r"[^\w\-]", "_", nome) + ".ses")
+
+    def _limpar_restos(self):
+        # Um .tmp esquecido é uma gravação que morreu no meio: o arquivo oficial continua intacto
+        try: arquivos = os.listdir(self.pasta)
+        except FileNotFoundError: return  # A pasta só nasce na primeira gravação
+        for arquivo in arquivos:
+            if arquivo.endswith(".tmp"):
+                try: os.remove(os.path.join(self.pasta, arquivo))
+                except OSError: pass
+
+    # ---------- Leitura com recuperação ----------
+    def _ler(self, nome):
+        arquivo = self._arquivo(nome)
+        for candidato in (arquivo, arquivo + ".bak"):
+            try:
+                with open(candidato, "rb") as f: return _decodificar(nome, f.read())
+            except FileNotFoundError:
+                continue
+            except (ValueError, struct.error, UnicodeDecodeError) as e:
+                console.print(f"[yellow]Sessões: '{candidato}' ignorado:[/yellow] {e}")
+        return self._migrar_memoria_antiga(nome)
+
+    def _migrar_memoria_antiga(self, nome):
+        # O velho astra_memory.json vira a sessão de voz na primeira vez
+        if nome != "voz" or not os.path.exists(ARQUIVO_MEMORIA_ANTIGA): return Sessao(nome)
+        try:
+            with open(ARQUIVO_MEMORIA_ANTIGA, "r") as f: contexto = json.load(f)
+        except (OSError, json.JSONDecodeError): return Sessao(nome)
+        sessao = Sessao(nome, array("i", contexto or []), {"migrada_de": ARQUIVO_MEMORIA_ANTIGA})
+        self._sujas.add(nome)
+        return sessao
+
+    def carregar(self, nome):
+        with self._trava:
+            sessao = self._sessoes.get(nome)
+            if sessao is None:
+                sessao = self._ler(nome)
+                self._sessoes[nome] = sessao
+            return sessao
+
+    def contexto(self, nome):
+        return self.carregar(nome).contexto_ollama()
+
+    # ---------- Escrita (write-behind) ----------
+    def atualizar(self, nome, contexto, **meta):
+        sessao = self.carregar(nome)
+        with self._trava:
+            sessao.contexto = array("i", contexto or [])
+            sessao.meta.update(meta, atualizada_em=time.time())
+            self._sujas.add(nome)
+            if self._escritor is None:
+                self._escritor = threading.Thread(target=self._loop_escritor, daemon=True)
+                self._escritor.start()
+            self._acordar.notify()
+
+    def _loop_escritor(self):
+        while True:
+            with self._trava:
+                while not self._sujas: self._acordar.wait()
+            # Junta várias atualizações seguidas numa gravação só
+            time.sleep(self.atraso_gravacao)
+            self.descarregar()
+
+    def _gravar(self, nome, bruto):
+        arquivo = self._arquivo(nome)
+        temporario = arquivo + ".tmp"
+        os.makedirs(self.pasta, exist_ok=True)
+        with open(temporario, "wb") as f:
+            f.write(bruto)
+            f.flush()
+            os.fsync(f.fileno())
+        # Guarda a versão anterior: se o disco apodrecer o arquivo novo, o .bak salva o dia
+        if os.path.exists(arquivo): os.replace(arquivo, arquivo + ".bak")
+        os.replace(temporario, arquivo)
+
+    def descarregar(self):
+        with self._trava_disco:
+            with self._trava:
+                pendentes = [(nome, _codificar(self._sessoes[nome])) for nome in self._sujas if nome in self._sessoes]
+                self._sujas.clear()
+            for nome, bruto in pendentes:
+                try: self._gravar(nome, bruto)
+                except OSError as e:
+                    console.print(f"[red]Sessões: falha ao gravar '{nome}':[/red] {e}")
+                    with self._trava: self._sujas.add(nome)
+
+    def liberar(self, nome):
+        """Grava a sessão agora (se tiver mudança pendente) e tira ela da RAM."""
+        with self._trava_disco:
+            with self._trava:
+                sessao = self._sessoes.pop(nome, None)
+                suja = nome in self._sujas
+                self._sujas.discard(nome)
+                bruto = _codificar(sessao) if sessao is not None and suja else None
+            if bruto is None: return
+            try: self._gravar(nome, bruto)
+            except OSError as e:
+                console.print(f"[red]Sessões: falha ao gravar '{nome}':[/red] {e}")
+                with self._trava:
+                    self._sessoes.setdefault(nome, sessao)
+                    self._sujas.add(nome)
+
+    def esquecer(self, nome):
+        with self._trava:
+            self._sessoes.pop(nome, None)
+            self._sujas.discard(nome)
+        for arquivo in (self._arquivo(nome), self._arquivo(nome) + ".bak"):
+            try: os.remove(arquivo)
+            except FileNotFoundError: pass
+
+armazem_sessoes = ArmazemSessoes()
@@ -0,0 +1,190 @@
+import heapq
+import os
+import threading
+import time
+from array import array
+
+from Astra_Core.config import TELEMETRIA_INTERVALO, TELEMETRIA_INTERVALO_PROCESSOS, TELEMETRIA_JANELA, TELEMETRIA_JANELA_TENDENCIA
+from core.partida import modulo_tardio
+from core.terminal import console
+
+psutil = modulo_tardio("psutil")
+
+# Inclinação (por minuto) que já merece ser chamada de "subindo"/"descendo"
+LIMIAR_TENDENCIA = {"cpu": 2.0, "ram": 0.3}
+
+# O ANEL: capacidade fixa, o mais velho é sobrescrito; dois array("d") em vez de listas de tuplas
+class AnelAmostras:
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._tempos = array("d", bytes(8 * capacidade))
+        self._valores = array("d", bytes(8 * capacidade))
+        self._proximo = 0
+        self.tamanho = 0
+
+    def adicionar(self, tempo, valor):
+        self._tempos[self._proximo] = tempo
+        self._valores[self._proximo] = valor
+        self._proximo = (self._proximo + 1) % self.capacidade
+        self.tamanho = min(self.tamanho + 1, self.capacidade)
+
+    def ultimo(self):
+        if not self.tamanho: return None
+        return self._valores[self._proximo - 1]
+
+    def janela(self, segundos, agora=None):
+        """(tempos, valores) das amostras dos últimos `segundos`, da mais velha para a mais nova."""
+        agora = time.monotonic() if agora is None else agora
+        tempos, valores = [], []
+        for i in range(self.tamanho):
+            indice = (self._proximo - self.tamanho + i) % self.capacidade
+            if agora - self._tempos[indice] <= segundos:
+                tempos.append(self._tempos[indice])
+                valores.append(self._valores[indice])
+        return tempos, valores
+
+def inclinacao_por_minuto(tempos, valores):
+    """Mínimos quadrados: quanto o valor sobe (ou desce) por minuto na janela."""
+    n = len(tempos)
+    if n < 3 or tempos[-1] - tempos[0] < 30: return 0.0  # Pouca história para falar em tendência
+    media_t, media_v = sum(tempos) / n, sum(valores) / n
+    variancia = sum((t - media_t) ** 2 for t in tempos)
+    if not variancia: return 0.0
+    return 60 * sum((t - media_t) * (v - media_v) for t, v in zip(tempos, valores)) / variancia
+
+class _Processo:
+    __slots__ = ("nome", "cpu_total", "instante", "cpu", "rss", "rss_anel")
+
+    def __init__(self, nome, cpu_total, instante, rss, capacidade):
+        self.nome = nome
+        self.cpu_total = cpu_total
+        self.instante = instante
+        self.cpu = None  # % de CPU da máquina inteira (igual ao Gerenciador de Tarefas); None até a 2ª varredura
+        self.rss = rss
+        self.rss_anel = AnelAmostras(capacidade)
+
+# O SENTIDO ARANHA DE PLANTÃO: uma thread amostrando o tempo todo, as ferramentas só leem a última foto
+class SensorTelemetria:
+    def __init__(self, intervalo=TELEMETRIA_INTERVALO, intervalo_processos=TELEMETRIA_INTERVALO_PROCESSOS, janela=TELEMETRIA_JANELA):
+        self.intervalo = intervalo
+        self.intervalo_processos = intervalo_processos
+        capacidade = max(8, int(janela / intervalo))
+        self._capacidade_processos = max(8, int(janela / intervalo_processos))
+        self.cpu = AnelAmostras(capacidade)
+        self.ram = AnelAmostras(capacidade)
+        self._ram_total = 0
+        self._ram_usada = 0
+        self._processos = {}  # (pid, criado_em) -> _Processo
+        self._nucleos = os.cpu_count() or 1
+        self._ultima_varredura = 0.0
+        self._ultima_amostra = 0.0
+        self._trava = threading.Lock()
+        self._amostrando = threading.Lock()  # Uma amostra por vez: os deltas de CPU dependem da anterior
+        self._primeira = threading.Event()
+        self._vigia = None
+
+    # ---------- Coleta ----------
+    def _amostrar_sistema(self, agora):
+        cpu = psutil.cpu_percent(interval=None)  # Sem bloquear: compara com a chamada anterior
+        memoria = psutil.virtual_memory()
+        with self._trava:
+            self.cpu.adicionar(agora, cpu)
+            self.ram.adicionar(agora, memoria.percent)
+            self._ram_total, self._ram_usada = memoria.total, memoria.used
+            self._ultima_amostra = agora
+
+    def _amostrar_processos(self, agora):
+        # A parte cara (perguntar ao Windows) fica fora da trava; quem lê só espera a atualização dos números
+        lidos = []
+        for proc in psutil.process_iter(["name", "memory_info", "cpu_times", "create_time"]):
+            info = proc.info
+            if info["memory_info"] is None or info["cpu_times"] is None: continue  # Acesso negado (processo do sistema)
+            lidos.append(((proc.pid, info["create_time"]), info["name"] or f"pid {proc.pid}",
+                          info["cpu_times"].user + info["cpu_times"].system, info["memory_info"].rss))
+        vistos = {}
+        with self._trava:
+            for chave, nome, cpu_total, rss in lidos:
+                atual = self._processos.get(chave)
+                if atual is None:
+                    atual = _Processo(nome, cpu_total, agora, rss, self._capacidade_processos)
+                else:
+                    decorrido = agora - atual.instante
+                    # O delta de tempo de CPU entre duas varreduras é o que o processo gastou agora (não a média da vida inteira)
+                    if decorrido > 0: atual.cpu = max(0.0, 100 * (cpu_total - atual.cpu_total) / decorrido / self._nucleos)
+                    atual.cpu_total, atual.instante, atual.rss = cpu_total, agora, rss
+                atual.rss_anel.adicionar(agora, atual.rss)
+                vistos[chave] = atual
+            self._processos = vistos  # Quem morreu some junto com o histórico dele
+            self._ultima_varredura = agora
+
+    def amostrar(self):
+        with self._amostrando:
+            agora = time.monotonic()
+            self._amostrar_sistema(agora)
+            if agora - self._ultima_varredura >= self.intervalo_processos: self._amostrar_processos(agora)
+        self._primeira.set()
+
+    def _loop(self):
+        while True:
+            # Dorme antes: a primeira CPU sai de um intervalo de verdade desde a leitura que armou o cronômetro
+            time.sleep(self.intervalo)
+            try: self.amostrar()
+            except Exception as e: console.print(f"[red]Telemetria: amostra falhou:[/red] {e}")
+
+    def iniciar(self):
+        with self._trava:
+            if self._vigia is not None: return
+            self._vigia = threading.Thread(target=self._loop, daemon=True)
+        psutil.cpu_percent(interval=None)  # A primeira leitura só arma o cronômetro da CPU
+        self._vigia.start()
+
+    def garantir(self):
+        """Liga a thread se ninguém ligou e espera a primeira amostra dela (se ela não vier, tira uma aqui)."""
+        self.iniciar()
+        if not self._primeira.wait(timeout=self.intervalo * 3): self.amostrar()
+
+    # ---------- Leitura ----------
+    def instantaneo(self):
+        self.garantir()
+        with self._trava:
+            return {"cpu": self.cpu.ultimo(), "ram": self.ram.ultimo(), "ram_usada_gb": self._ram_usada / 1024 ** 3,
+                    "ram_total_gb": self._ram_total / 1024 ** 3, "idade": time.monotonic() - self._ultima_amostra}
+
+    def top_processos(self, n=15, por="rss"):
+        """[{nome, instancias, rss_mb, ram, cpu}] dos n maiores, somando as várias instâncias do mesmo programa (cpu None = ainda sem medida)."""
+        self.garantir()
+        with self._trava:
+            processos, total = list(self._processos.values()), self._ram_total or 1
+        por_nome = {}
+        for proc in processos:
+            item = por_nome.setdefault(proc.nome, {"nome": proc.nome, "instancias": 0, "rss": 0, "cpu": None})
+            item["instancias"] += 1
+            item["rss"] += proc.rss
+            if proc.cpu is not None: item["cpu"] = (item["cpu"] or 0.0) + proc.cpu
+        # nlargest é O(N log n): não ordena a lista inteira só para pegar os 15 primeiros
+        maiores = heapq.nlargest(n, por_nome.values(), key=lambda item: item[por] or 0)
+        return [{**item, "rss_mb": item["rss"] / 1024 ** 2, "ram": 100 * item["rss"] / total} for item in maiores]
+
+    def tendencias(self, segundos=TELEMETRIA_JANELA_TENDENCIA):
+        """Inclinação por minuto de CPU e RAM (em pontos percentuais) na janela."""
+        self.garantir()
+        with self._trava:
+            return {nome: inclinacao_por_minuto(*anel.janela(segundos)) for nome, anel in (("cpu", self.cpu), ("ram", self.ram))}
+
+    def descrever_tendencias(self, segundos=TELEMETRIA_JANELA_TENDENCIA):
+        frases = []
+        for nome, inclinacao in self.tendencias(segundos).items():
+            if abs(inclinacao) < LIMIAR_TENDENCIA[nome]: continue
+            sentido = "subindo" if inclinacao > 0 else "descendo"
+            frases.append(f"{nome.upper()} {sentido} nos últimos {segundos // 60} min ({inclinacao:+.1f} pontos/min)")
+        return frases
+
+    def processos_crescendo(self, n=3, segundos=TELEMETRIA_JANELA_TENDENCIA):
+        """Os n processos cuja RAM mais cresceu por minuto na janela (candidatos a vazamento)."""
+        self.garantir()
+        with self._trava:
+            processos = list(self._processos.values())
+            inclinacoes = [(inclinacao_por_minuto(*proc.rss_anel.janela(segundos)) / 1024 ** 2, proc.nome) for proc in processos]
+        return [(nome, mb) for mb, nome in heapq.nlargest(n, inclinacoes) if mb > 1]
+
+sensor_telemetria = SensorTelemetria()
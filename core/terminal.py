@@ -0,0 +1,4 @@
+from rich.console import Console
+
+# O TERMINAL DO LABORATÓRIO: um console só, que os módulos do core usam sem ter que importar a voz (e o pygame junto)
+console = Console()
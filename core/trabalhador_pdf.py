@@ -0,0 +1,11 @@
+# O que roda dentro dos processos do pool de PDFs: só o PyPDF2, nada da Astra (nem config, nem voz, nem Ollama)
+
+def ler_pdf(f):
+    import PyPDF2  # Import local: os processos do pool só pagam por ele quando extraem de verdade
+    return PyPDF2.PdfReader(f)
+
+# Cada processo abre o PDF por conta própria e devolve só o texto do seu lote
+def extrair_lote(caminho, inicio, fim):
+    with open(caminho, "rb") as f:
+        leitor = ler_pdf(f)
+        return inicio, [leitor.pages[i].extract_text() or "" for i in range(inicio, fim)]
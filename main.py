@@ -1,63 +1,98 @@
+# O cronômetro liga antes de tudo para medir cada import da partida
+from core.partida import cronometro_partida, modulo_tardio, aquecer_em_segundo_plano
+cronometro_partida.iniciar()
+
 import speech_recognition as sr
+import sys
 import threading
 import time
 import os
 import re
 import json
-import pywhatkit
 from rich.panel import Panel
-from AppOpener import open as app_open
-import winshell
-import pyautogui
 
 # Importando os órgãos do laboratório!
-from Astra_Core.voz import falar, console
+from Astra_Core.voz import falar, console, pre_sintetizar, interromper_fala, aguardar_fala, falando, medidor_voz
+from Astra_Core.ouvido import Ouvido
+from Astra_Core.intencoes import roteador_cli
 from Astra_Core.cerebro import carregar_memoria, cerebro_astra, analisar_tela
-from Astra_Core.bot_discord import iniciar_discord
-from AppOpener import open as app_open, close as app_close
+from core.escalonador_gpu import PRIORIDADE_VOZ
+from core.ollama_client import cliente_ollama
+from core.cache_respostas import cache_respostas
+from Astra_Core.visao import cache_visao
+from core.perfis_geracao import medidor_perfis
+from core.memoria_semantica import memoria_semantica
+from core.telemetria import sensor_telemetria
+from core.rede import rede
+from core.agenda_lembretes import agenda_lembretes, mensagem_lembrete
+from Astra_Core.catalogo_apps import catalogo_apps
+from Astra_Core.resposta_hibrida import turnos
+from Astra_Core.indice_arquivos import indice_arquivos
+from Astra_Core.config import MODEL_NAME
 from Astra_Core.ferramentas import (
-    checar_lembretes, mudar_volume, mudar_brilho, tirar_print,
+    mudar_volume, mudar_brilho, tirar_print,
     escanear_sistema, obter_clima, pesquisa_inteligente,
-    estudar_pdf, rastreador_otaku, relatorio_hardware, ARQUIVO_APPS,
+    estudar_pdf, rastreador_otaku, relatorio_hardware,
     radar_de_processos
 )
 
+# Ferramentas de gaveta: importadas no primeiro uso ou no aquecimento depois do prompt
+pywhatkit = modulo_tardio("pywhatkit")  # Esse testa a internet só de ser importado
+AppOpener = modulo_tardio("AppOpener")
+winshell = modulo_tardio("winshell")
+bot_discord = modulo_tardio("Astra_Core.bot_discord")  # Carrega o discord.py já dentro da thread da antena
+
+MOSTRAR_RELATORIO_PARTIDA = "--relatorio-partida" in sys.argv or os.getenv("ASTRA_RELATORIO_PARTIDA") == "1"
+
+# O botão de calar a boca da Astra
+PALAVRAS_PARAR = re.compile(r"^\s*(astra,?\s*)?(para|pare|parar|chega|silêncio|cala a boca)[\s.!]*$")
+
 # LOOP PRINCIPAL HÍBRIDO
 def main():
-    rec = sr.Recognizer()
-    context_chat = carregar_memoria()
+    with cronometro_partida.etapa("ouvido"): ouvido = Ouvido(ocupado=falando)
+    with cronometro_partida.etapa("memória de voz"): context_chat = carregar_memoria("voz")
+    with cronometro_partida.etapa("disparar pré-aquecimentos"):
+        # O cérebro já vai subindo para a VRAM enquanto o resto do laboratório liga
+        cliente_ollama.residencia.preaquecer_em_segundo_plano(MODEL_NAME)
+        # E as falas fixas já ficam prontas no baú, para os avisos saírem na hora
+        pre_sintetizar()
+        # O catálogo de apps sobe do disco e confere só as pastas que mudaram desde a última vez
+        catalogo_apps.atualizar_em_segundo_plano()
+        # O índice de arquivos do "mande o arquivo" também: só relê as pastas que mudaram, e de novo a cada 10 min
+        indice_arquivos.iniciar_vigia()
+        # O sensor de hardware amostra o tempo todo: "status do sistema" responde na hora e já sabe a tendência
+        sensor_telemetria.iniciar()
 
     # Liga a Antena do Discord
-    discord_thread = threading.Thread(target=iniciar_discord, daemon=True)
+    discord_thread = threading.Thread(target=lambda: bot_discord.iniciar_discord(), daemon=True)
     discord_thread.start()
     # PROTOCOLO INSÔNIA: Proíbe o Windows de dormir!
-    try:
-        import ctypes
-        ctypes.windll.kernel32.SetThreadExecutionState(0x80000000 | 0x00000001)
-        console.print("[bold blue][Sistema]: Protocolo Insônia ativado. O PC permanecerá acordado![/bold blue]")
-    except Exception as e: console.print(f"[bold red]Falha no Protocolo Insônia:[/bold red] {e}")
+    with cronometro_partida.etapa("protocolo insônia"):
+        try:
+            import ctypes
+            ctypes.windll.kernel32.SetThreadExecutionState(0x80000000 | 0x00000001)
+            console.print("[bold blue][Sistema]: Protocolo Insônia ativado. O PC permanecerá acordado![/bold blue]")
+        except Exception as e: console.print(f"[bold red]Falha no Protocolo Insônia:[/bold red] {e}")
     
     console.print(Panel.fit("[bold green]ASTRA: O Demônio Cibernético[/bold green]"))
     console.print("[yellow]Escolha o modo:[/yellow]\n[1] Modo Voz\n[2] Modo Chat")
+    cronometro_partida.encerrar()
+    # Enquanto o criador escolhe o modo, as ferramentas de gaveta vão sendo importadas por trás
+    aquecer_em_segundo_plano()
+    if MOSTRAR_RELATORIO_PARTIDA: console.print(Panel(cronometro_partida.relatorio(), title="[bold magenta]Relatório de Partida[/bold magenta]"))
     modo = input(">> ").strip()
     
     usar_voz = False if modo == '2' else True
     console.print(f"[green]Modo {'Chat' if not usar_voz else 'Voz'} ativado.[/green]")
+    if usar_voz: ouvido.iniciar()
+    # O despertador toca sozinho na hora certa (ou assim que der, se a Astra estava desligada)
+    agenda_lembretes.inscrever(lambda tarefa, quando, atraso: falar(f"Com licença, senhor. {mensagem_lembrete(tarefa, quando, atraso)}"))
+    agenda_lembretes.iniciar()
     falar("Sistemas online. Memória restaurada." if context_chat else "Sistemas online.")
 
     while True:
-        aviso = checar_lembretes()
-        if aviso: falar(f"Com licença, senhor. Lembrete: {aviso}"); time.sleep(1) 
-
-        # As palavras mágicas da Astra agrupadas no lugar certo para evitar Erro de Sintaxe!
-        gatilhos_pdf = ['ler pdf', 'estudar documento', 'analisar documento']
-        gatilhos_visao = ['veja isso', 'analise', 'o que é isso', 'na minha tela', 'descreva a tela']
-        gatilhos_busca = ['pesquise', 'pesquisar', 'busque', 'quem é', 'o que é']
-        gatilhos_anime = ['procurar anime', 'buscar anime', 'rastrear anime']
-        gatilhos_hardware = ['status do sistema', 'como está o hardware', 'sentido aranha']
-        gatilhos_processos = ['processos abertos', 'programas abertos', 'o que está rodando', 'gerenciador de tarefas']
-
         comando = ""
+        durante_fala = False
         try:
             if not usar_voz:
                 try:
@@ -65,104 +100,114 @@ def main():
                     if not comando: continue 
                 except EOFError: break 
             else:
-                with sr.Microphone() as source:
-                    console.print("[dim]Ouvindo...[/dim]")
-                    rec.adjust_for_ambient_noise(source)
-                    audio = rec.listen(source, timeout=5, phrase_time_limit=5)
-                comando = rec.recognize_google(audio, language='pt-BR').lower()
+                # O microfone fica aberto numa thread própria; aqui só chegam as frases já transcritas
+                ouvido.iniciar()
+                comando, durante_fala = ouvido.proximo_comando(timeout=1)
                 console.print(f"[yellow]Você disse:[/yellow] {comando}")
 
-            if 'modo chat' in comando: usar_voz = False; falar("Ativando teclado."); continue
-            elif 'modo voz' in comando: usar_voz = True; falar("Ativando microfone."); continue
+            # Barge-in: "para" cala tudo; qualquer comando novo corta a fala em andamento
+            if PALAVRAS_PARAR.match(comando): interromper_fala(); turnos.novo("voz"); continue
+            if falando() or durante_fala:
+                if usar_voz: continue  # Pelo microfone, enquanto ela fala, só o "para" passa (senão ela obedece à própria voz)
+                interromper_fala()
+            # Comando novo = turno novo: comentário de ferramenta ainda pendente do turno anterior não vai mais ser dito
+            turnos.novo("voz")
+
+            # Uma varredura só do comando decide a ferramenta (as palavras mágicas moram em Astra_Core/intencoes.py)
+            intencao, argumento = roteador_cli.rotear(comando)
+
+            if intencao == 'modo_chat': usar_voz = False; ouvido.pausar(); falar("Ativando teclado."); continue
+            elif intencao == 'modo_voz': usar_voz = True; ouvido.iniciar(); falar("Ativando microfone."); continue
 
-            elif 'gatilhos' in comando or 'suas funções' in comando:
+            elif intencao == 'ajuda':
                 lista = "[cyan]buscar anime:[/cyan] Jikan\n[cyan]ler pdf:[/cyan] Grande Sábio\n[cyan]sentido aranha:[/cyan] Hardware\n[cyan]processos abertos:[/cyan] Radar\n[cyan]analise a tela:[/cyan] Visão\n[cyan]escanear:[/cyan] Radar\n[cyan]abrir/fechar [app]:[/cyan] Controle de App\n[cyan]print:[/cyan] Captura"
                 console.print(Panel(lista, title="[bold magenta]🛠️ MANUAL DA ASTRA 🛠️[/bold magenta]"))
                 falar("Exibindo o manual com nossos bebês."); continue
 
-            elif any(g in comando for g in gatilhos_hardware): falar(relatorio_hardware()); continue
+            elif intencao == 'hardware': falar(relatorio_hardware(entregar=falar)); continue
 
-            elif any(g in comando for g in gatilhos_processos):
-                falar(radar_de_processos())
+            elif intencao == 'fila_gpu':
+                painel_gpu = f"{cliente_ollama.escalonador.relatorio()}\n{cliente_ollama.residencia.relatorio()}\n{cache_respostas.relatorio()}\n{cache_visao.relatorio()}\n{medidor_perfis.relatorio()}\n{medidor_voz.relatorio()}\n{memoria_semantica.relatorio()}\n{turnos.relatorio()}\n{rede.relatorio()}"
+                console.print(Panel(painel_gpu, title="[bold magenta]Porteiro da GPU[/bold magenta]"))
+                continue
+
+            elif intencao == 'relatorio_partida':
+                console.print(Panel(cronometro_partida.relatorio(), title="[bold magenta]Relatório de Partida[/bold magenta]"))
+                continue
+
+            elif intencao == 'processos':
+                falar(radar_de_processos(entregar=falar))
                 continue
             
-            elif any(g in comando for g in gatilhos_anime):
-                for g in gatilhos_anime: comando = comando.replace(g, '')
-                comando = comando.replace('astra', '').strip()
-                if comando: falar(rastreador_otaku(comando))
+            elif intencao == 'anime':
+                if argumento: falar(rastreador_otaku(argumento, entregar=falar))
                 continue
 
-            elif any(g in comando for g in gatilhos_pdf):
-                for g in gatilhos_pdf: comando = comando.replace(g, '')
-                comando = comando.replace('.pdf', '').replace('astra', '').strip()
-                if comando: falar(estudar_pdf(comando))
+            elif intencao == 'pdf':
+                if argumento: falar(estudar_pdf(argumento))
                 continue
             
-            elif any(g in comando for g in gatilhos_visao):
-                for g in gatilhos_visao: comando = comando.replace(g, '')
-                falar(analisar_tela(comando.strip())); continue
+            elif intencao == 'visao': falar(analisar_tela(argumento)); continue
 
-            elif 'escanear' in comando: falar(escanear_sistema()); continue
+            elif intencao == 'escanear': falar(escanear_sistema()); continue
 
-            elif 'volume' in comando:
-                numeros = re.findall(r'\d+', comando)
-                if numeros: falar(mudar_volume(int(numeros[0]))); continue
+            elif intencao == 'volume':
+                if argumento is not None: falar(mudar_volume(argumento))
+                continue
 
-            elif 'brilho' in comando:
-                numeros = [int(s) for s in comando.split() if s.isdigit()]
-                if numeros: falar(mudar_brilho(numeros[0])); continue
+            elif intencao == 'brilho':
+                if argumento is not None: falar(mudar_brilho(argumento))
+                continue
 
-            elif 'print' in comando: falar(tirar_print()); continue
-            elif 'esvaziar lixeira' in comando: winshell.recycle_bin().empty(confirm=False, sound=True); falar("Lixeira esvaziada."); continue
-            elif 'desligar' in comando and 'pc' in comando: falar("Encerrando."); os.system("shutdown /s /t 10"); break
+            elif intencao == 'print': falar(tirar_print()); continue
+            elif intencao == 'lixeira': winshell.recycle_bin().empty(confirm=False, sound=True); falar("Lixeira esvaziada."); continue
+            elif intencao == 'desligar': falar("Encerrando."); os.system("shutdown /s /t 10"); break
             
-            elif 'tocar' in comando:
-                musica = comando.replace('tocar', '').strip()
-                falar(f"Tocando {musica}."); pywhatkit.playonyt(musica); continue
+            elif intencao == 'tocar':
+                falar(f"Tocando {argumento}."); pywhatkit.playonyt(argumento); continue
             
-            elif 'clima' in comando:
-                cidade = comando.replace('clima', '').replace('em', '').strip()
-                falar(obter_clima(cidade)); continue
+            elif intencao == 'clima': falar(obter_clima(argumento, entregar=falar)); continue
 
-            elif any(g in comando for g in gatilhos_busca):
-                for g in gatilhos_busca: comando = comando.replace(g, '')
-                falar(pesquisa_inteligente(comando.replace('astra', '').strip())); continue
-            
+            elif intencao == 'busca': falar(pesquisa_inteligente(argumento)); continue
 
-            elif 'sair' in comando: break
+            elif intencao == 'sair': break
 
-            elif 'abrir' in comando:
-                nome_app = comando.replace('abrir', '').strip()
+            elif intencao == 'abrir':
+                app = catalogo_apps.resolver(argumento)
+                nome_app = app.nome if app else argumento
                 falar(f"Iniciando {nome_app}...")
                 abriu = False
-                try:
-                    with open(ARQUIVO_APPS, "r", encoding="utf-8") as f:
-                        for nome, caminho in json.load(f).items():
-                            if nome_app in nome: os.startfile(caminho); abriu = True; break
-                except: pass
+                if app:
+                    try: os.startfile(app.alvo); abriu = True
+                    except OSError: pass
                 if not abriu:
-                    try: app_open(nome_app, match_closest=True, output=False) 
+                    try: AppOpener.open(nome_app, match_closest=True, output=False) 
                     except: falar("App não encontrado.")
                 continue
 
-            elif 'fechar' in comando:
-                nome_app = comando.replace('fechar', '').strip()
+            elif intencao == 'fechar':
+                # O nome do catálogo é o mesmo do Menu Iniciar, que é onde o AppOpener procura
+                app = catalogo_apps.resolver(argumento)
+                nome_app = app.nome if app else argumento
                 falar(f"Ativando protocolo de aniquilação para {nome_app}...")
                 try: 
-                    app_close(nome_app, match_closest=True, output=False)
+                    AppOpener.close(nome_app, match_closest=True, output=False)
                     falar(f"BUM! {nome_app} foi explodido e removido da RAM.")
                 except: 
                     falar("As minhas lentes não acharam esse bebê rodando. Ele já deve estar morto.")
                 continue
 
             else:
-                resposta, context_chat = cerebro_astra(comando, context_chat)
-                falar(resposta)
+                # Streaming: a Astra começa a falar a primeira frase enquanto o resto ainda está sendo gerado
+                resposta, context_chat = cerebro_astra(comando, ao_falar=falar, prioridade=PRIORIDADE_VOZ, origem="voz", sessao="voz")
 
         except sr.WaitTimeoutError: pass 
         except sr.UnknownValueError: pass 
         except sr.RequestError: falar("Minha audição falhou.")
         except KeyboardInterrupt: break
 
+    # Deixa a última frase ("Encerrando.") sair antes de fechar o laboratório
+    aguardar_fala(timeout=10)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,23 @@
+import unittest
+
+from Astra_Core.intencoes import roteador_cli, roteador_discord
+
+class TestRoteadorDiscord(unittest.TestCase):
+    def test_print_so_com_o_comando_exato(self):
+        for comando in ("print", "tela", "ecrã", "  print  "):
+            self.assertEqual(roteador_discord.rotear(comando), ("print", None), comando)
+
+    def test_print_no_meio_da_frase_nao_tira_print(self):
+        for comando in ("como usar print no python", "blueprint do projeto", "me manda um print da tela", "printar logs"):
+            self.assertNotEqual(roteador_discord.rotear(comando)[0], "print", comando)
+
+    def test_outras_intencoes_continuam_iguais(self):
+        self.assertEqual(roteador_discord.rotear("clima em recife"), ("clima", "recife"))
+        self.assertEqual(roteador_discord.rotear("mande o arquivo relatorio.pdf"), ("arquivo", "relatorio.pdf"))
+
+class TestRoteadorCli(unittest.TestCase):
+    def test_print_por_voz_continua_valendo_no_meio_da_frase(self):
+        self.assertEqual(roteador_cli.rotear("astra tira um print")[0], "print")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.rede import RedeFerramentas, ErroRede
+
+def _esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if condicao(): return True
+        time.sleep(0.01)
+    return False
+
+# Um servidor de mentira: cada caminho responde o que o teste mandar, contando as visitas
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Atendente)
+        self.respostas = {}  # caminho -> (status, corpo)
+        self.atraso = 0.0
+        self.visitas = Counter()
+        self.trava = threading.Lock()
+
+class _Atendente(BaseHTTPRequestHandler):
+    def do_GET(self):
+        caminho = self.path.split("?")[0]
+        with self.server.trava: self.server.visitas[caminho] += 1
+        time.sleep(self.server.atraso)
+        status, corpo = self.server.respostas.get(caminho, (404, {}))
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args): pass
+
+class TestRedeFerramentas(unittest.TestCase):
+    def setUp(self):
+        self.servidor = _Servidor()
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}/dados"
+        self.pasta = tempfile.TemporaryDirectory()
+        self.rede = RedeFerramentas(arquivo=os.path.join(self.pasta.name, "cache.db"),
+                                    politicas={"teste": {"fresco": 60, "velho": 600}}, timeout=(2, 5), tentativas=0)
+
+    def tearDown(self):
+        if self.rede._revalidador is not None: self.rede._revalidador.shutdown(wait=True)
+        if self.rede._banco is not None: self.rede._banco.close()
+        self.rede.sessao.close()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.pasta.cleanup()
+
+    def _responder(self, status, corpo):
+        self.servidor.respostas["/dados"] = (status, corpo)
+
+    def _envelhecer(self, segundos):
+        with self.rede._trava:
+            self.rede._banco.execute("UPDATE respostas SET guardado_em = guardado_em - ?", (segundos,))
+            self.rede._banco.commit()
+
+    def _visitas(self):
+        return self.servidor.visitas["/dados"]
+
+    def test_resposta_fresca_vem_do_disco(self):
+        self._responder(200, {"versao": 1})
+        self.assertEqual(self.rede.obter_json("teste", self.url), {"versao": 1})
+        self.assertEqual(self.rede.obter_json("teste", self.url), {"versao": 1})
+        self.assertEqual(self._visitas(), 1)
+        self.assertEqual(self.rede.contagem["frescos"], 1)
+
+    def test_resposta_velha_sai_na_hora_e_revalida_por_tras(self):
+        self._responder(200, {"versao": 1})
+        self.rede.obter_json("teste", self.url)
+        self._responder(200, {"versao": 2})
+        self._envelhecer(120)
+        self.assertEqual(self.rede.obter_json("teste", self.url), {"versao": 1})
+        self.assertTrue(_esperar(lambda: self.rede.contagem["rede"] == 2))
+        self.assertEqual(self.rede.obter_json("teste", self.url), {"versao": 2})
+        self.assertEqual(self._visitas(), 2)
+        self.assertEqual(self.rede.contagem["velhos"], 1)
+
+    def test_perguntas_iguais_ao_mesmo_tempo_vao_uma_vez_so(self):
+        self._responder(200, {"versao": 1})
+        self.servidor.atraso = 0.3
+        largada = threading.Barrier(5)
+        resultados = []
+        def pedir():
+            largada.wait()
+            resultados.append(self.rede.obter_json("teste", self.url))
+        fios = [threading.Thread(target=pedir) for _ in range(5)]
+        for fio in fios: fio.start()
+        for fio in fios: fio.join(10)
+        self.assertEqual(resultados, [{"versao": 1}] * 5)
+        self.assertEqual(self._visitas(), 1)
+        self.assertEqual(self.rede.contagem["coalescidos"], 4)
+
+    def test_copia_vencida_salva_quando_o_servidor_da_erro(self):
+        self._responder(200, {"versao": 1})
+        self.rede.obter_json("teste", self.url)
+        self._responder(500, {"erro": "fora do ar"})
+        self._envelhecer(3600)
+        self.assertEqual(self.rede.obter_json("teste", self.url), {"versao": 1})
+        self.assertEqual(self.rede.contagem["velhos_por_erro"], 1)
+
+    def test_erro_sem_copia_guardada_sobe(self):
+        self._responder(500, {"erro": "fora do ar"})
+        with self.assertRaises(ErroRede):
+            self.rede.obter_json("teste", self.url)
+
+    def test_resposta_recusada_pelo_guardar_se_nao_vai_para_o_disco(self):
+        self._responder(200, {"results": []})
+        tem_resultado = lambda r: bool(r.get("results"))
+        self.rede.obter_json("teste", self.url, guardar_se=tem_resultado)
+        self.rede.obter_json("teste", self.url, guardar_se=tem_resultado)
+        self.assertEqual(self._visitas(), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import time
+import unittest
+from unittest import mock
+
+from Astra_Core import resposta_hibrida
+from core.ollama_client import cliente_ollama, ErroConexaoOllama
+
+def _esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if condicao(): return True
+        time.sleep(0.01)
+    return False
+
+class TestRespostaHibrida(unittest.TestCase):
+    def test_ollama_fora_no_modo_hibrido_nao_entrega_comentario(self):
+        entregues = []
+        descartados = resposta_hibrida.turnos.contagem["descartados"]
+        with mock.patch.dict(resposta_hibrida.MODOS_RESPOSTA, {"teste": "hibrido"}), \
+             mock.patch.object(cliente_ollama, "gerar", side_effect=ErroConexaoOllama("Ollama fora do ar")):
+            imediata = resposta_hibrida.responder("teste", "Dados certos.", "<directive>comente</directive>",
+                                                  chave="teste_falha", entregar=entregues.append)
+            self.assertEqual(imediata, "Dados certos.")
+            self.assertTrue(_esperar(lambda: resposta_hibrida.turnos.contagem["descartados"] > descartados))
+        self.assertEqual(entregues, [])
+
+    def test_comentario_entregue_quando_o_ollama_responde(self):
+        entregues = []
+        with mock.patch.dict(resposta_hibrida.MODOS_RESPOSTA, {"teste": "hibrido"}), \
+             mock.patch.object(cliente_ollama, "gerar", return_value={"response": "Que calor, hein!", "done": True}):
+            resposta_hibrida.responder("teste", "Dados certos.", "<directive>comente</directive>",
+                                       chave="teste_ok", entregar=entregues.append)
+            self.assertTrue(_esperar(lambda: entregues))
+        self.assertEqual(entregues, ["Que calor, hein!"])
+
+if __name__ == "__main__":
+    unittest.main()